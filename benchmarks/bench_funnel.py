@@ -0,0 +1,85 @@
+"""
+Micro-benchmark — funnel counts of export_funnel_stats over the generated date
+ranges: the previous per-range filter/sort/groupby over every match versus
+services.funnel.FunnelIndex (parse once, prefix sums per range).
+
+Run from the project root:
+    python -m benchmarks.bench_funnel [n_matches]
+"""
+
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+import export_funnel_stats
+from services.funnel import FunnelIndex, parse_updated_at
+
+STAGES = [(0, "Nuovi"), (2, "Screening"), (3, "Test preliminare"), (4, "Chiacchierata"), (8, "Colloquio"), (9, "Offerta")]
+
+
+def synthetic_matches(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    start = datetime(2022, 1, 1)
+    return [
+        {
+            "id": i,
+            "updated_at": (start + timedelta(minutes=rng.randrange(2_400_000))).isoformat() + "Z",
+            "is_active": rng.random() < 0.4,
+            "job_pipeline_stage": dict(zip(("rank", "name"), rng.choice(STAGES))),
+        }
+        for i in range(n)
+    ]
+
+
+def legacy_rows(matches: list, since: datetime, until: datetime) -> list:
+    """get_matches_grouped_by_stage as it was, on half-open ranges."""
+    filtered = [m for m in matches if (dt := parse_updated_at(m)) is not None and since <= dt < until]
+    filtered = [m for m in filtered if m.get("rank") not in ("1", "5", "6", "7")]
+    ordered = sorted(filtered, key=lambda m: m.get("job_pipeline_stage").get("rank"))
+    rows, left = [], len(filtered)
+    for name, group in groupby(ordered, key=lambda m: m.get("job_pipeline_stage").get("name")):
+        group = list(group)
+        dropped = len([m for m in group if m.get("is_active") == False])
+        standing = len([m for m in group if m.get("is_active") == True])
+        passed = left - dropped - standing
+        rows.append({
+            "stage_name": name,
+            "stage_rank": group[0].get("job_pipeline_stage").get("rank", 0),
+            "drop": dropped,
+            "standing": standing,
+            "pass": passed,
+            "total": left,
+            "perc_pass": round(passed / left, 2),
+            "perc_drop": round(dropped / left, 2),
+            "perc_drop_cum": round(dropped / len(filtered), 2),
+        })
+        left = passed
+    return rows
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    matches = synthetic_matches(n)
+    export_funnel_stats.ISO_WEEKS = True
+    ranges = export_funnel_stats.build_date_ranges(date(2026, 6, 30))
+
+    started = time.perf_counter()
+    legacy = [legacy_rows(matches, since, until) for _, since, until in ranges]
+    legacy_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    funnel = FunnelIndex(matches)
+    build_s = time.perf_counter() - started
+    engine = [funnel.stage_rows(since, until) for _, since, until in ranges]
+    engine_s = time.perf_counter() - started
+
+    assert legacy == engine
+    print(f"{n} matches, {len(ranges)} ranges")
+    print(f"  per-range filter/sort/groupby : {legacy_s:.3f}s")
+    print(f"  FunnelIndex (build {build_s:.3f}s)  : {engine_s:.3f}s  ({legacy_s / engine_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
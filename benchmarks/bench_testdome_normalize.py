@@ -0,0 +1,111 @@
+"""
+Micro-benchmark — normalization of TestDome API records into the DataFrame
+used by process_test_results: the previous per-record Python loop (+ string
+round-trip in format_df) versus the columnar normalize_test_results.
+
+Run from the project root:
+    python -m benchmarks.bench_testdome_normalize [n_records]
+"""
+
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from process_test_results import normalize_test_results
+
+STATUSES = ["completed", "completed", "completed", "invited", "didNotTake", "canceled", "started"]
+
+
+def synthetic_payload(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    records = []
+    for i in range(n):
+        status = rng.choice(STATUSES)
+        completed = status == "completed"
+        activities = [
+            {"date": (start + timedelta(minutes=rng.randrange(600_000))).isoformat().replace("+00:00", "Z"),
+             "description": rng.choice(["Invited", "Started", "Completed", "Reminder sent"])}
+            for _ in range(rng.randrange(1, 6))
+        ]
+        records.append({
+            "id": 100_000 + i,
+            "name": f"Candidate {i}",
+            "email": f" User{i}@Example.com ",
+            "status": status,
+            "score": rng.choice([rng.randrange(0, 51), rng.random()]) if completed else None,
+            "maxScore": 50 if completed else None,
+            "timeTaken": str(rng.randrange(0, 7200)) if completed else None,
+            "test": {"name": rng.choice(["Python", "Java", "SQL"])},
+            "activities": activities,
+        })
+    return records
+
+
+def legacy_normalize(test_results: list) -> pd.DataFrame:
+    """The per-record loop and format_df string parsing used before, trimmed to the typed columns."""
+    rows = []
+    for r in test_results:
+        status_raw = str(r.get("status") or "").strip()
+        score = None
+        if r.get("score") is not None:
+            score = float(r["score"])
+        if score is not None:
+            max_score = float(r["maxScore"]) if r.get("maxScore") is not None else None
+            if max_score and max_score > 0 and score > 1 and max_score > 1:
+                score = (score / max_score) * 100
+            if 0 < score <= 1:
+                score = score * 100
+        total_score = f"{round(score)}%" if score is not None else ("0%" if status_raw in {"didNotTake", "canceled"} else "")
+        seconds = int(float(r["timeTaken"])) if r.get("timeTaken") not in (None, "") else 0
+        total_time_used = f"{seconds // 3600}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+        latest_dt, latest_date = None, ""
+        for activity in r.get("activities") or []:
+            try:
+                dt = datetime.fromisoformat(activity["date"].replace("Z", "+00:00"))
+            except (KeyError, ValueError):
+                continue
+            if latest_dt is None or dt > latest_dt:
+                latest_dt, latest_date = dt, activity["date"]
+        rows.append({"Email": str(r.get("email") or "").strip(), "Status": status_raw, "Total Score": total_score,
+                     "Total Time Used": total_time_used, "Last Activity Date": latest_date})
+
+    df = pd.DataFrame(rows)
+    df["score"] = pd.to_numeric(df["Total Score"].str.replace("%", "", regex=False), errors="coerce")
+    minutes = (pd.to_timedelta(df["Total Time Used"], errors="coerce").dt.total_seconds() / 60).fillna(0).astype(int)
+    df["time_used"] = minutes.map(lambda m: f"{m // 60}h{m % 60:02d}m")
+    df["last_activity_date"] = pd.to_datetime(df["Last Activity Date"], errors="coerce", utc=True, format="ISO8601")
+    return df
+
+
+def _best_of(fn, payload, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(payload)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    payload = synthetic_payload(n)
+
+    legacy, columnar = legacy_normalize(payload), normalize_test_results(payload)
+    pd.testing.assert_series_equal(legacy["score"], columnar["score"], check_names=False)
+    pd.testing.assert_series_equal(legacy["time_used"], columnar["time_used"], check_names=False)
+    pd.testing.assert_series_equal(legacy["last_activity_date"], columnar["last_activity_date"],
+                                   check_names=False, check_dtype=False)
+
+    legacy_s = _best_of(legacy_normalize, payload)
+    columnar_s = _best_of(normalize_test_results, payload)
+    print(f"{n} records")
+    print(f"  per-record loop + format_df : {legacy_s:.3f}s")
+    print(f"  columnar normalize          : {columnar_s:.3f}s  ({legacy_s / columnar_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,14 +11,21 @@ from dotenv import load_dotenv
 from openai import OpenAI
 
 from screening_cvs import hash_file, find_duplicates, SYSTEM_PROMPT, MODEL
-from services.manatal_service import build_headers, _manatal_get, API_BASE
+from services.extraction_cache import cached_extraction, invalidate_stale_prompts, prompt_fingerprint
+from services.manatal_mirror import candidate_matches, candidates_by_email
+from services.manatal_service import build_headers
+from services.pdf_text import extract_contacts, usable_text_layer
 
 load_dotenv()
 
 INPUT_DIR = Path("cvs")
 
+EMAIL_PROMPT = 'Estrai solo l\'email dal CV. Rispondi con: {"email": ""}'
+PROMPT_FINGERPRINT = prompt_fingerprint(SYSTEM_PROMPT, EMAIL_PROMPT)
+CACHE_SCOPE = "check_email"
 
-def extract_email(client, pdf_path):
+
+def _call_email_model(client, pdf_path):
     with pdf_path.open("rb") as f:
         pdf_bytes = f.read()
     b64 = base64.b64encode(pdf_bytes).decode("utf-8")
@@ -31,25 +38,35 @@ def extract_email(client, pdf_path):
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": [
                 {"type": "file", "file": {"filename": pdf_path.name, "file_data": f"data:application/pdf;base64,{b64}"}},
-                {"type": "text", "text": 'Estrai solo l\'email dal CV. Rispondi con: {"email": ""}'},
+                {"type": "text", "text": EMAIL_PROMPT},
             ]},
         ],
     )
-    data = json.loads(resp.choices[0].message.content)
+    return json.loads(resp.choices[0].message.content)
+
+
+def extract_email(client, pdf_path):
+    # Fast path: email letta dal text layer senza chiamare il modello
+    text_layer = usable_text_layer(pdf_path)
+    if text_layer and (email := extract_contacts(text_layer)["email"]):
+        return email
+
+    data = cached_extraction(
+        pdf_path, MODEL, PROMPT_FINGERPRINT, CACHE_SCOPE,
+        lambda: _call_email_model(client, pdf_path),
+    )
     return (data.get("email") or "").strip()
 
 
 def lookup_manatal(headers, email):
-    data = _manatal_get(headers, f"{API_BASE}/candidates/?email={email}").json()
-    candidates = data.get("results", [])
+    candidates = candidates_by_email(headers, email)
     if not candidates:
         return None
 
     cand = candidates[0]
     cand_id = cand["id"]
 
-    matches_data = _manatal_get(headers, f"{API_BASE}/candidates/{cand_id}/matches/").json()
-    matches = matches_data.get("results", [])
+    matches = candidate_matches(headers, cand_id)
 
     results = []
     for m in matches:
@@ -65,6 +82,8 @@ def lookup_manatal(headers, email):
 
 
 def main():
+    invalidate_stale_prompts(CACHE_SCOPE, PROMPT_FINGERPRINT)
+
     headers = build_headers()
     client = OpenAI()
 
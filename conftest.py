@@ -0,0 +1,113 @@
+"""
+Shared test fixtures. `stub_api` starts a local HTTP server standing in for the
+external APIs and points the services at it, so each test only declares its routes:
+
+    def test_matches(stub_api):
+        stub_api({"GET /jobs/42/matches/": lambda request: {"next": None, "results": []}})
+
+A route key is a method, optionally followed by a regex searched in the request
+path; the first matching route answers. Handlers return the JSON payload,
+(status, payload) or (status, payload, headers); a bytes payload is sent as is.
+"""
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import services.local_db as local_db
+import services.manatal_service as manatal_service
+from services import testdome_service
+from services.http_client import ApiClient
+
+
+class StubRequest:
+    """What a route handler sees of one request."""
+
+    def __init__(self, handler: BaseHTTPRequestHandler):
+        parts = urlsplit(handler.path)
+        self.method = handler.command
+        self.path = parts.path
+        self.query = parse_qs(parts.query)
+        self.headers = handler.headers
+        self.client_port = handler.client_address[1]
+        length = int(handler.headers.get("Content-Length") or 0)
+        self.body = handler.rfile.read(length) if length else b""
+
+    def json(self):
+        return json.loads(self.body)
+
+
+def _make_handler(routes: Dict[str, Callable[[StubRequest], object]]):
+    compiled = []
+    for key, reply in routes.items():
+        method, _, pattern = key.partition(" ")
+        compiled.append((method, re.compile(pattern) if pattern else None, reply))
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, as the real APIs
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload, headers=None):
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self):
+            request = StubRequest(self)
+            for method, pattern, reply in compiled:
+                if method == request.method and (pattern is None or pattern.search(request.path)):
+                    result = reply(request)
+                    break
+            else:
+                result = (404, {"detail": "not found"})
+            self._send(*(result if isinstance(result, tuple) else (200, result)))
+
+        do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _handle
+
+    return Handler
+
+
+@pytest.fixture
+def stub_api(monkeypatch, tmp_path_factory):
+    """
+    stub_api(routes, services=("manatal",)) -> base URL of the running stub.
+    `services` are pointed at it: "manatal" (API_BASE, fresh client),
+    "testdome" (base URL, fresh client, no token) and "openai" (env).
+    The local stores are redirected to an empty cache directory.
+    """
+    servers = []
+    monkeypatch.setattr(local_db, "CACHE_DIR", tmp_path_factory.mktemp("cache"))
+
+    def start(routes: Dict[str, Callable[[StubRequest], object]], services: Iterable[str] = ("manatal",)) -> str:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(routes))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        if "manatal" in services:
+            monkeypatch.setattr(manatal_service, "API_BASE", f"{base}/open/v3")
+            monkeypatch.setattr(manatal_service, "_client", ApiClient("manatal"))
+        if "testdome" in services:
+            monkeypatch.setattr(testdome_service, "TESTDOME_API_BASE", base)
+            monkeypatch.setattr(testdome_service, "_client", ApiClient("testdome"))
+            monkeypatch.setattr(testdome_service, "_token", None)
+        if "openai" in services:
+            monkeypatch.setenv("OPENAI_BASE_URL", f"{base}/v1")
+            monkeypatch.setenv("OPENAI_API_KEY", "test")
+        return base
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
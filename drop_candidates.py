@@ -1,10 +1,11 @@
 import os
-import time
 
 from dotenv import load_dotenv
 
 from config.boards import BOARDS
-from services.gmail_service import send_templated_email, EMAIL_SUBJECT
+from services.email_templates import load_template
+from services.gmail_service import EMAIL_SUBJECT
+from services.mail_queue import MailWorker, enqueue_templated
 from services.manatal_service import (
     build_headers,
     fetch_stage_ids,
@@ -17,7 +18,8 @@ load_dotenv()
 
 # ── Configuration ─────────────────────────────────────────────────────
 EMAIL_BODY_FILE = os.getenv("DROP_EMAIL_BODY_FILE")
-SLEEP_SECONDS = 31
+MAIL_INTERVAL_SECONDS = float(os.getenv("DROP_MAIL_INTERVAL_SECONDS", "31"))  # intervallo minimo tra due email inviate dalla coda
+MAIL_SOURCE = "drop_candidates"  # il worker di questo script invia solo le email accodate qui
 
 # ── Toggle which boards to drop ──────────────────────────────────
 DROP_TL = True
@@ -27,6 +29,10 @@ STAGE_KEY = "nuova_candidatura"
 
 
 def main() -> None:
+    # Template non validi: errore subito, prima di toccare Manatal o accodare email
+    if EMAIL_BODY_FILE:
+        load_template(EMAIL_BODY_FILE)
+
     headers = build_headers()
 
     boards_to_drop = []
@@ -35,33 +41,32 @@ def main() -> None:
     if DROP_DEV:
         boards_to_drop.append("DEV")
 
-    for board in boards_to_drop:
-        cfg = BOARDS[board]
-        job_id = cfg["job_id"]
-        stage_name = cfg["stages"][STAGE_KEY]
-        print(f"\n══ {board} / {stage_name} ══")
-
-        stage_map = fetch_stage_ids(headers, [stage_name])
-        from_stage_id = stage_map.get(stage_name)
-        if from_stage_id is None:
-            raise SystemExit(f"Stage non trovato: '{stage_name}'")
+    with MailWorker(min_interval=MAIL_INTERVAL_SECONDS, source=MAIL_SOURCE):
+        for board in boards_to_drop:
+            cfg = BOARDS[board]
+            job_id = cfg["job_id"]
+            stage_name = cfg["stages"][STAGE_KEY]
+            print(f"\n══ {board} / {stage_name} ══")
 
-        print(f"Cerco match in '{stage_name}' per job {job_id}...")
-        selected = fetch_matches_with_candidates(headers, job_id, from_stage_id, stage_name=stage_name)
-        print(f"Trovati {len(selected)} match nello stage '{stage_name}'.")
+            stage_map = fetch_stage_ids(headers, [stage_name])
+            from_stage_id = stage_map.get(stage_name)
+            if from_stage_id is None:
+                raise SystemExit(f"Stage non trovato: '{stage_name}'")
 
-        for idx, (match, candidate) in enumerate(selected, start=1):
-            cand_fullname, cand_first_name = get_candidate_names(candidate)
-            cand_email = str(candidate.get("email") or "").strip()
-            print(f"- Match {match['id']} / candidato #{idx} - {cand_fullname} ({cand_email or '!!! EMAIL MANCANTE !!!'})")
+            print(f"Cerco match in '{stage_name}' per job {job_id}...")
+            selected = fetch_matches_with_candidates(headers, job_id, from_stage_id, stage_name=stage_name)
+            print(f"Trovati {len(selected)} match nello stage '{stage_name}'.")
 
-            drop_candidate(headers, int(match["id"]))
-            print("  Droppato.")
+            for idx, (match, candidate) in enumerate(selected, start=1):
+                cand_fullname, cand_first_name = get_candidate_names(candidate)
+                cand_email = str(candidate.get("email") or "").strip()
+                print(f"- Match {match['id']} / candidato #{idx} - {cand_fullname} ({cand_email or '!!! EMAIL MANCANTE !!!'})")
 
-            send_templated_email(cand_email, EMAIL_SUBJECT, EMAIL_BODY_FILE, cand_first_name)
-            print("  Email inviata.")
+                drop_candidate(headers, int(match["id"]))
+                print("  Droppato.")
 
-            time.sleep(SLEEP_SECONDS)
+                enqueue_templated(cand_email, EMAIL_SUBJECT, EMAIL_BODY_FILE, cand_first_name, MAIL_SOURCE)
+                print("  Email in coda.")
 
 
 if __name__ == "__main__":
@@ -1,20 +1,41 @@
 import os
-from datetime import datetime
-from itertools import groupby
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List
 
 from dotenv import load_dotenv
-from openpyxl import Workbook
 
 from config.boards import BOARDS
-from services.manatal_service import build_headers, get_all_matches, _format_date_italian
+from services.funnel import (
+    DateRange,
+    FunnelIndex,
+    iso_week_ranges,
+    month_ranges,
+    rolling_ranges,
+    year_ranges,
+)
+from services.manatal_mirror import job_matches
+from services.manatal_service import build_headers, fetch_board_stage_ids, _format_date_italian
+from services.report_writer import ReportWriter
+from services.stage_events import transition_rows
 
 # ── Toggle which boards to export ─────────────────────────────────
 BOARD_ORDER = [b for b in ["DEV", "TL"]
                if os.getenv(f"SCREENING_PARAM_BOARD_{b}", "true").lower() == "true"]
 # ──────────────────────────────────────────────────────────────────
 
+# ── Date ranges ───────────────────────────────────────────────────
+FUNNEL_START = date(2022, 1, 1)
+MONTHLY_FROM = date(2025, 1, 1)          # dettaglio mese per mese da qui in poi
+ROLLING_WINDOWS_DAYS = [30, 90]
+ISO_WEEKS = os.getenv("SCREENING_PARAM_FUNNEL_WEEKS", "false").lower() == "true"
+# Giri di selezione: (etichetta, dal, al escluso); None = fino a oggi
+CAMPAIGN_RANGES = [
+    ("secondo giro 2025", date(2025, 10, 1), date(2025, 12, 1)),
+    ("terzo giro 2025", date(2025, 12, 1), None),
+]
+# ──────────────────────────────────────────────────────────────────
+
 OUTPUT_FIELDS = [
     "stage_name",
     "stage_rank",
@@ -27,68 +48,36 @@ OUTPUT_FIELDS = [
     "perc_drop_cum",
 ]
 
-def parse_updated_at(match):
-    updated_at = match.get("updated_at")
-    if not updated_at:
-        return None
-    updated_at = updated_at.replace("Z", "+00:00")
-    return datetime.fromisoformat(updated_at).replace(tzinfo=None)
-
-
-def get_matches_grouped_by_stage(
-        matches: List[Dict[str, str]],
-        since: datetime,
-        to: datetime) -> List[Dict[str, str]]:
-
-    rows: List[Dict[str, str]] = []
-
-    matches_filtered = [match for match in matches if (dt := parse_updated_at(match)) is not None and since <= dt <= to]
-    matches_filtered = [match for  match in matches_filtered if match.get("rank") not in ("1", "5", "6", "7")]
-
-    # Sort by stage first (groupby requires sorted data) and group by stage
-    matches_sorted = sorted(matches_filtered, key=lambda match: match.get("job_pipeline_stage").get("rank"))
-    matches_grouped = {stage: list(group)
-                       for stage, group in groupby(matches_sorted,
-                                                    key=lambda match: match.get("job_pipeline_stage").get("name"))}
-
-    matches_left = len(matches_filtered)
-
-    for (stage, matches) in matches_grouped.items():
-        matches_dropped = len([m for m in matches if m.get("is_active") == False])
-        matches_standing = len([m for m in matches if m.get("is_active") == True])
-        matches_total = matches_left
-        matches_passed = matches_left - matches_dropped - matches_standing
-
-        row = {
-            "stage_name": stage,
-            "stage_rank": matches[0].get("job_pipeline_stage").get("rank", 0) if len(matches) > 0 else -1,
-            "drop": matches_dropped,
-            "standing": matches_standing,
-            "pass": matches_passed,
-            "total": matches_total,
-            "perc_pass": round(matches_passed / matches_total, 2),
-            "perc_drop": round(matches_dropped / matches_total, 2),
-            "perc_drop_cum": round(matches_dropped / len(matches_filtered), 2),
-        }
-        rows.append(row)
-
-        matches_left = matches_passed
-
-    return rows
+# Foglio "Transizioni": dal log degli spostamenti (services/stage_events)
+TRANSITION_FIELDS = [
+    "stage_name",
+    "entered",
+    "dropped",
+    "perc_drop",
+    "perc_next",
+]
 
 
-def write_rows_to_excel(rows: List[Dict[str, str]], output_path: Path, headers: List[str]) -> None:
-    """Salva le righe su un file Excel applicando il colore sulla decisione."""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Sheet1"
-    ws.append(headers)
+def build_date_ranges(today: date) -> List[DateRange]:
+    """Full range, years, months, (ISO weeks), rolling windows and campaigns, up to today included."""
+    end = today + timedelta(days=1)
+    ranges: List[DateRange] = [("totale", datetime(FUNNEL_START.year, FUNNEL_START.month, FUNNEL_START.day),
+                                datetime(end.year, end.month, end.day))]
+    ranges += year_ranges(FUNNEL_START, end)
+    ranges += month_ranges(MONTHLY_FROM, end)
+    if ISO_WEEKS:
+        ranges += iso_week_ranges(MONTHLY_FROM, end)
+    ranges += rolling_ranges(end, ROLLING_WINDOWS_DAYS)
+    for label, since, until in CAMPAIGN_RANGES:
+        until = min(until or end, end)
+        ranges.append((label, datetime(since.year, since.month, since.day), datetime(until.year, until.month, until.day)))
+    return ranges
 
-    print(f"Excel rows number: {len(rows)}\n")
-    for row in rows:
-        ws.append([row.get(field, "") for field in headers])
 
-    wb.save(output_path)
+def range_title(label: str, since: datetime, until: datetime) -> str:
+    last_day = until - timedelta(days=1)
+    return (f"{label}: Dal {_format_date_italian(since.strftime('%Y-%m-%d'))} "
+            f"al {_format_date_italian(last_day.strftime('%Y-%m-%d'))}")
 
 
 def main() -> None:
@@ -96,53 +85,38 @@ def main() -> None:
 
     headers = build_headers()
     timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+    board_stage_ids = fetch_board_stage_ids(headers, BOARDS)
 
     for BOARD in BOARD_ORDER:
         print(f"══ Exporting board: {BOARD} ══")
-        _export_board(BOARD, headers, timestamp_str)
+        _export_board(BOARD, headers, timestamp_str, board_stage_ids[BOARD])
 
 
-def _export_board(BOARD, headers, timestamp_str) -> None:
+def _export_board(BOARD, headers, timestamp_str, stage_ids: Dict[str, int]) -> None:
     cfg = BOARDS[BOARD]
     job_id = cfg["job_id"]
 
-    all_matches = get_all_matches(headers=headers, job_id=job_id)
-
-    date_ranges = [
-        (datetime(2022, 1, 1), datetime.today()), # full range
-        (datetime(2022, 1, 1), datetime(2022, 12, 31)),  # 2022
-        (datetime(2023, 1, 1), datetime(2023, 12, 31)),  # 2023
-        (datetime(2024, 1, 1), datetime(2024, 12, 31)),  # 2024
-        (datetime(2025, 1, 1), datetime(2025, 12, 31)),  # 2025
-        (datetime(2025, 1, 1), datetime(2025, 1, 31)),   # 2025 gen
-        (datetime(2025, 2, 1), datetime(2025, 2, 28)),   # 2025 feb
-        (datetime(2025, 3, 1), datetime(2025, 3, 31)),   # 2025 mar
-        (datetime(2025, 4, 1), datetime(2025, 4, 30)),   # 2025 apr
-        (datetime(2025, 5, 1), datetime(2025, 5, 31)),   # 2025 mag
-        (datetime(2025, 6, 1), datetime(2025, 6, 30)),   # 2025 giu
-        (datetime(2025, 7, 1), datetime(2025, 7, 31)),   # 2025 lug
-        (datetime(2025, 8, 1), datetime(2025, 8, 31)),   # 2025 ago
-        (datetime(2025, 9, 1), datetime(2025, 9, 30)),   # 2025 set
-        (datetime(2025, 10, 1), datetime(2025, 10, 31)), # 2025 ott
-        (datetime(2025, 11, 1), datetime(2025, 11, 30)), # 2025 nov
-        (datetime(2025, 12, 1), datetime(2025, 12, 31)), # 2025 dic
-        (datetime(2026, 1, 1), datetime.today()),                         # 2026 gen
-        (datetime(2025, 10, 1), datetime(2025, 11, 30)), # secondo giro 2025
-        (datetime(2025, 12, 1), datetime.today()), # terzo giro 2025
-    ]
-
-    rows = [{}]
-
-    for since, to in date_ranges:
-        rows.append({
-            "stage_name": f"Dal {_format_date_italian(since.strftime('%Y-%m-%d'))} al {_format_date_italian(to.strftime('%Y-%m-%d'))}",
-        })
-        matches = get_matches_grouped_by_stage(all_matches, since=since, to=to)
-        rows.extend(matches)
-        rows.append({})
+    # Synced first: the mirror sync also logs the stage transitions seen since the last run
+    funnel = FunnelIndex(job_matches(headers, job_id))
+    funnel_stages = [(name, stage_ids[key]) for key, name in cfg["stages"].items() if key in stage_ids]
 
     excel_path = Path(f"funnel_{BOARD}_{timestamp_str}.xlsx")
-    write_rows_to_excel(rows, output_path=excel_path, headers=OUTPUT_FIELDS)
+    with ReportWriter(excel_path) as report:
+        current = report.sheet("Sheet1", OUTPUT_FIELDS)
+        transitions = report.sheet("Transizioni", TRANSITION_FIELDS)
+        current.append({})
+        transitions.append({})
+        for label, since, until in build_date_ranges(date.today()):
+            title = range_title(label, since, until)
+            for sheet, rows in (
+                (current, funnel.stage_rows(since, until)),
+                (transitions, transition_rows(job_id, funnel_stages, since, until)),
+            ):
+                sheet.append({"stage_name": title})
+                sheet.extend(rows)
+                sheet.append({})
+
+    print(f"Excel rows number: {current.rows}\n")
     print(f"Excel salvato in: {excel_path}")
 
 
@@ -0,0 +1,28 @@
+import os
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from screening_cvs import export_results_view
+
+# ── Filters (vuoto = nessun filtro) ───────────────────────────────
+SINCE = os.getenv("SCREENING_PARAM_SINCE", "")        # YYYY-MM-DD, incluso
+UNTIL = os.getenv("SCREENING_PARAM_UNTIL", "")        # YYYY-MM-DD, incluso
+DECISION = os.getenv("SCREENING_PARAM_DECISION", "")  # ACCETTATO / RIFIUTATO
+ROLE = os.getenv("SCREENING_PARAM_ROLE", "")          # es. TL, Sen Dev
+# ──────────────────────────────────────────────────────────────────
+
+
+def main() -> None:
+    load_dotenv()
+
+    filters = {"since": SINCE, "until": UNTIL, "decision": DECISION.strip().upper(), "role": ROLE}
+    filters = {key: value.strip() for key, value in filters.items() if value.strip()}
+    excel_path = Path(f"screening_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
+    rows = export_results_view(excel_path, **filters)
+    print(f"{rows} risultati esportati in: {excel_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,9 @@ from pathlib import Path
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from services.extraction_cache import cached_extraction, invalidate_stale_prompts, prompt_fingerprint
 from services.file_utils import hash_file
+from services.pdf_text import extract_contacts, usable_text_layer
 
 load_dotenv()
 
@@ -26,9 +28,11 @@ EMAIL_PROMPT = (
     "Rispondi con un JSON: {\"email\": \"...\"}\n"
     "Se non trovi un'email, rispondi: {\"email\": null}"
 )
+PROMPT_FINGERPRINT = prompt_fingerprint(EMAIL_PROMPT)
+CACHE_SCOPE = "duplicate_email"
 
 
-def extract_email(client: OpenAI, pdf_path: Path) -> str | None:
+def _call_email_model(client: OpenAI, pdf_path: Path) -> dict:
     with pdf_path.open("rb") as f:
         b64 = base64.b64encode(f.read()).decode()
 
@@ -53,7 +57,19 @@ def extract_email(client: OpenAI, pdf_path: Path) -> str | None:
         ],
     )
 
-    data = json.loads(resp.choices[0].message.content)
+    return json.loads(resp.choices[0].message.content)
+
+
+def extract_email(client: OpenAI, pdf_path: Path) -> str | None:
+    # Fast path: email letta dal text layer senza chiamare il modello
+    text_layer = usable_text_layer(pdf_path)
+    if text_layer and (email := extract_contacts(text_layer)["email"]):
+        return email
+
+    data = cached_extraction(
+        pdf_path, MODEL, PROMPT_FINGERPRINT, CACHE_SCOPE,
+        lambda: _call_email_model(client, pdf_path),
+    )
     email = data.get("email")
     return email.strip().lower() if email else None
 
@@ -106,6 +122,8 @@ def find_duplicates_by_hash(parent: Path, folders: list[Path] | None = None) ->
 
 
 def main() -> None:
+    invalidate_stale_prompts(CACHE_SCOPE, PROMPT_FINGERPRINT)
+
     parent = Path(PARENT_DIR)
     if not parent.is_dir():
         raise SystemExit(f"Cartella non trovata: {parent}")
@@ -1,20 +1,24 @@
 import os
 from collections import defaultdict
-from datetime import datetime, timedelta
-import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import requests
 from typing import Dict, Iterable, List, Optional, Tuple
 
 from dotenv import load_dotenv
 
 from config.boards import BOARDS
-from services.gmail_service import send_templated_email, EMAIL_SUBJECT
-from services.testdome_service import build_testdome_headers, fetch_all_test_results, TEST_STATUS_MAP
+from services.email_templates import load_template
+from services.gmail_service import EMAIL_SUBJECT
+from services.mail_queue import MailWorker, enqueue_templated
+from services.testdome_service import build_testdome_headers, TEST_STATUS_MAP
+from services.testdome_store import sync_test_results
 from services.manatal_service import (
     build_headers,
-    fetch_stage_ids,
+    fetch_board_stage_ids,
     fetch_all_job_matches,
     fetch_job_matches,
     fetch_candidates,
@@ -33,7 +37,9 @@ load_dotenv()
 EMAIL_DROP_BODY_FILE = os.getenv("DROP_EMAIL_BODY_FILE")
 EMAIL_CHIACCHIERATA_BODY_FILE = os.getenv("SEND_CHIACCHIERATA_EMAIL_BODY_FILE")
 NON_FARE_COSE = os.getenv("SCREENING_PARAM_NON_FARE_COSE", "true").lower() == "true"
-SLEEP_SECONDS = 85
+MAIL_INTERVAL_SECONDS = float(os.getenv("TEST_RESULTS_MAIL_INTERVAL_SECONDS", "85"))  # intervallo minimo tra due email inviate dalla coda
+MAIL_SOURCE = "process_test_results"  # il worker di questo script invia solo le email accodate qui
+MAX_CONCURRENT_ACTIONS = 8  # candidati aggiornati in parallelo (il rate limit Manatal resta condiviso)
 
 # ── Toggle which boards to process ───────────────────────────────
 BOARD_ORDER = [b for b in ["DEV", "TL"]
@@ -41,289 +47,377 @@ BOARD_ORDER = [b for b in ["DEV", "TL"]
 # ──────────────────────────────────────────────────────────────────
 
 
-def format_df(df: pd.DataFrame):
-    df['score'] = (
-        df['Total Score']
-        .astype(str)
-        .str.replace('%', '', regex=False)
-        .str.strip()
-        .replace('', None)
-        .replace("", None)
-        .replace("-", None)
-        .astype(float)
-    )
+TEST_REPORT_URL = "https://app.testdome.com/my-candidates/report/"
+
+
+def _text(values: Iterable[object]) -> np.ndarray:
+    return np.array([str(v or "").strip() for v in values], dtype=object)
+
+
+def _normalize_scores(score: pd.Series, max_score: pd.Series, status: np.ndarray) -> pd.Series:
+    """Score as a 0-100 float (rounded like the TestDome UI), NaN when missing."""
+    score = pd.to_numeric(score, errors="coerce").astype(float)
+    max_score = pd.to_numeric(max_score, errors="coerce").astype(float)
+    out_of_max = (max_score > 0) & (score > 1) & (max_score > 1)
+    score = score.where(~out_of_max, score / max_score * 100)
+    score = score.where(~((score > 0) & (score <= 1)), score * 100)
+    score = score.round()
+    return score.mask(score.isna() & np.isin(status, ["didNotTake", "canceled"]), 0.0)
+
+
+def _parse_utc(values: np.ndarray) -> np.ndarray:
+    """ISO date strings -> naive UTC datetime64[ns] (NaT when missing/invalid)."""
+    # TestDome dates end in "Z": parsed without the suffix they take to_datetime's fast naive path
+    zulu = np.array([type(v) is str and v.endswith("Z") for v in values], dtype=bool)
+    stripped = np.full(len(values), None, dtype=object)
+    stripped[zulu] = [v[:-1] for v in values[zulu]]
+    parsed = pd.to_datetime(stripped, format="ISO8601", errors="coerce").to_numpy("datetime64[ns]")
+    others = ~zulu & pd.notna(values)
+    if others.any():
+        offsets = pd.to_datetime(pd.Series(values[others], dtype=object), format="ISO8601", errors="coerce", utc=True)
+        parsed[others] = offsets.dt.tz_convert(None).to_numpy("datetime64[ns]")
+    return parsed
+
+
+def _last_activities(activities: pd.Series) -> pd.DataFrame:
+    """Date and description of the most recent activity of every record."""
+    exploded = activities.reset_index(drop=True).explode()
+    events = exploded.to_numpy()
+    is_event = np.array([type(e) is dict for e in events], dtype=bool)
+    events, owners = events[is_event], exploded.index.to_numpy()[is_event]
+    stamps = _parse_utc(np.array([e.get("date") for e in events], dtype=object))
+
+    valid = np.flatnonzero(~np.isnat(stamps))
+    # Newest first within each record (stable: the first of equal dates wins), then one per record
+    order = valid[np.lexsort((-stamps[valid].view("i8"), owners[valid]))]
+    _, first = np.unique(owners[order], return_index=True)
+    latest = order[first]
+
+    dates = np.full(len(activities), np.datetime64("NaT"), dtype="datetime64[ns]")
+    dates[owners[latest]] = stamps[latest]
+    descriptions = np.full(len(activities), "", dtype=object)
+    descriptions[owners[latest]] = [str(e.get("description") or "").strip() for e in events[latest]]
+    return pd.DataFrame(
+        {"date": pd.Series(dates).dt.tz_localize("UTC"), "description": descriptions}
+    ).set_index(activities.index)
+
+
+def normalize_test_results(test_results: List[Dict[str, object]]) -> pd.DataFrame:
+    """
+    TestDome API records -> typed columns in one columnar pass:
+    float score, integer seconds, UTC datetime of the last activity.
+    """
+    def field(name: str) -> pd.Series:
+        return pd.Series([r.get(name) for r in test_results], dtype=object)
+
+    status = _text(field("status"))
+    email = _text(field("email"))
+    ids = pd.to_numeric(field("id"), errors="coerce").astype("Int64")
+    seconds_used = pd.to_numeric(field("timeTaken"), errors="coerce").fillna(0).astype(int)
+    last_activity = _last_activities(field("activities"))
+
+    # Display strings are built once per distinct value
+    minutes, minutes_idx = np.unique(seconds_used.to_numpy() // 60, return_inverse=True)
+    time_used = np.array([f"{m // 60}h{m % 60:02d}m" for m in minutes], dtype=object)[minutes_idx]
+    labels = {code: TEST_STATUS_MAP.get(code, code.title()) for code in set(status)}
+
+    return pd.DataFrame({
+        "candidate": _text(field("name")),
+        "email": email,
+        "email_key": np.array([e.lower() for e in email], dtype=object),
+        "name": _text(t.get("name") if isinstance(t, dict) else None for t in field("test")),
+        "status": status,
+        "status_label": np.array([labels[code] for code in status], dtype=object),
+        "score": _normalize_scores(field("score"), field("maxScore"), status),
+        "seconds_used": seconds_used,
+        "time_used": time_used,
+        "last_activity_date": last_activity["date"],
+        "last_activity_description": last_activity["description"],
+        "link": np.array([f"{TEST_REPORT_URL}{i}" if i is not pd.NA else "" for i in ids], dtype=object),
+    })
 
-    td = pd.to_timedelta(df["Total Time Used"], errors="coerce")
 
-    minutes = (td.dt.total_seconds() / 60).fillna(0).astype(int)
+def normalize_emails(emails: pd.Series) -> pd.Series:
+    return emails.fillna("").astype(str).str.strip().str.lower()
 
-    df["time_used"] = minutes.map(
-        lambda m: f"{m // 60}h{m % 60:02d}m"
-    )
 
-    df['last_activity_date'] = pd.to_datetime(df['Last Activity Date'], errors='coerce')
+def normalize_email(email: str) -> str:
+    return str(email or "").strip().lower()
 
-    df = df.rename(columns={
-        'Test': 'name',
-        'Email': 'email',
-        'Test Status': 'status',
-        'Link': 'link',
-    })
 
-    df = df[[
-        "name",
-        "email",
-        "score",
-        "status",
-        "time_used",
-        "last_activity_date",
-        "link",
-    ]]
+STRANGE_STATUSES = ["didNotTake", "canceled", "started", "sendingInvitation", "paused"]
 
-    return df
 
+def classify_tests(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Classify every candidate at once: one row per normalized email with the
+    classification key in "category" and, when the candidate has exactly one
+    test, that test's columns. Look candidates up with .loc[email_key].
+    """
+    keyed = df[df["email_key"] != ""]
+    test_count = keyed.groupby("email_key")["email_key"].transform("size")
+    first = keyed.assign(test_count=test_count).drop_duplicates("email_key").set_index("email_key")
 
+    status, score = first["status"], first["score"]
+    first["category"] = np.select(
+        [
+            first["test_count"] >= 2,
+            status.isin(STRANGE_STATUSES),
+            status == "invited",
+            score.isna() | (score == 0),
+            score >= 80,
+            score < 60,
+        ],
+        ["test_count_2", "stati_strani", "invited", "score_0", "passati", "falliti"],
+        default="da_valutare",
+    )
+    return first
 
-def classify_candidate(test_df):
-    """Return a classification key and test row for a candidate based on their test results."""
-    test_count = len(test_df)
 
-    if test_count == 0:
+def lookup_classification(classified: pd.DataFrame, email: str) -> Tuple[str, Optional[pd.Series]]:
+    """Classification key and test row for a candidate (None when 0 or 2+ tests)."""
+    key = normalize_email(email)
+    if not key or key not in classified.index:
         return "test_count_0", None
-    if test_count >= 2:
+    row = classified.loc[key]
+    if row["category"] == "test_count_2":
         return "test_count_2", None
+    return row["category"], row
+
+
+# ── Plan ─────────────────────────────────────────────────────────────
+
+NOTE_CATEGORIES = ("passati", "falliti", "da_valutare")
+
+
+def testdome_note_text(test: pd.Series) -> str:
+    return f"Testdome: {test['score']}%  |  {test['name']}  |  ({test['time_used']})\nLink: {test['link']}"
+
+
+def plan_candidate(
+    match: Dict[str, object],
+    candidate: Dict[str, object],
+    category: str,
+    test: Optional[pd.Series],
+    to_stage: Tuple[str, Optional[int]],
+    has_note: bool,
+) -> List[Dict[str, object]]:
+    """Actions a real run takes for one candidate, in execution order (the email only after the move/drop)."""
+    cand_id, match_id = int(match.get("candidate")), int(match.get("id"))
+    _, first_name = get_candidate_names(candidate)
+    cand_email = str(candidate.get("email") or "").strip()
+
+    actions: List[Dict[str, object]] = []
+    if category in NOTE_CATEGORIES and not has_note:
+        actions.append({"kind": "note", "candidate_id": cand_id, "text": testdome_note_text(test)})
+    if test is None:
+        return actions
+
+    if category == "passati":
+        to_stage_name, to_stage_id = to_stage
+        actions.append({"kind": "move", "match_id": match_id, "stage_id": to_stage_id, "stage_name": to_stage_name})
+        template = EMAIL_CHIACCHIERATA_BODY_FILE
+    elif category in ("falliti", "score_0"):
+        actions.append({"kind": "drop", "match_id": match_id})
+        template = EMAIL_DROP_BODY_FILE if category == "falliti" else None
+    else:
+        return actions
+
+    if template and cand_email:
+        actions.append({"kind": "email", "to": cand_email, "template": template, "name": first_name})
+    return actions
+
+
+def describe_action(action: Dict[str, object]) -> str:
+    kind = action["kind"]
+    if kind == "note":
+        return "nota TestDome"
+    if kind == "move":
+        return f"sposta in '{action['stage_name']}'"
+    if kind == "drop":
+        return "drop"
+    return f"email {Path(str(action['template'])).name} a {action['to']}"
+
+
+def _candidates_with_note(headers: Dict[str, str], cand_ids: List[int]) -> set:
+    """Which candidates already have the TestDome note (ledger first, listings concurrently)."""
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_ACTIONS) as pool:
+        found = pool.map(lambda cid: has_testdome_note(cid, headers=headers), cand_ids)
+        return {cid for cid, has_note in zip(cand_ids, found) if has_note}
+
+
+def plan_board(
+    headers: Dict[str, str],
+    board: str,
+    classified: pd.DataFrame,
+    stage_ids: Dict[str, int],
+) -> List[Dict[str, object]]:
+    """
+    Classify the candidates of one board and decide what to do with each:
+    nothing is written to Manatal and no email is queued here.
+    Returns one entry per candidate with at least one action.
+    """
+    cfg = BOARDS[board]
+    job_id = cfg["job_id"]
+    from_stage = cfg["stages"]["test_preliminare"]
+    to_stage = (cfg["stages"]["chiacchierata"], stage_ids.get("chiacchierata"))
+
+    print(f"\n══ {board} / {from_stage} ══")
+    print(f"Cerco match in '{from_stage}' per job {job_id}...")
+    selected = fetch_matches_with_candidates(headers, job_id, stage_ids.get("test_preliminare"), stage_name=from_stage)
+    print(f"Trovati {len(selected)} match nello stage di origine.")
+
+    lookups = [
+        lookup_classification(classified, str(candidate.get("email") or "").strip())
+        for _, candidate in selected
+    ]
+    noted = _candidates_with_note(headers, [
+        int(match.get("candidate"))
+        for (match, _), (category, _) in zip(selected, lookups)
+        if category in NOTE_CATEGORIES
+    ])
+
+    counts = {
+        "passati": 0,
+        "falliti": 0,
+        "da_valutare": 0,
+        "test_count_0": 0,
+        "test_count_2": 0,
+        "stati_strani": 0,
+        "invited": 0,
+        "score_0": 0,
+    }
+    summary_rows: list[tuple[str, str, str, str, str]] = []
+    plan: List[Dict[str, object]] = []
+
+    for (match, candidate), (category, test) in zip(selected, lookups):
+        cand_id = int(match.get("candidate"))
+        cand_fullname, _ = get_candidate_names(candidate)
+        cand_email = str(candidate.get("email") or "").strip()
+        match_id = int(match.get("id"))
+
+        print(f"{cand_fullname:<25}  |  email: {cand_email:<30}  |  id: {cand_id:<10}  |  match: {match_id:<10}")
+        counts[category] += 1
+
+        if test is not None:
+            print(f"  Test: {test['name']}  |  Score: {test['score']}/100  |  ({test['time_used']}) - {test['last_activity_date']}")
+
+        if category == "test_count_2":
+            print(f"  Test count 2.")
+        elif category == "score_0":
+            print(f"  Score 0.")
+        elif category == "da_valutare":
+            print(f"  Da valutare.")
+
+        manatal_link = f"https://app.manatal.com/candidates/{cand_id}"
+        test_name = test["name"] if test is not None else ""
+        test_score = f"{test['score']}/100" if test is not None and pd.notna(test["score"]) else ""
+        test_time = test["time_used"] if test is not None else ""
+        summary_rows.append((manatal_link, cand_email, test_name, test_score, test_time))
+
+        actions = plan_candidate(match, candidate, category, test, to_stage, cand_id in noted)
+        if actions:
+            plan.append({"board": board, "candidate": cand_fullname, "email": cand_email, "actions": actions})
 
-    test = test_df.iloc[0]
-    test_status = test["status"]
-
-    if test_status in ("didNotTake", "canceled", "started", "sendingInvitation", "paused"):
-        return "stati_strani", test
-    if test_status == "invited":
-        return "invited", test
-    if pd.isna(test["score"]) or test["score"] == 0:
-        return "score_0", test
-    if test["score"] >= 80:
-        return "passati", test
-    if test["score"] < 60:
-        return "falliti", test
-    return "da_valutare", test
+    print("")
+    for key, value in counts.items():
+        print(f"{key}: {value}")
+    print("Totale:", sum(counts.values()))
+
+    print(f"\n── Riepilogo {board} ──")
+    for link, email, t_name, t_score, t_time in summary_rows:
+        print(f"{link} ({email}) | {t_name} | {t_score} | {t_time}")
+    return plan
+
+
+def print_plan(plan: List[Dict[str, object]]) -> None:
+    print(f"\n══ Piano: {sum(len(e['actions']) for e in plan)} azioni su {len(plan)} candidati ══")
+    for entry in plan:
+        steps = ", ".join(describe_action(a) for a in entry["actions"])
+        print(f"[{entry['board']}] {entry['candidate']:<25} | {entry['email']:<30} | {steps}")
+
+
+# ── Execute ──────────────────────────────────────────────────────────
+
+def _apply(headers: Dict[str, str], action: Dict[str, object]) -> None:
+    kind = action["kind"]
+    if kind == "note":
+        create_note(headers, action["candidate_id"], action["text"])
+    elif kind == "move":
+        move_match(headers, action["match_id"], action["stage_id"])
+    elif kind == "drop":
+        drop_candidate(headers, action["match_id"])
+    elif kind == "email":
+        enqueue_templated(action["to"], EMAIL_SUBJECT, action["template"], action["name"], MAIL_SOURCE)
+
+
+def _run_entry(headers: Dict[str, str], entry: Dict[str, object]) -> Optional[str]:
+    """One candidate's actions, in order: the first failure skips the rest (no email without the move/drop)."""
+    for action in entry["actions"]:
+        try:
+            _apply(headers, action)
+        except requests.RequestException as exc:
+            return f"{describe_action(action)}: {exc}"
+    return None
+
+
+def execute_plan(headers: Dict[str, str], plan: List[Dict[str, object]]) -> List[Tuple[Dict[str, object], str]]:
+    """
+    Apply the plan, candidates in parallel: every Manatal call goes through the
+    shared client, so the account rate limit still holds. Emails are only queued.
+    Returns the (entry, error) pairs of the candidates that failed.
+    """
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_ACTIONS) as pool:
+        errors = list(pool.map(lambda entry: _run_entry(headers, entry), plan))
+    return [(entry, error) for entry, error in zip(plan, errors) if error]
 
 
 def main() -> None:
+    # Template non validi: errore subito, prima di toccare Manatal o accodare email
+    if EMAIL_DROP_BODY_FILE:
+        load_template(EMAIL_DROP_BODY_FILE)
+    if EMAIL_CHIACCHIERATA_BODY_FILE:
+        load_template(EMAIL_CHIACCHIERATA_BODY_FILE)
+
     headers = build_headers()
 
     # TESTDOME
     testdome_headers = build_testdome_headers()
-    test_results = fetch_all_test_results(testdome_headers)
-
-    rows = []
-    for test_result in test_results:
-        name = str(test_result.get("name") or "").strip()
-        email = str(test_result.get("email") or "").strip()
-        test_result_id = test_result.get("id")
-        test_link = ""
-        if test_result_id is not None:
-            test_link = f"https://app.testdome.com/my-candidates/report/{test_result_id}"
-
-        test_name = str((test_result.get("test") or {}).get("name") or "").strip()
-        status_raw = str(test_result.get("status") or "").strip()
-        test_status = TEST_STATUS_MAP.get(status_raw, status_raw.title() if status_raw else "")
-
-        score_raw = test_result.get("score")
-        max_score_raw = test_result.get("maxScore")
-        score = None
-        if score_raw is not None:
-            try:
-                score = float(score_raw)
-            except (TypeError, ValueError):
-                score = None
-
-        if score is not None:
-            max_score = None
-            if max_score_raw is not None:
-                try:
-                    max_score = float(max_score_raw)
-                except (TypeError, ValueError):
-                    max_score = None
-            if max_score and max_score > 0 and score > 1 and max_score > 1:
-                score = (score / max_score) * 100
-            if 0 < score <= 1:
-                score = score * 100
-
-        total_score = ""
-        if score is not None:
-            total_score = f"{round(score)}%"
-        elif status_raw in {"didNotTake", "canceled"}:
-            total_score = "0%"
-
-        time_taken = test_result.get("timeTaken")
-        seconds_used = 0
-        if time_taken not in (None, ""):
-            try:
-                seconds_used = int(float(time_taken))
-            except (TypeError, ValueError):
-                seconds_used = 0
-        hours = seconds_used // 3600
-        minutes = (seconds_used % 3600) // 60
-        seconds = seconds_used % 60
-        total_time_used = f"{hours}:{minutes:02d}:{seconds:02d}"
-
-        activities = test_result.get("activities") or []
-        last_activity_description = ""
-        last_activity_date = ""
-        if isinstance(activities, list) and activities:
-            latest_dt = None
-            latest_activity = None
-            for activity in activities:
-                date_str = activity.get("date")
-                if not date_str:
-                    continue
-                try:
-                    activity_dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-                except ValueError:
-                    continue
-                if latest_dt is None or activity_dt > latest_dt:
-                    latest_dt = activity_dt
-                    latest_activity = activity
-            if latest_activity:
-                last_activity_description = str(latest_activity.get("description") or "").strip()
-                last_activity_date = latest_activity.get("date") or ""
-
-        rows.append(
-            {
-                "Name": name,
-                "Email": email,
-                "Test": test_name,
-                "Test Status": test_status,
-                "Total Score": total_score,
-                "Total Time Used": total_time_used,
-                "Last Activity Description": last_activity_description,
-                "Last Activity Date": last_activity_date,
-                "Link": test_link,
-            }
-        )
-
-    df = pd.DataFrame(
-        rows,
-        columns=[
-            "Name",
-            "Email",
-            "Test",
-            "Test Status",
-            "Total Score",
-            "Total Time Used",
-            "Last Activity Description",
-            "Last Activity Date",
-            "Link",
-        ],
-    )
+    test_results = sync_test_results(testdome_headers)
 
-    grouped = df.groupby("Test Status")
+    df = normalize_test_results(test_results)
 
-    for status, group in grouped:
+    for status, group in df.groupby("status_label"):
         print(f"\n=== {status} ({len(group)}) ===")
-        for _, row in group.iterrows():
+        for row in group.itertuples():
             print(
-                f"{row['Name']:<25} | "
-                f"{row['Email']:<30} | "
-                f"{row['Test']}"
+                f"{row.candidate:<25} | "
+                f"{row.email:<30} | "
+                f"{row.name}"
             )
 
     print("")
     print("----")
     print("")
 
-    df = format_df(df)
+    classified = classify_tests(df)
+
+    board_stage_ids = fetch_board_stage_ids(headers, BOARDS)
 
+    plan = []
     for board in BOARD_ORDER:
-        cfg = BOARDS[board]
-        job_id = cfg["job_id"]
-        from_stage = cfg["stages"]["test_preliminare"]
-        to_stage = cfg["stages"]["chiacchierata"]
-
-        print(f"\n══ {board} / {from_stage} ══")
-
-        stage_map = fetch_stage_ids(headers, [from_stage, to_stage])
-        from_stage_id = stage_map.get(from_stage)
-        to_stage_id = stage_map.get(to_stage)
-
-        print(f"Cerco match in '{from_stage}' per job {job_id}...")
-        selected = fetch_matches_with_candidates(headers, job_id, from_stage_id, stage_name=from_stage)
-        print(f"Trovati {len(selected)} match nello stage di origine.")
-
-        counts = {
-            "passati": 0,
-            "falliti": 0,
-            "da_valutare": 0,
-            "test_count_0": 0,
-            "test_count_2": 0,
-            "stati_strani": 0,
-            "invited": 0,
-            "score_0": 0,
-        }
-        summary_rows: list[tuple[str, str, str, str, str]] = []
-
-        for idx, (match, candidate) in enumerate(selected, start=1):
-            cand_id = int(match.get("candidate"))
-            cand_fullname, cand_first_name = get_candidate_names(candidate)
-            cand_email = str(candidate.get("email") or "").strip()
-            match_id = int(match.get("id"))
-            test_df = df[df["email"] == cand_email]
-
-            print(f"{cand_fullname:<25}  |  email: {cand_email:<30}  |  id: {cand_id:<10}  |  match: {match_id:<10}")
-
-            category, test = classify_candidate(test_df)
-            counts[category] += 1
-
-            if test is not None:
-                print(f"  Test: {test['name']}  |  Score: {test['score']}/100  |  ({test['time_used']}) - {test['last_activity_date']}")
-
-            if category == "test_count_2":
-                print(f"  Test count 2.")
-            elif category == "score_0":
-                print(f"  Score 0.")
-            elif category == "da_valutare":
-                print(f"  Da valutare.")
-
-            manatal_link = f"https://app.manatal.com/candidates/{cand_id}"
-            test_name = test["name"] if test is not None else ""
-            test_score = f"{test['score']}/100" if test is not None and pd.notna(test["score"]) else ""
-            test_time = test["time_used"] if test is not None else ""
-            summary_rows.append((manatal_link, cand_email, test_name, test_score, test_time))
-
-            # Write testdome note
-            if category in ("passati", "falliti", "da_valutare"):
-                if not has_testdome_note(cand_id, headers=headers):
-                    create_note(headers, cand_id,
-                                f"Testdome: {test['score']}%  |  {test['name']}  |  ({test['time_used']})\nLink: {test['link']}")
-
-            if NON_FARE_COSE or test is None:
-                continue
-
-            # Act on classification
-            if category == "score_0":
-                drop_candidate(headers, int(match_id))
-            elif category == "passati":
-                move_match(headers, match_id, to_stage_id)
-                print(f"  Test passato -> spostato in '{to_stage}'.")
-                if EMAIL_CHIACCHIERATA_BODY_FILE:
-                    send_templated_email(cand_email, EMAIL_SUBJECT, EMAIL_CHIACCHIERATA_BODY_FILE, cand_first_name)
-                    time.sleep(SLEEP_SECONDS)
-            elif category == "falliti":
-                drop_candidate(headers, int(match_id))
-                print(f"  Droppato.")
-                if EMAIL_DROP_BODY_FILE:
-                    send_templated_email(cand_email, EMAIL_SUBJECT, EMAIL_DROP_BODY_FILE, cand_first_name)
-                    time.sleep(SLEEP_SECONDS)
-
-        print("")
-        for key, value in counts.items():
-            print(f"{key}: {value}")
-        print("Totale:", sum(counts.values()))
-
-        print(f"\n── Riepilogo {board} ──")
-        for link, email, t_name, t_score, t_time in summary_rows:
-            print(f"{link} ({email}) | {t_name} | {t_score} | {t_time}")
+        plan.extend(plan_board(headers, board, classified, board_stage_ids[board]))
+
+    print_plan(plan)
+    if NON_FARE_COSE:
+        print("\nSCREENING_PARAM_NON_FARE_COSE attivo: nessuna azione eseguita.")
+        return
+
+    with MailWorker(min_interval=MAIL_INTERVAL_SECONDS, source=MAIL_SOURCE):
+        failures = execute_plan(headers, plan)
+        print(f"\nEseguito il piano: {len(plan) - len(failures)}/{len(plan)} candidati completati.")
+        for entry, error in failures:
+            print(f"  ERRORE [{entry['board']}] {entry['candidate']} ({entry['email']}): {error}")
 
 
 if __name__ == "__main__":
@@ -5,21 +5,36 @@ e organizza zip dei CV accettati/rifiutati usando GPT-4o per il parsing.
 
 import base64
 import json
+import logging
 import os
 import shutil
 import time
-import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from services.extraction_cache import (
+    cached_extraction,
+    get_extraction,
+    invalidate_stale_prompts,
+    prompt_fingerprint,
+    prune,
+    put_extraction,
+)
 from services.file_utils import hash_file
 from services.manatal_service import build_headers, get_candidate_info
+from services.openai_batch import collect_batch_results, load_batch_state, save_batch_state, submit_batch, wait_for_batch
+from services.pdf_text import fill_contacts, usable_text_layer
+from services.rate_limit import RateLimiter
+from services.report_writer import write_rows
+from services.result_store import RUN_FIELDS, ResultRun, query as query_results
+from services.zip_packager import ZipPackager
 from find_duplicate_cvs import find_duplicates_by_hash
 
 
@@ -29,8 +44,14 @@ load_dotenv()
 INPUT_DIR = "cvs_confronto"
 DUPLICATES_DIR = "cvs_duplicati"
 MODEL = "gpt-4o"
-PAUSE = 0.0
+MAX_WORKERS = 8            # richieste contemporanee verso OpenAI/Manatal
+REQUESTS_PER_MINUTE = 60   # tetto di chiamate al modello (0 = nessun limite)
+SUBMIT_WINDOW = 2          # file affidati all'executor per worker (in elaborazione + in coda)
 LIMIT = None
+BATCH_MODE = os.getenv("SCREENING_PARAM_BATCH_MODE", "false").lower() == "true"
+BATCH_POLL_SECONDS = 60
+BATCH_STATE_FILE = ".batch_job.json"
+BATCH_REQUESTS_FILE = ".batch_requests.jsonl"
 # ──────────────────────────────────────────────────────────────────
 
 SYSTEM_PROMPT = (
@@ -92,19 +113,36 @@ USER_PROMPT = (
     "NON inventare informazioni. Estrai solo ciò che è presente nel CV."
 )
 
+# Cambia quando cambiano i prompt: le estrazioni in cache con un'impronta diversa vengono scartate
+PROMPT_FINGERPRINT = prompt_fingerprint(SYSTEM_PROMPT, USER_PROMPT)
+CACHE_SCOPE = "screening"
 
-def call_model_with_pdf_file(client: OpenAI, pdf_path: Path, model: str) -> Dict[str, str]:
+
+def build_cv_messages(pdf_path: Path, text_layer: str = "") -> List[Dict[str, Any]]:
     """
-    Legge il PDF, lo codifica in base64 e lo passa al modello
-    tramite Chat Completions API usando il tipo di contenuto 'file'.
-    Il modello é forzato a rispondere in JSON tramite response_format.
+    Costruisce i messaggi per il modello. Se il PDF ha un text layer
+    utilizzabile manda solo il testo, altrimenti il PDF in base64
+    con il tipo di contenuto 'file'.
     """
-    # sono riuscito a mandarlo solo in base64 vabbu
-    with pdf_path.open("rb") as f:
-        pdf_bytes = f.read()
-    base64_pdf = base64.b64encode(pdf_bytes).decode("utf-8")
+    if text_layer:
+        cv_content = {
+            "type": "text",
+            "text": f"Testo estratto dal CV ({pdf_path.name}):\n\n{text_layer}",
+        }
+    else:
+        # sono riuscito a mandarlo solo in base64 vabbu
+        with pdf_path.open("rb") as f:
+            pdf_bytes = f.read()
+        base64_pdf = base64.b64encode(pdf_bytes).decode("utf-8")
+        cv_content = {
+            "type": "file",
+            "file": {
+                "filename": pdf_path.name,
+                "file_data": f"data:application/pdf;base64,{base64_pdf}",
+            },
+        }
 
-    messages = [
+    return [
         {
             "role": "system",
             "content": SYSTEM_PROMPT,
@@ -112,13 +150,7 @@ def call_model_with_pdf_file(client: OpenAI, pdf_path: Path, model: str) -> Dict
         {
             "role": "user",
             "content": [
-                {
-                    "type": "file",
-                    "file": {
-                        "filename": pdf_path.name,
-                        "file_data": f"data:application/pdf;base64,{base64_pdf}",
-                    },
-                },
+                cv_content,
                 {
                     "type": "text",
                     "text": USER_PROMPT,
@@ -127,19 +159,32 @@ def call_model_with_pdf_file(client: OpenAI, pdf_path: Path, model: str) -> Dict
         },
     ]
 
+
+def parse_model_content(content: str, text_layer: str = "") -> Dict[str, Any]:
+    """Decodifica il JSON del modello e completa i contatti mancanti dal text layer."""
+    try:
+        raw = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise RuntimeError(f"Risposta non JSON dal modello: {e}; content={content!r}") from e
+    return fill_contacts(raw, text_layer) if text_layer else raw
+
+
+def call_model_with_pdf_file(client: OpenAI, pdf_path: Path, model: str) -> Dict[str, str]:
+    """
+    Passa il CV al modello tramite Chat Completions API: il solo testo se il
+    PDF ha un text layer affidabile, il file intero per scansioni/immagini.
+    Il modello é forzato a rispondere in JSON tramite response_format.
+    """
+    text_layer = usable_text_layer(pdf_path)
+
     completion = client.chat.completions.create(
         model=model,
         temperature=0,
         response_format={"type": "json_object"},
-        messages=messages,
+        messages=build_cv_messages(pdf_path, text_layer),
     )
 
-    content = completion.choices[0].message.content
-
-    try:
-        return json.loads(content)
-    except json.JSONDecodeError as e:
-        raise RuntimeError(f"Risposta non JSON dal modello: {e}; content={content!r}") from e
+    return parse_model_content(completion.choices[0].message.content, text_layer)
 
 
 CONDITION_KEYS = ["eta", "boolean", "accenture", "italiano"]
@@ -317,35 +362,29 @@ OUTPUT_FIELDS = [
 ]
 
 
-def write_rows_to_excel(rows: List[Dict[str, str]], output_path: Path, headers: List[str]) -> None:
-    """Salva le righe su un file Excel applicando il colore sulla decisione."""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "CV"
-    ws.append(headers)
+def decision_fill(row: Dict[str, Any]) -> Optional[str]:
+    """Colore della riga in base alla decisione."""
+    decision_value = (row.get("decision") or "").upper()
+    return "green" if decision_value == "ACCETTATO" else "red" if decision_value == "RIFIUTATO" else None
 
-    green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-    red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
 
-    print(f"Excel rows number: {len(rows)}\n")
-    for row in rows:
-        ws.append([row.get(field, "") for field in headers])
-        current_row = ws.max_row
-        decision_value = (row.get("decision") or "").upper()
-        fill = green_fill if decision_value == "ACCETTATO" else red_fill if decision_value == "RIFIUTATO" else None
-        if fill:
-            for cell in ws[current_row]:
-                cell.fill = fill
-
-    wb.save(output_path)
+def write_rows_to_excel(rows: Iterable[Dict[str, str]], output_path: Path, headers: List[str]) -> int:
+    """
+    Salva le righe su un file Excel applicando il colore sulla decisione.
+    `rows` può essere un generatore: ogni riga è scritta appena arriva.
+    """
+    written = write_rows(output_path, headers, rows, title="CV", fill_for=decision_fill)
+    print(f"Excel rows number: {written}\n")
+    return written
 
 
-def create_zip(zip_path: Path, files: List[Path]) -> None:
-    """Crea uno zip contenente i file indicati; ignora i file mancanti."""
-    with zipfile.ZipFile(zip_path, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for file_path in files:
-            if file_path.exists():
-                zf.write(file_path, arcname=file_path.name)
+def export_results_view(output_path: Path, **filters: Any) -> int:
+    """
+    Excel di una selezione dello storico risultati, da qualsiasi run, es.
+    export_results_view(path, since="2026-07-01", accenture_value="FALSE").
+    """
+    rows = query_results(**filters).to_dict("records")
+    return write_rows_to_excel(rows, output_path=output_path, headers=RUN_FIELDS + OUTPUT_FIELDS)
 
 
 def _build_processed_filenames(processed_dir: Path) -> set:
@@ -383,72 +422,237 @@ def _detect_role(subfolder: Path) -> str:
     return ""
 
 
-def process_directory(
+def _list_pdfs(input_dir: Path, limit: Optional[int]) -> List[Path]:
+    files = sorted(p for p in input_dir.iterdir() if p.suffix.lower() == ".pdf")
+    return files[:limit] if limit is not None else files
+
+
+def _process_file(
+    headers: Dict[str, str],
+    pdf_path: Path,
+    extract: Callable[[], Dict[str, Any]],
+    processed_filenames: Optional[set],
+) -> Dict[str, str]:
+    """Estrae e arricchisce un singolo CV; gli errori finiscono nella colonna note."""
+    note = ""
+
+    raw = {}
+    try:
+        raw = extract()
+        data = sanitize_fields(raw)
+    except Exception as exc:  # noqa: BLE001
+        note = f"errore: {exc}"
+        data = sanitize_fields({})
+
+    cand_email = raw.get("email")
+    created_at = None
+    if cand_email:
+        manatal_link, match_details, created_at = get_candidate_info(headers, cand_email)
+    else:
+        manatal_link, match_details = "", []
+
+    manatal_jobs = "\n".join(m["job"] for m in match_details) if match_details else ""
+    manatal_stages = "\n".join(m["stage"] for m in match_details) if match_details else ""
+    manatal_dropped = "\n".join(str(m["is_dropped"]) for m in match_details) if match_details else ""
+    manatal_drop_dates = "\n".join(m["drop_date"] for m in match_details) if match_details else ""
+
+    # ── Duplicate detection ──────────────────────────────────────
+    is_duplicate = False
+    if created_at and created_at[:10] >= DUPLICATE_CUTOFF:
+        is_duplicate = True
+    if processed_filenames and pdf_path.name in processed_filenames:
+        is_duplicate = True
+
+    return {
+        "file_name": pdf_path.name,
+        **data,
+        "manatal_link": manatal_link,
+        "manatal_job": manatal_jobs,
+        "manatal_stage": manatal_stages,
+        "manatal_is_dropped": manatal_dropped,
+        "manatal_drop_date": manatal_drop_dates,
+        "is_duplicate": is_duplicate,
+        "note": note,
+    }
+
+
+def iter_directory(
     headers: Dict[str, str],
     input_dir: Path,
     model: str,
-    pause: float,
+    max_workers: int,
+    requests_per_minute: Optional[float],
     limit: Optional[int],
     processed_filenames: set = None,
-) -> List[Dict[str, str]]:
-    files = sorted(p for p in input_dir.iterdir() if p.suffix.lower() == ".pdf")
-    if limit is not None:
-        files = files[:limit]
+    extractions: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Iterator[Dict[str, str]]:
+    """
+    Elabora i PDF in parallelo (al massimo max_workers richieste in volo,
+    requests_per_minute chiamate al modello) e restituisce le righe
+    nello stesso ordine dei file, ognuna appena è pronta. Con `extractions`
+    (modalità batch) usa i risultati già pronti invece di chiamare il modello.
+    """
+    files = _list_pdfs(input_dir, limit)
+    if not files:
+        return
 
     client = OpenAI()
-    rows: List[Dict[str, str]] = []
-    for idx, pdf_path in enumerate(files, start=1):
+    limiter = RateLimiter(requests_per_minute, per=60.0, burst=max_workers)
+
+    def call_model(pdf_path: Path) -> Dict[str, Any]:
+        limiter.acquire()
+        return call_model_with_pdf_file(client, pdf_path, model)
+
+    def extractor(pdf_path: Path) -> Callable[[], Dict[str, Any]]:
+        # Fuori dal batch (es. CV aggiunto dopo l'invio): estrazione sincrona
+        if extractions is None or pdf_path.name not in extractions:
+            return lambda: cached_extraction(
+                pdf_path, model, PROMPT_FINGERPRINT, CACHE_SCOPE, lambda: call_model(pdf_path),
+            )
+
+        def from_batch() -> Dict[str, Any]:
+            result = extractions[pdf_path.name]
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            return result["raw"]
+        return from_batch
+
+    def work(item):
+        idx, pdf_path = item
         print(f"[{idx}/{len(files)}] Lavoro su: {pdf_path.name}")
-        note = ""
-
-        raw = {}
+        started = time.perf_counter()
+        row = _process_file(headers, pdf_path, extractor(pdf_path), processed_filenames)
+        # Fuori da OUTPUT_FIELDS: finiscono solo nello storico dei risultati
+        row["file_hash"] = hash_file(pdf_path)
+        row["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        return row
+
+    workers = max(1, max_workers)
+    items = iter(enumerate(files, start=1))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Finestra limitata di file in coda: al primo errore (es. Manatal) le
+        # chiamate al modello non ancora partite vengono annullate
+        queued = deque(executor.submit(work, item) for item in islice(items, SUBMIT_WINDOW * workers))
         try:
-            raw = call_model_with_pdf_file(client, pdf_path, model)
-            data = sanitize_fields(raw)
-        except Exception as exc:  # noqa: BLE001
-            note = f"errore: {exc}"
-            data = sanitize_fields({})
-
-        cand_email = raw.get("email")
-        created_at = None
-        if cand_email:
-            manatal_link, match_details, created_at = get_candidate_info(headers, cand_email)
+            while queued:
+                row = queued.popleft().result()
+                queued.extend(executor.submit(work, item) for item in islice(items, 1))
+                yield row
+        finally:
+            for future in queued:
+                future.cancel()
+
+
+def process_directory(
+    headers: Dict[str, str],
+    input_dir: Path,
+    model: str,
+    max_workers: int,
+    requests_per_minute: Optional[float],
+    limit: Optional[int],
+    processed_filenames: set = None,
+    extractions: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> List[Dict[str, str]]:
+    """Come iter_directory, ma restituisce tutte le righe a fine elaborazione."""
+    return list(iter_directory(
+        headers=headers,
+        input_dir=input_dir,
+        model=model,
+        max_workers=max_workers,
+        requests_per_minute=requests_per_minute,
+        limit=limit,
+        processed_filenames=processed_filenames,
+        extractions=extractions,
+    ))
+
+
+def run_batch_extraction(
+    input_dir: Path,
+    model: str,
+    limit: Optional[int],
+    poll_seconds: float,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Estrae i CV di una sottocartella con la Batch API: i PDF già in cache
+    non vengono inviati, gli altri finiscono in un unico job. Lo stato del job
+    è salvato in BATCH_STATE_FILE, quindi se il processo muore durante
+    l'attesa il run successivo riprende lo stesso batch; i PDF aggiunti dopo
+    l'invio restano fuori dal risultato e vengono estratti in modo sincrono.
+    Restituisce file_name -> {"raw": ...} oppure {"error": ...}.
+    """
+    files = _list_pdfs(input_dir, limit)
+    client = OpenAI()
+    state_path = input_dir / BATCH_STATE_FILE
+
+    results: Dict[str, Dict[str, Any]] = {}
+    pending: List[Path] = []
+    hashes: Dict[str, str] = {}
+    for pdf_path in files:
+        hashes[pdf_path.name] = hash_file(pdf_path)
+        raw = get_extraction(hashes[pdf_path.name], model, PROMPT_FINGERPRINT)
+        if raw is not None:
+            results[pdf_path.name] = {"raw": raw}
         else:
-            manatal_link, match_details = "", []
-
-        manatal_jobs = "\n".join(m["job"] for m in match_details) if match_details else ""
-        manatal_stages = "\n".join(m["stage"] for m in match_details) if match_details else ""
-        manatal_dropped = "\n".join(str(m["is_dropped"]) for m in match_details) if match_details else ""
-        manatal_drop_dates = "\n".join(m["drop_date"] for m in match_details) if match_details else ""
-
-        # ── Duplicate detection ──────────────────────────────────────
-        is_duplicate = False
-        if created_at and created_at[:10] >= DUPLICATE_CUTOFF:
-            is_duplicate = True
-        if processed_filenames and pdf_path.name in processed_filenames:
-            is_duplicate = True
-
-        row = {
-            "file_name": pdf_path.name,
-            **data,
-            "manatal_link": manatal_link,
-            "manatal_job": manatal_jobs,
-            "manatal_stage": manatal_stages,
-            "manatal_is_dropped": manatal_dropped,
-            "manatal_drop_date": manatal_drop_dates,
-            "is_duplicate": is_duplicate,
-            "note": note,
+            pending.append(pdf_path)
+
+    print(f"Batch: {len(results)} CV già in cache, {len(pending)} da estrarre.")
+    if not pending:
+        state_path.unlink(missing_ok=True)
+        return results
+
+    state = load_batch_state(state_path)
+    if state and state.get("model") == model and state.get("prompt_fp") == PROMPT_FINGERPRINT:
+        print(f"Riprendo il batch {state['batch_id']} salvato in {state_path}")
+        submitted = set(state.get("custom_ids") or [p.name for p in pending])
+        added = [p for p in pending if p.name not in submitted]
+        if added:
+            print(f"{len(added)} CV aggiunti dopo l'invio del batch: estratti senza Batch API.")
+        pending = [p for p in pending if p.name in submitted]
+    else:
+        text_layers = {p.name: usable_text_layer(p) for p in pending}
+        bodies = {
+            p.name: {
+                "model": model,
+                "temperature": 0,
+                "response_format": {"type": "json_object"},
+                "messages": build_cv_messages(p, text_layers[p.name]),
+            }
+            for p in pending
         }
-        rows.append(row)
+        batch_id = submit_batch(client, bodies, input_dir / BATCH_REQUESTS_FILE, description=input_dir.name)
+        state = {"batch_id": batch_id, "model": model, "prompt_fp": PROMPT_FINGERPRINT, "custom_ids": sorted(bodies)}
+        save_batch_state(state_path, state)
 
-        if pause > 0 and idx < len(files):
-            time.sleep(pause)
+    batch = wait_for_batch(client, state["batch_id"], poll_seconds)
+    outputs = collect_batch_results(client, batch)
 
-    return rows
+    for pdf_path in pending:
+        output = outputs.get(pdf_path.name)
+        if output is None:
+            results[pdf_path.name] = {"error": f"batch {batch.status}: nessun risultato"}
+            continue
+        if "error" in output:
+            results[pdf_path.name] = {"error": output["error"]}
+            continue
+        try:
+            raw = parse_model_content(output["content"], usable_text_layer(pdf_path))
+        except RuntimeError as exc:
+            results[pdf_path.name] = {"error": str(exc)}
+            continue
+        put_extraction(hashes[pdf_path.name], model, PROMPT_FINGERPRINT, CACHE_SCOPE, raw)
+        results[pdf_path.name] = {"raw": raw}
+
+    # I risultati sono in cache: il job non serve più
+    state_path.unlink(missing_ok=True)
+    return results
 
 
 def main() -> None:
     input_dir = Path(INPUT_DIR)
+    if BATCH_MODE:
+        # Avanzamento del batch (services.openai_batch) a video
+        logging.basicConfig(format="%(message)s")
+        logging.getLogger("openai_batch").setLevel(logging.INFO)
 
     if not input_dir.is_dir():
         raise SystemExit(f"Cartella di input non trovata: {input_dir}")
@@ -481,6 +685,10 @@ def main() -> None:
     if not subfolders:
         raise SystemExit(f"Nessuna sottocartella trovata in: {input_dir}")
 
+    removed = invalidate_stale_prompts(CACHE_SCOPE, PROMPT_FINGERPRINT) + prune()
+    if removed:
+        print(f"Cache estrazioni: rimosse {removed} voci obsolete.\n")
+
     headers = build_headers()
     timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
     processed_filenames = _build_processed_filenames(input_dir / "cvs_processed")
@@ -506,38 +714,57 @@ def main() -> None:
         else:
             print("Nessun duplicato interno trovato.")
 
-        rows = process_directory(
+        extractions = None
+        if BATCH_MODE:
+            extractions = run_batch_extraction(subfolder, MODEL, LIMIT, BATCH_POLL_SECONDS)
+
+        output_dir = Path(f"output_{role_prefix}{subfolder.name}_{timestamp_str}")
+        output_dir.mkdir(exist_ok=True)
+
+        zip_paths = {
+            "accepted": output_dir / f"cv_approvati_{role_prefix}{subfolder.name}_{timestamp_str}.zip",
+            "rejected": output_dir / f"cv_rifiutati_{role_prefix}{subfolder.name}_{timestamp_str}.zip",
+            "duplicate": output_dir / f"cv_duplicati_{role_prefix}{subfolder.name}_{timestamp_str}.zip",
+        }
+        duplicate_files: List[Path] = []
+
+        def track_decisions(rows: Iterable[Dict[str, str]], zips: ZipPackager) -> Iterator[Dict[str, str]]:
+            # Ogni CV entra nel suo zip appena la decisione è nota
+            for row in rows:
+                pdf_path = subfolder / row.get("file_name", "")
+                decision = (row.get("decision") or "").upper()
+                if row.get("is_duplicate"):
+                    duplicate_files.append(pdf_path)
+                    zips.add("duplicate", pdf_path)
+                elif decision == "ACCETTATO":
+                    zips.add("accepted", pdf_path)
+                elif decision == "RIFIUTATO":
+                    zips.add("rejected", pdf_path)
+                yield row
+
+        # Le righe finiscono nell'Excel man mano che le estrazioni terminano
+        excel_path = output_dir / f"cv_{role_prefix}{subfolder.name}_{timestamp_str}.xlsx"
+        rows = iter_directory(
             headers=headers,
             input_dir=subfolder,
             model=MODEL,
-            pause=PAUSE,
+            max_workers=MAX_WORKERS,
+            requests_per_minute=REQUESTS_PER_MINUTE,
             limit=LIMIT,
             processed_filenames=processed_filenames,
+            extractions=extractions,
         )
-
-        output_dir = Path(f"output_{role_prefix}{subfolder.name}_{timestamp_str}")
-        output_dir.mkdir(exist_ok=True)
-
-        excel_path = output_dir / f"cv_{role_prefix}{subfolder.name}_{timestamp_str}.xlsx"
-        write_rows_to_excel(rows, output_path=excel_path, headers=OUTPUT_FIELDS)
+        run_info = {"folder": subfolder.name, "role": role, "model": MODEL, "prompt_fp": PROMPT_FINGERPRINT}
+        with ResultRun(f"{timestamp_str}_{role_prefix}{subfolder.name}", OUTPUT_FIELDS, **run_info) as run, \
+                ZipPackager(zip_paths) as zips:
+            write_rows_to_excel(run.record(track_decisions(rows, zips)), output_path=excel_path, headers=OUTPUT_FIELDS)
+        zipped = zips.close()  # già chiusi dal with: restituisce solo i conteggi
         print(f"Excel salvato in: {excel_path}")
+        print(f"Risultati registrati in: {run.path}")
+        print(f"Zip ACCETTATI: {zip_paths['accepted']} ({zipped['accepted']} file)")
+        print(f"Zip RIFIUTATI: {zip_paths['rejected']} ({zipped['rejected']} file)")
 
-        accepted_files: List[Path] = []
-        rejected_files: List[Path] = []
-        duplicate_files: List[Path] = []
-
-        for row in rows:
-            pdf_path = subfolder / row.get("file_name", "")
-            if row.get("is_duplicate"):
-                duplicate_files.append(pdf_path)
-                continue
-            decision = (row.get("decision") or "").upper()
-            if decision == "ACCETTATO":
-                accepted_files.append(pdf_path)
-            elif decision == "RIFIUTATO":
-                rejected_files.append(pdf_path)
-
-        # Move duplicate CVs to dedicated folder
+        # Move duplicate CVs to dedicated folder (già copiati nel loro zip)
         if duplicate_files:
             dup_dir = output_dir / "cv_duplicati"
             dup_dir.mkdir(exist_ok=True)
@@ -545,13 +772,6 @@ def main() -> None:
                 if dup_path.exists():
                     shutil.move(str(dup_path), str(dup_dir / dup_path.name))
             print(f"Duplicati spostati in: {dup_dir} ({len(duplicate_files)} file)")
-
-        zip_accept_path = output_dir / f"cv_approvati_{role_prefix}{subfolder.name}_{timestamp_str}.zip"
-        zip_reject_path = output_dir / f"cv_rifiutati_{role_prefix}{subfolder.name}_{timestamp_str}.zip"
-        create_zip(zip_accept_path, accepted_files)
-        create_zip(zip_reject_path, rejected_files)
-        print(f"Zip ACCETTATI: {zip_accept_path}")
-        print(f"Zip RIFIUTATI: {zip_reject_path}")
         print(f"\nOutput in: {output_dir}")
 
         # Move processed subfolder to cvs_processed
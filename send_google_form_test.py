@@ -1,10 +1,11 @@
 import os
-import time
 
 from dotenv import load_dotenv
 
 from config.boards import BOARDS
-from services.gmail_service import send_templated_email, EMAIL_SUBJECT
+from services.email_templates import load_template
+from services.gmail_service import EMAIL_SUBJECT
+from services.mail_queue import MailWorker, enqueue_templated
 from services.manatal_service import (
     build_headers,
     fetch_stage_ids,
@@ -18,7 +19,8 @@ load_dotenv()
 
 # ── Configuration ─────────────────────────────────────────────────────
 EMAIL_BODY_FILE = os.getenv("SEND_TEST_EMAIL_BODY_FILE")
-SLEEP_SECONDS = 33
+MAIL_INTERVAL_SECONDS = float(os.getenv("SEND_TEST_MAIL_INTERVAL_SECONDS", "33"))  # intervallo minimo tra due email inviate dalla coda
+MAIL_SOURCE = "send_google_form_test"  # il worker di questo script invia solo le email accodate qui
 
 # ── Toggle which boards to process ───────────────────────────────
 SEND_TL = True
@@ -27,6 +29,10 @@ SEND_DEV = False
 
 
 def main() -> None:
+    # Template non validi: errore subito, prima di toccare Manatal o accodare email
+    if EMAIL_BODY_FILE:
+        load_template(EMAIL_BODY_FILE)
+
     headers = build_headers()
 
     boards_to_send = []
@@ -35,39 +41,38 @@ def main() -> None:
     if SEND_DEV:
         boards_to_send.append("DEV")
 
-    for board in boards_to_send:
-        cfg = BOARDS[board]
-        job_id = cfg["job_id"]
-        from_stage = cfg["stages"]["test_preliminare"]
-        to_stage = cfg["stages"]["colloquio_tecnico"]
-
-        if not job_id:
-            raise SystemExit(f"JOB_ID mancante per {board}.")
+    with MailWorker(min_interval=MAIL_INTERVAL_SECONDS, source=MAIL_SOURCE):
+        for board in boards_to_send:
+            cfg = BOARDS[board]
+            job_id = cfg["job_id"]
+            from_stage = cfg["stages"]["test_preliminare"]
+            to_stage = cfg["stages"]["colloquio_tecnico"]
 
-        print(f"\n══ {board} / {from_stage} ══")
+            if not job_id:
+                raise SystemExit(f"JOB_ID mancante per {board}.")
 
-        stage_map = fetch_stage_ids(headers, [from_stage, to_stage])
-        from_stage_id = stage_map.get(from_stage)
-        to_stage_id = stage_map.get(to_stage)
-        if from_stage_id is None or to_stage_id is None:
-            raise SystemExit(f"Stage non trovati: {stage_map}")
+            print(f"\n══ {board} / {from_stage} ══")
 
-        print(f"Cerco match in '{from_stage}' per job {job_id}...")
-        selected = fetch_matches_with_candidates(headers, job_id, from_stage_id, stage_name=from_stage)
-        print(f"Trovati {len(selected)} match nello stage di origine.")
+            stage_map = fetch_stage_ids(headers, [from_stage, to_stage])
+            from_stage_id = stage_map.get(from_stage)
+            to_stage_id = stage_map.get(to_stage)
+            if from_stage_id is None or to_stage_id is None:
+                raise SystemExit(f"Stage non trovati: {stage_map}")
 
-        for idx, (match, candidate) in enumerate(selected, start=1):
-            cand_fullname, cand_first_name = get_candidate_names(candidate)
-            cand_email = str(candidate.get("email") or "").strip()
-            print(f"- Match {match['id']} / candidato #{idx} - {cand_fullname} ({cand_email or '!!! EMAIL MANCANTE !!!'})")
+            print(f"Cerco match in '{from_stage}' per job {job_id}...")
+            selected = fetch_matches_with_candidates(headers, job_id, from_stage_id, stage_name=from_stage)
+            print(f"Trovati {len(selected)} match nello stage di origine.")
 
-            # move_match(headers, int(match["id"]), to_stage_id)
-            # print(f"  Spostato in '{to_stage}'.")
+            for idx, (match, candidate) in enumerate(selected, start=1):
+                cand_fullname, cand_first_name = get_candidate_names(candidate)
+                cand_email = str(candidate.get("email") or "").strip()
+                print(f"- Match {match['id']} / candidato #{idx} - {cand_fullname} ({cand_email or '!!! EMAIL MANCANTE !!!'})")
 
-            send_templated_email(cand_email, EMAIL_SUBJECT, EMAIL_BODY_FILE, cand_first_name)
-            print("  Email inviata.")
+                # move_match(headers, int(match["id"]), to_stage_id)
+                # print(f"  Spostato in '{to_stage}'.")
 
-            time.sleep(SLEEP_SECONDS)
+                enqueue_templated(cand_email, EMAIL_SUBJECT, EMAIL_BODY_FILE, cand_first_name, MAIL_SOURCE)
+                print("  Email in coda.")
 
 
 if __name__ == "__main__":
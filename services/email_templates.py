@@ -0,0 +1,71 @@
+"""
+Email templates — registry of the emails_body/*.txt bodies.
+Each template is read and validated once, then served from memory until the
+file changes on disk (mtime) or is reloaded explicitly after an edit.
+"""
+
+import string
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+from services.local_db import PROJECT_ROOT
+
+TEMPLATES_DIR = PROJECT_ROOT / "emails_body"
+ALLOWED_PLACEHOLDERS = {"name"}
+
+# resolved path -> (mtime_ns, text)
+_registry: Dict[Path, Tuple[int, str]] = {}
+_registry_lock = threading.Lock()
+
+
+class TemplateError(ValueError):
+    """A template uses placeholders other than {name}, or has unbalanced braces."""
+
+
+def validate_template(text: str, source: str = "template") -> None:
+    try:
+        fields = [field for _, field, _, _ in string.Formatter().parse(text) if field is not None]
+    except ValueError as exc:
+        raise TemplateError(f"{source}: {exc}") from exc
+    unknown = sorted({f for f in fields if f not in ALLOWED_PLACEHOLDERS})
+    if unknown:
+        raise TemplateError(f"{source}: placeholder non supportati {unknown} (ammesso solo {{name}})")
+
+
+def load_template(path: Union[str, Path]) -> str:
+    """Template text, re-read only if the file changed since the last load."""
+    resolved = Path(path).resolve()
+    mtime = resolved.stat().st_mtime_ns
+    with _registry_lock:
+        cached = _registry.get(resolved)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    text = resolved.read_text(encoding="utf-8")
+    validate_template(text, resolved.name)
+    with _registry_lock:
+        _registry[resolved] = (mtime, text)
+    return text
+
+
+def render_template(path: Union[str, Path], name: str) -> str:
+    return load_template(path).format(name=name)
+
+
+def reload_template(path: Union[str, Path]) -> str:
+    """Drop the cached copy (e.g. after an edit from the web UI) and load it again."""
+    resolved = Path(path).resolve()
+    with _registry_lock:
+        _registry.pop(resolved, None)
+    return load_template(resolved)
+
+
+def list_templates(directory: Union[str, Path] = TEMPLATES_DIR) -> List[Dict[str, str]]:
+    """Every template in the directory; invalid ones are listed with their error so they can be fixed."""
+    templates = []
+    for f in sorted(Path(directory).glob("*.txt")):
+        try:
+            templates.append({"filename": f.name, "content": load_template(f), "error": ""})
+        except TemplateError as exc:
+            templates.append({"filename": f.name, "content": f.read_text(encoding="utf-8"), "error": str(exc)})
+    return templates
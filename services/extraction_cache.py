@@ -0,0 +1,127 @@
+"""
+Extraction cache — stores the JSON returned by the model for each PDF,
+keyed by file SHA-256 + model + prompt fingerprint.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from services.file_utils import hash_file
+from services.local_db import connect
+
+DB_NAME = "extractions"
+
+# ── Eviction policy ───────────────────────────────────────────────────
+MAX_ENTRIES = 20_000
+MAX_AGE_DAYS = 365
+# ──────────────────────────────────────────────────────────────────
+
+
+def _connect():
+    conn = connect(DB_NAME)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS extractions (
+            file_hash    TEXT NOT NULL,
+            model        TEXT NOT NULL,
+            prompt_fp    TEXT NOT NULL,
+            scope        TEXT NOT NULL,
+            raw_json     TEXT NOT NULL,
+            created_at   TEXT NOT NULL,
+            last_used_at TEXT NOT NULL,
+            PRIMARY KEY (file_hash, model, prompt_fp)
+        )
+        """
+    )
+    return conn
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def prompt_fingerprint(*prompts: str) -> str:
+    """Short hash of the prompts: any edit to them changes the cache key."""
+    digest = hashlib.sha256()
+    for prompt in prompts:
+        digest.update(prompt.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def get_extraction(file_hash: str, model: str, prompt_fp: str) -> Optional[Dict]:
+    conn = _connect()
+    row = conn.execute(
+        "SELECT raw_json FROM extractions WHERE file_hash = ? AND model = ? AND prompt_fp = ?",
+        (file_hash, model, prompt_fp),
+    ).fetchone()
+    if row is not None:
+        conn.execute(
+            "UPDATE extractions SET last_used_at = ? WHERE file_hash = ? AND model = ? AND prompt_fp = ?",
+            (_now(), file_hash, model, prompt_fp),
+        )
+        conn.commit()
+    conn.close()
+    return json.loads(row["raw_json"]) if row else None
+
+
+def put_extraction(file_hash: str, model: str, prompt_fp: str, scope: str, raw: Dict) -> None:
+    now = _now()
+    conn = _connect()
+    conn.execute(
+        "INSERT OR REPLACE INTO extractions "
+        "(file_hash, model, prompt_fp, scope, raw_json, created_at, last_used_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (file_hash, model, prompt_fp, scope, json.dumps(raw, ensure_ascii=False), now, now),
+    )
+    conn.commit()
+    conn.close()
+
+
+def cached_extraction(
+    pdf_path: Path,
+    model: str,
+    prompt_fp: str,
+    scope: str,
+    extract: Callable[[], Dict],
+) -> Dict:
+    """Return the cached JSON for the PDF, calling `extract` only on a miss."""
+    file_hash = hash_file(pdf_path)
+    raw = get_extraction(file_hash, model, prompt_fp)
+    if raw is None:
+        raw = extract()
+        put_extraction(file_hash, model, prompt_fp, scope, raw)
+    return raw
+
+
+def invalidate_stale_prompts(scope: str, prompt_fp: str) -> int:
+    """Drop the entries of `scope` produced by a previous version of its prompts."""
+    conn = _connect()
+    cur = conn.execute(
+        "DELETE FROM extractions WHERE scope = ? AND prompt_fp != ?",
+        (scope, prompt_fp),
+    )
+    conn.commit()
+    conn.close()
+    return cur.rowcount
+
+
+def prune(max_entries: int = MAX_ENTRIES, max_age_days: int = MAX_AGE_DAYS) -> int:
+    """Evict entries unused for max_age_days, then the least recently used above max_entries."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).isoformat()
+    conn = _connect()
+    removed = conn.execute("DELETE FROM extractions WHERE last_used_at < ?", (cutoff,)).rowcount
+    removed += conn.execute(
+        """
+        DELETE FROM extractions WHERE rowid IN (
+            SELECT rowid FROM extractions ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+        )
+        """,
+        (max_entries,),
+    ).rowcount
+    conn.commit()
+    conn.close()
+    return removed
@@ -0,0 +1,147 @@
+"""
+Funnel engine — per-stage funnel counts of a job's matches over many date ranges.
+The matches are parsed once into columns (updated_at, stage, state) sorted by
+date; a range is then a slice found with searchsorted and its per-stage counts
+come from prefix sums, so each extra range costs O(stages), not O(matches).
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# A range is (label, since, until): since inclusive, until exclusive
+DateRange = Tuple[str, datetime, datetime]
+
+EXCLUDED_RANKS = ("1", "5", "6", "7")
+
+# Match states, the last axis of the prefix sums
+DROPPED, STANDING, OTHER = 0, 1, 2
+
+
+def parse_updated_at(match: Dict[str, object]) -> Optional[datetime]:
+    """updated_at as a naive datetime (the wall time of the string, offset dropped)."""
+    updated_at = match.get("updated_at")
+    if not updated_at:
+        return None
+    return datetime.fromisoformat(str(updated_at).replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def _state(match: Dict[str, object]) -> int:
+    is_active = match.get("is_active")
+    if is_active is False:
+        return DROPPED
+    if is_active is True:
+        return STANDING
+    return OTHER
+
+
+class FunnelIndex:
+    """Columnar view of a job's matches, built once and queried for any number of ranges."""
+
+    def __init__(self, matches: Iterable[Dict[str, object]]):
+        stamps: List[datetime] = []
+        keys: List[Tuple[object, str]] = []
+        states: List[int] = []
+        for m in matches:
+            if m.get("rank") in EXCLUDED_RANKS:
+                continue
+            stamp = parse_updated_at(m)
+            if stamp is None:
+                continue
+            stage = m.get("job_pipeline_stage") or {}
+            stamps.append(stamp)
+            keys.append((stage.get("rank"), stage.get("name")))
+            states.append(_state(m))
+
+        # Stages in funnel order: by rank, ties in order of first appearance
+        ordered = sorted(dict.fromkeys(keys), key=lambda key: key[0] if key[0] is not None else 0)
+        position = {key: i for i, key in enumerate(ordered)}
+        self.stages: List[Tuple[object, str]] = ordered
+        codes = np.array([position[key] * 3 + state for key, state in zip(keys, states)], dtype=np.int64)
+
+        stamp_array = np.array(stamps, dtype="datetime64[us]")
+        order = np.argsort(stamp_array, kind="stable")
+        self.updated_at = stamp_array[order]
+        # prefix[i, stage, state] = matches among the first i (by date) in that stage/state
+        n = len(stamps)
+        counts = np.zeros((n + 1, max(len(ordered), 1) * 3), dtype=np.int32)
+        counts[np.arange(1, n + 1), codes[order]] = 1
+        self._prefix = np.cumsum(counts, axis=0, dtype=np.int32).reshape(n + 1, -1, 3)
+
+    def __len__(self) -> int:
+        return len(self.updated_at)
+
+    def counts(self, since: datetime, until: datetime) -> np.ndarray:
+        """(stages, 3) matrix of dropped/standing/other matches with since <= updated_at < until."""
+        lo, hi = np.searchsorted(self.updated_at, np.array([since, until], dtype="datetime64[us]"), side="left")
+        return self._prefix[hi] - self._prefix[lo]
+
+    def stage_rows(self, since: datetime, until: datetime) -> List[Dict[str, object]]:
+        """Funnel rows of one range, in stage order; stages without matches in the range are left out."""
+        per_stage = self.counts(since, until)
+        in_range = int(per_stage.sum())
+        rows: List[Dict[str, object]] = []
+        matches_left = in_range
+
+        for (rank, name), (dropped, standing, other) in zip(self.stages, per_stage.tolist()):
+            if dropped + standing + other == 0:
+                continue
+            total = matches_left
+            passed = total - dropped - standing
+            rows.append({
+                "stage_name": name,
+                "stage_rank": rank if rank is not None else 0,
+                "drop": dropped,
+                "standing": standing,
+                "pass": passed,
+                "total": total,
+                "perc_pass": round(passed / total, 2),
+                "perc_drop": round(dropped / total, 2),
+                "perc_drop_cum": round(dropped / in_range, 2),
+            })
+            matches_left = passed
+        return rows
+
+
+# ── Range generators ─────────────────────────────────────────────────
+
+def _day(value: date) -> datetime:
+    return datetime(value.year, value.month, value.day)
+
+
+def year_ranges(start: date, end: date) -> List[DateRange]:
+    """Every calendar year touching [start, end), clipped to it."""
+    return [
+        (str(year), max(_day(start), datetime(year, 1, 1)), min(_day(end), datetime(year + 1, 1, 1)))
+        for year in range(start.year, end.year + 1)
+        if datetime(year, 1, 1) < _day(end)
+    ]
+
+
+def month_ranges(start: date, end: date) -> List[DateRange]:
+    """Every calendar month touching [start, end), clipped to it."""
+    ranges: List[DateRange] = []
+    month = datetime(start.year, start.month, 1)
+    while month < _day(end):
+        following = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+        ranges.append((month.strftime("%Y-%m"), max(month, _day(start)), min(following, _day(end))))
+        month = following
+    return ranges
+
+
+def iso_week_ranges(start: date, end: date) -> List[DateRange]:
+    """Every ISO week (Monday to Monday) touching [start, end), clipped to it."""
+    ranges: List[DateRange] = []
+    week = _day(start) - timedelta(days=start.weekday())
+    while week < _day(end):
+        following = week + timedelta(days=7)
+        year, number, _ = week.isocalendar()
+        ranges.append((f"{year}-W{number:02d}", max(week, _day(start)), min(following, _day(end))))
+        week = following
+    return ranges
+
+
+def rolling_ranges(end: date, days: Sequence[int]) -> List[DateRange]:
+    """The last N days up to `end` (exclusive), one range per window length."""
+    return [(f"ultimi {n} giorni", _day(end) - timedelta(days=n), _day(end)) for n in days]
@@ -7,14 +7,16 @@ import logging
 import os
 import re
 import smtplib
+import time
 from email.message import EmailMessage
-from pathlib import Path
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 
+from services.email_templates import render_template
+
 log = logging.getLogger("gmail_service")
 
 # ── Configuration ─────────────────────────────────────────────────────
@@ -23,6 +25,12 @@ GMAIL_TOKEN_FILE       = "config/token.json"
 GMAIL_SCOPES           = ["https://www.googleapis.com/auth/gmail.readonly"]
 GMAIL_MAX_RESULTS      = 50
 EMAIL_SUBJECT          = "Candidatura Zupit"
+RECRUITMENT_SUBJECT    = "RECRUITMENT Candidatura Spontanea"
+RECRUITMENT_AFTER      = "2026/01/01"
+RECRUITMENT_MARKER     = "Informazioni aggiuntive:"
+GMAIL_LIST_PAGE_SIZE   = 500   # max consentito da messages().list
+GMAIL_BATCH_SIZE       = 50    # Google consiglia <= 50 richieste per batch
+GMAIL_BATCH_RETRIES    = 3
 
 
 # ── Send (SMTP) ──────────────────────────────────────────────────────
@@ -56,8 +64,7 @@ def send_templated_email(
     app_password = os.getenv("GMAIL_APP_PASSWORD", "")
     if not user or not app_password or not to_email:
         return
-    body = Path(template_path).read_text(encoding="utf-8").format(name=name)
-    send_gmail(user, app_password, to_email, subject, body)
+    send_gmail(user, app_password, to_email, subject, render_template(template_path, name))
 
 
 # ── Read (Gmail API) ─────────────────────────────────────────────────
@@ -121,41 +128,96 @@ def extract_email(from_header: str) -> str:
     return match.group(1).lower() if match else from_header.strip().lower()
 
 
-def fetch_recruitment_email_for(service, email: str, subject_prefix: str) -> dict | None:
-    """
-    Search Gmail for a recruitment email from a specific sender.
-    Returns {"subject": ..., "body": ...} or None.
-    """
-    query = f'from:{email} subject:"RECRUITMENT Candidatura Spontanea" after:2026/01/01'
-    log.debug("Gmail query for %s: %s", email, query)
-
-    results = service.users().messages().list(userId="me", q=query, maxResults=5).execute()
-    messages = results.get("messages", [])
-
-    if not messages:
-        log.debug("  No Gmail messages found for %s", email)
+def _recruitment_body(raw_body: str) -> str | None:
+    """Keep only the "Informazioni aggiuntive" section of a recruitment email."""
+    idx = raw_body.find(RECRUITMENT_MARKER)
+    if idx == -1:
         return None
+    return raw_body[idx + len(RECRUITMENT_MARKER):].strip()
 
-    for msg_meta in messages:
-        msg = service.users().messages().get(userId="me", id=msg_meta["id"], format="full").execute()
-        headers = {h["name"]: h["value"] for h in msg["payload"].get("headers", [])}
-        subject = headers.get("Subject", "")
-
-        if not subject.startswith(subject_prefix):
-            log.debug("  SKIPPED — %r", subject)
-            continue
 
-        raw_body = decode_body(msg["payload"])
+# ── Read in bulk (one query + batch requests) ────────────────────────
 
-        # Extract only "Informazioni aggiuntive" section
-        marker = "Informazioni aggiuntive:"
-        idx = raw_body.find(marker)
-        if idx == -1:
-            log.debug("  No 'Informazioni aggiuntive' for %s", email)
-            return None
+def list_message_ids(service, query: str) -> list[str]:
+    """All message ids matching a Gmail query, following nextPageToken."""
+    ids: list[str] = []
+    page_token = None
+    while True:
+        kwargs = {"userId": "me", "q": query, "maxResults": GMAIL_LIST_PAGE_SIZE}
+        if page_token:
+            kwargs["pageToken"] = page_token
+        results = service.users().messages().list(**kwargs).execute()
+        ids.extend(m["id"] for m in results.get("messages", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            return ids
 
-        body = raw_body[idx + len(marker):].strip()
-        log.info("  Found email body for %s (%d chars)", email, len(body))
-        return {"subject": subject, "body": body}
 
+def fetch_messages_batch(service, message_ids: list[str], batch_size: int = GMAIL_BATCH_SIZE) -> dict[str, dict]:
+    """
+    Fetch full messages through Gmail batch requests ({id: message}).
+    Parts that fail (e.g. per-part 429) are retried in a later round.
+    """
+    messages: dict[str, dict] = {}
+    pending = list(dict.fromkeys(message_ids))
+
+    for attempt in range(GMAIL_BATCH_RETRIES + 1):
+        failed: list[str] = []
+
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                failed.append(request_id)
+            else:
+                messages[request_id] = response
+
+        for start in range(0, len(pending), batch_size):
+            batch = service.new_batch_http_request(callback=on_response)
+            for msg_id in pending[start:start + batch_size]:
+                batch.add(service.users().messages().get(userId="me", id=msg_id, format="full"), request_id=msg_id)
+            batch.execute()
+
+        if not failed:
+            break
+        pending = failed
+        if attempt < GMAIL_BATCH_RETRIES:
+            log.warning("Gmail batch: %d messages failed, retrying (%d/%d)", len(failed), attempt + 1, GMAIL_BATCH_RETRIES)
+            time.sleep(2 ** attempt)
+    else:
+        log.error("Gmail batch: giving up on %d messages", len(pending))
+
+    return messages
+
+
+def parse_recruitment_message(msg: dict) -> dict:
+    headers = {h["name"]: h["value"] for h in msg.get("payload", {}).get("headers", [])}
+    return {
+        "id": msg.get("id"),
+        "sender": extract_email(headers.get("From", "")),
+        "subject": headers.get("Subject", ""),
+        "internal_date": int(msg.get("internalDate") or 0),
+        "body": _recruitment_body(decode_body(msg.get("payload", {}))),
+    }
+
+
+def index_recruitment_emails(entries) -> dict[str, list[dict]]:
+    """Group parsed recruitment emails by sender, newest first."""
+    index: dict[str, list[dict]] = {}
+    for entry in entries:
+        index.setdefault(entry["sender"], []).append(entry)
+    for sender_entries in index.values():
+        sender_entries.sort(key=lambda e: e["internal_date"], reverse=True)
+    return index
+
+
+def lookup_recruitment_email(index: dict[str, list[dict]], email: str, subject_prefix: str) -> dict | None:
+    """
+    The newest email from the sender whose subject starts with the prefix (among
+    the five a Gmail search would return), if it has the wanted section.
+    """
+    for entry in index.get(email.strip().lower(), [])[:5]:
+        if not entry["subject"].startswith(subject_prefix):
+            continue
+        if entry["body"] is None:
+            return None
+        return {"subject": entry["subject"], "body": entry["body"]}
     return None
@@ -0,0 +1,98 @@
+"""
+Gmail store — local SQLite copy of the parsed recruitment emails.
+Each sync only lists the messages received after the newest stored one
+(internalDate watermark) and downloads the ids not seen yet, so a message
+body is fetched and decoded once. Ids the batch gave up on are kept in
+pending_messages and retried by the next sync, whatever the watermark.
+"""
+
+import logging
+import sqlite3
+from typing import Dict, List
+
+from services.gmail_service import (
+    RECRUITMENT_AFTER,
+    RECRUITMENT_SUBJECT,
+    fetch_messages_batch,
+    index_recruitment_emails,
+    list_message_ids,
+    parse_recruitment_message,
+)
+from services.local_db import connect
+
+log = logging.getLogger("gmail_store")
+
+DB_NAME = "gmail_store"
+
+# Gmail's after: has one-second resolution and is applied to the received
+# date: rewind the watermark a little and rely on the id check for overlap.
+WATERMARK_OVERLAP_SECONDS = 24 * 60 * 60
+
+
+def _connect():
+    conn = connect(DB_NAME)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS recruitment_emails (
+            id            TEXT PRIMARY KEY,
+            sender        TEXT NOT NULL,
+            subject       TEXT NOT NULL,
+            body          TEXT,
+            internal_date INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_recruitment_sender ON recruitment_emails (sender)")
+    conn.execute("CREATE TABLE IF NOT EXISTS pending_messages (id TEXT PRIMARY KEY)")
+    return conn
+
+
+def _after_clause(conn: sqlite3.Connection) -> str:
+    row = conn.execute("SELECT MAX(internal_date) FROM recruitment_emails").fetchone()
+    newest_ms = row[0]
+    if not newest_ms:
+        return RECRUITMENT_AFTER
+    return str(max(int(newest_ms) // 1000 - WATERMARK_OVERLAP_SECONDS, 0))
+
+
+def sync_recruitment_emails(service) -> int:
+    """Store the recruitment emails received since the last sync. Returns how many were new."""
+    conn = _connect()
+    after = _after_clause(conn)
+    ids = list_message_ids(service, f'subject:"{RECRUITMENT_SUBJECT}" after:{after}')
+
+    known = set()
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        known.update(
+            r["id"] for r in conn.execute(f"SELECT id FROM recruitment_emails WHERE id IN ({placeholders})", chunk)
+        )
+    new_ids = [msg_id for msg_id in ids if msg_id not in known]
+    # Falliti in un sync precedente: possono essere sotto il watermark
+    retry_ids = [r["id"] for r in conn.execute("SELECT id FROM pending_messages")]
+    wanted = list(dict.fromkeys(new_ids + retry_ids))
+
+    messages = fetch_messages_batch(service, wanted) if wanted else {}
+    failed = [msg_id for msg_id in wanted if msg_id not in messages]
+    conn.executemany(
+        "INSERT OR REPLACE INTO recruitment_emails (id, sender, subject, body, internal_date) "
+        "VALUES (:id, :sender, :subject, :body, :internal_date)",
+        [parse_recruitment_message(msg) for msg in messages.values()],
+    )
+    conn.execute("DELETE FROM pending_messages")
+    conn.executemany("INSERT INTO pending_messages (id) VALUES (?)", [(msg_id,) for msg_id in failed])
+    conn.commit()
+    conn.close()
+    log.info("Gmail store: %d listed after %s, %d new", len(ids), after, len(messages))
+    if failed:
+        log.warning("Gmail store: %d messages not downloaded, retried at the next sync", len(failed))
+    return len(messages)
+
+
+def recruitment_index() -> Dict[str, List[Dict]]:
+    """The stored emails grouped by sender, newest first (see gmail_service.lookup_recruitment_email)."""
+    conn = _connect()
+    rows = conn.execute("SELECT id, sender, subject, body, internal_date FROM recruitment_emails").fetchall()
+    conn.close()
+    return index_recruitment_emails(dict(r) for r in rows)
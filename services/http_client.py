@@ -0,0 +1,111 @@
+"""
+HTTP client — pooled requests.Session with rate limiting, Retry-After aware
+retries and request/latency counters. One instance per external API.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.rate_limit import RateLimiter
+
+log = logging.getLogger("http_client")
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "PATCH", "DELETE"}
+
+
+def _retry_after_seconds(resp: requests.Response) -> Optional[float]:
+    """Parse Retry-After as seconds or HTTP date; None when missing/invalid."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class ApiClient:
+    """Shared session + limiter for one API; safe to use from several threads."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_retries: int = 5,
+        pool_size: int = 20,
+        timeout: float = 30,
+    ):
+        self.name = name
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.limiter = RateLimiter(requests_per_minute, per=60.0, burst=burst)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "throttled": 0, "errors": 0, "latency_total": 0.0, "latency_max": 0.0}
+
+    def _record(self, latency: float, **increments: int) -> None:
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            self._stats["latency_total"] += latency
+            self._stats["latency_max"] = max(self._stats["latency_max"], latency)
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def stats(self) -> Dict[str, float]:
+        """Request counters plus average/max latency in seconds."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["latency_avg"] = stats["latency_total"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+    def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        """HTTP request with rate limiting and retry on 429 (and 5xx for idempotent methods)."""
+        kwargs.setdefault("timeout", self.timeout)
+        method = method.upper()
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            started = time.monotonic()
+            resp = self.session.request(method, url, headers=headers, **kwargs)
+            latency = time.monotonic() - started
+
+            retryable = resp.status_code == 429 or (
+                resp.status_code in RETRY_STATUSES and method in IDEMPOTENT_METHODS
+            )
+            if not retryable or attempt >= self.max_retries - 1:
+                self._record(latency, errors=int(resp.status_code >= 400))
+                if resp.status_code < 400:
+                    self.limiter.recover()
+                resp.raise_for_status()
+                return resp
+
+            wait = _retry_after_seconds(resp)
+            if wait is None:
+                wait = 2 ** attempt
+            if resp.status_code == 429:
+                self._record(latency, retries=1, throttled=1)
+                self.limiter.throttle(wait)
+            else:
+                self._record(latency, retries=1)
+                time.sleep(wait)
+            log.debug("%s %s → %d, retry in %.1fs", self.name, url, resp.status_code, wait)
+            attempt += 1
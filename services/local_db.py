@@ -0,0 +1,19 @@
+"""
+Local SQLite storage — shared connection helper for on-disk caches and stores.
+"""
+
+import os
+import sqlite3
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = Path(os.getenv("SCREENING_CACHE_DIR", str(PROJECT_ROOT / "cache")))
+
+
+def connect(name: str) -> sqlite3.Connection:
+    """Open (creating if needed) the database cache/<name>.db."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(CACHE_DIR / f"{name}.db"), timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
@@ -0,0 +1,335 @@
+"""
+Mail queue — persistent outbound queue for the pipeline emails.
+Scripts enqueue and move on; a background worker drains the queue over one
+authenticated SMTP connection, spacing the sends with a rate limiter.
+Unsent mails stay in cache/mail_queue.db and are sent on the next run.
+
+Each script enqueues under its own `source` and its worker only drains that
+source, at the script's own interval. Only a permanent (5xx) refusal of the
+recipient counts as a failed attempt; authentication or connection problems
+stop the worker and leave the mails pending. Mails that ran out of attempts
+are put back in the queue with:
+
+    python -m services.mail_queue requeue-failed [source]
+"""
+
+import logging
+import os
+import smtplib
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from typing import Optional
+
+from services.email_templates import render_template
+from services.local_db import connect
+from services.rate_limit import RateLimiter
+
+log = logging.getLogger("mail_queue")
+
+DB_NAME = "mail_queue"
+
+# ── Configuration ─────────────────────────────────────────────────────
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "true").lower() == "true"
+MAIL_MIN_INTERVAL_SECONDS = float(os.getenv("MAIL_MIN_INTERVAL_SECONDS", "30"))  # default dei worker; gli script hanno il proprio
+MAIL_MAX_ATTEMPTS = 5
+SMTP_THROTTLE_SECONDS = 300  # pausa dopo un rifiuto temporaneo (4xx) del server
+SMTP_RECONNECT_SECONDS = 30  # pausa prima di riprovare dopo un errore di connessione
+SMTP_MAX_RECONNECTS = 3      # errori di connessione consecutivi prima di fermare il worker
+# ──────────────────────────────────────────────────────────────────
+
+
+def _connect():
+    conn = connect(DB_NAME)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id         INTEGER PRIMARY KEY AUTOINCREMENT,
+            to_email   TEXT NOT NULL,
+            subject    TEXT NOT NULL,
+            body       TEXT NOT NULL,
+            status     TEXT NOT NULL DEFAULT 'pending',
+            attempts   INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            sent_at    TEXT,
+            source     TEXT NOT NULL DEFAULT ''
+        )
+        """
+    )
+    # Add source column if missing (migration for existing DBs)
+    try:
+        conn.execute("ALTER TABLE outbox ADD COLUMN source TEXT NOT NULL DEFAULT ''")
+    except sqlite3.OperationalError:
+        pass  # column already exists
+    return conn
+
+
+def _source_filter(source: Optional[str]) -> tuple:
+    """WHERE fragment for one source; '' are the mails queued before sources existed."""
+    if source is None:
+        return "", ()
+    return " AND source IN (?, '')", (source,)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ── Queue ────────────────────────────────────────────────────────────
+
+def enqueue(to_email: str, subject: str, body: str, source: str = "") -> Optional[int]:
+    """Store an email for sending. Returns its queue id (None without recipient)."""
+    if not to_email:
+        return None
+    conn = _connect()
+    cur = conn.execute(
+        "INSERT INTO outbox (to_email, subject, body, created_at, source) VALUES (?, ?, ?, ?, ?)",
+        (to_email, subject, body, _now(), source),
+    )
+    conn.commit()
+    conn.close()
+    return cur.lastrowid
+
+
+def enqueue_templated(to_email: str, subject: str, template_path: str, name: str, source: str = "") -> Optional[int]:
+    """Queued counterpart of gmail_service.send_templated_email."""
+    if not to_email or not template_path:
+        return None
+    return enqueue(to_email, subject, render_template(template_path, name), source)
+
+
+def pending_count(source: Optional[str] = None) -> int:
+    where, params = _source_filter(source)
+    conn = _connect()
+    count = conn.execute(f"SELECT COUNT(*) FROM outbox WHERE status = 'pending'{where}", params).fetchone()[0]
+    conn.close()
+    return count
+
+
+def requeue_failed(source: Optional[str] = None) -> int:
+    """Put the mails that ran out of attempts back in the queue. Returns how many."""
+    where, params = _source_filter(source)
+    conn = _connect()
+    cur = conn.execute(f"UPDATE outbox SET status = 'pending', attempts = 0 WHERE status = 'failed'{where}", params)
+    conn.commit()
+    conn.close()
+    return cur.rowcount
+
+
+def _next_pending(source: Optional[str] = None) -> Optional[dict]:
+    where, params = _source_filter(source)
+    conn = _connect()
+    row = conn.execute(
+        "SELECT id, to_email, subject, body, attempts FROM outbox "
+        f"WHERE status = 'pending'{where} ORDER BY id LIMIT 1",
+        params,
+    ).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+def _mark(mail_id: int, status: str, error: Optional[str] = None, attempt: bool = True) -> None:
+    conn = _connect()
+    conn.execute(
+        "UPDATE outbox SET status = ?, attempts = attempts + ?, last_error = ?, "
+        "sent_at = CASE WHEN ? = 'sent' THEN ? ELSE sent_at END WHERE id = ?",
+        (status, int(attempt), error, status, _now(), mail_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+# ── SMTP ─────────────────────────────────────────────────────────────
+
+class SmtpSender:
+    """One SMTP connection, opened and authenticated on first use and reopened if dropped."""
+
+    def __init__(
+        self,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        use_ssl: bool = SMTP_USE_SSL,
+        timeout: float = 60,
+    ):
+        self.user = user if user is not None else os.getenv("GMAIL_USER", "")
+        self.password = password if password is not None else os.getenv("GMAIL_APP_PASSWORD", "")
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def _open(self) -> smtplib.SMTP:
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        smtp = smtp_class(self.host, self.port, timeout=self.timeout)
+        if self.user and self.password:
+            smtp.login(self.user, self.password)
+        return smtp
+
+    def send(self, to_email: str, subject: str, body: str) -> None:
+        msg = EmailMessage()
+        msg["From"] = self.user
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        msg.set_content(body)
+
+        if self._smtp is None:
+            self._smtp = self._open()
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._smtp = self._open()
+            self._smtp.send_message(msg)
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                pass
+            self._smtp = None
+
+
+# ── Worker ───────────────────────────────────────────────────────────
+
+class MailWorker:
+    """
+    Background thread draining the queue: at most one send every
+    `min_interval` seconds. `stop(drain=True)` waits for the queue to empty.
+    With a `source` only that source's mails are sent (None: the whole queue).
+    """
+
+    def __init__(
+        self,
+        sender: Optional[SmtpSender] = None,
+        min_interval: float = MAIL_MIN_INTERVAL_SECONDS,
+        poll_seconds: float = 1.0,
+        source: Optional[str] = None,
+    ):
+        self.sender = sender or SmtpSender()
+        self.limiter = RateLimiter(1 if min_interval else 0, per=min_interval or 60, burst=1)
+        self.poll_seconds = poll_seconds
+        self.source = source
+        self.sent = 0
+        self.failed = 0
+        self._reconnects = 0
+        self._wakeup = threading.Event()
+        self._closing = False
+        self._abort = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MailWorker":
+        if not (self.sender.user and self.sender.password):
+            log.warning("GMAIL_USER/GMAIL_APP_PASSWORD mancanti: le email restano in coda.")
+            return self
+        self._thread = threading.Thread(target=self._run, name="mail-queue", daemon=True)
+        self._thread.start()
+        return self
+
+    def wake(self) -> None:
+        """Notify the worker that something was enqueued."""
+        self._wakeup.set()
+
+    def send_one(self) -> bool:
+        """Send the oldest pending mail. Returns False when the queue is empty or the worker stopped."""
+        if self._abort:
+            return False
+        mail = _next_pending(self.source)
+        if mail is None:
+            return False
+        self.limiter.acquire()
+        try:
+            self.sender.send(mail["to_email"], mail["subject"], mail["body"])
+        except smtplib.SMTPRecipientsRefused as exc:
+            codes = [code for code, _ in exc.recipients.values()]
+            error = "; ".join(f"{code} {msg!r}" for code, msg in exc.recipients.values())
+            if codes and all(500 <= code < 600 for code in codes):
+                # Permanent refusal of the recipient: the only error that uses up attempts
+                self._failed(mail, error)
+            else:
+                self._temporary(mail, error)
+        except smtplib.SMTPResponseException as exc:
+            error = f"{exc.smtp_code} {exc.smtp_error!r}"
+            if 400 <= exc.smtp_code < 500:
+                self._temporary(mail, error)
+            else:
+                # Authentication, sender or quota refusal: it would fail for every mail
+                self._halt(mail, error)
+        except (smtplib.SMTPException, OSError) as exc:
+            self.sender.close()
+            self._reconnects += 1
+            if self._reconnects >= SMTP_MAX_RECONNECTS:
+                self._halt(mail, str(exc))
+            else:
+                _mark(mail["id"], "pending", str(exc), attempt=False)
+                self.limiter.throttle(SMTP_RECONNECT_SECONDS)
+                log.warning("Invio a %s: connessione fallita (%s), riprovo", mail["to_email"], exc)
+        else:
+            _mark(mail["id"], "sent")
+            self.sent += 1
+            self._reconnects = 0
+            log.info("Email inviata a %s (%s)", mail["to_email"], mail["subject"])
+        return True
+
+    def _temporary(self, mail: dict, error: str) -> None:
+        # Temporary refusal (rate limit): keep it pending and back off
+        _mark(mail["id"], "pending", error, attempt=False)
+        self.limiter.throttle(SMTP_THROTTLE_SECONDS)
+        log.warning("Invio a %s rimandato: %s", mail["to_email"], error)
+
+    def _failed(self, mail: dict, error: str) -> None:
+        status = "failed" if mail["attempts"] + 1 >= MAIL_MAX_ATTEMPTS else "pending"
+        _mark(mail["id"], status, error)
+        if status == "failed":
+            self.failed += 1
+        log.warning("Invio a %s fallito (%s): %s", mail["to_email"], status, error)
+
+    def _halt(self, mail: dict, error: str) -> None:
+        _mark(mail["id"], "pending", error, attempt=False)
+        self.sender.close()
+        self._abort = True
+        log.error("Invio email sospeso (%s): %d email restano in coda per la prossima esecuzione.",
+                  error, pending_count(self.source))
+
+    def _run(self) -> None:
+        try:
+            while not self._abort:
+                if self.send_one():
+                    continue
+                if self._closing:
+                    break
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+        finally:
+            self.sender.close()
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = None) -> None:
+        """Stop the worker; with drain=True only after every pending mail was handled."""
+        self._closing = True
+        self._abort = not drain
+        self._wakeup.set()
+        if self._thread is not None:
+            if drain and pending_count(self.source):
+                log.info("Attendo l'invio di %d email in coda...", pending_count(self.source))
+            self._thread.join(timeout)
+
+    def __enter__(self) -> "MailWorker":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # On errors stop right away: what is left stays queued for the next run
+        self.stop(drain=exc_type is None)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "requeue-failed":
+        sys.exit("Uso: python -m services.mail_queue requeue-failed [source]")
+    requeued = requeue_failed(sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"Email rimesse in coda: {requeued}")
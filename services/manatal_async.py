@@ -0,0 +1,62 @@
+"""
+Manatal API service — asyncio paginated fetch, the download path of the local mirror.
+Reads the total count from the first page and fetches the remaining pages
+concurrently (bounded), through the same pooled, rate-limited client as the
+sync service.
+"""
+
+import asyncio
+import math
+from typing import Dict, List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from services.manatal_service import _manatal_get, absolute_url
+
+MAX_CONCURRENT_PAGES = 8
+
+
+def with_query(url: str, **params) -> str:
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.update({k: str(v) for k, v in params.items()})
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+async def _get_json(headers: Dict[str, str], url: str) -> Dict:
+    return await asyncio.to_thread(lambda: _manatal_get(headers, url).json())
+
+
+async def fetch_all_pages(
+    headers: Dict[str, str],
+    url: str,
+    concurrency: int = MAX_CONCURRENT_PAGES,
+) -> List[Dict[str, object]]:
+    """Fetch every page of a list endpoint and return the concatenated results, in page order."""
+    first = await _get_json(headers, url)
+    results: List[Dict[str, object]] = list(first.get("results", []))
+    count = first.get("count")
+    if not first.get("next"):
+        return results
+
+    if count is None or not results:
+        # No total available: follow the `next` links one by one
+        next_url = absolute_url(first.get("next"))
+        while next_url:
+            data = await _get_json(headers, next_url)
+            results.extend(data.get("results", []))
+            next_url = absolute_url(data.get("next"))
+        return results
+
+    # The server may cap page_size: the effective size is the length of the first page
+    page_size = len(results)
+    pages = math.ceil(int(count) / page_size)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_page(page: int) -> List[Dict[str, object]]:
+        async with semaphore:
+            data = await _get_json(headers, with_query(url, page=page))
+        return data.get("results", [])
+
+    for page_results in await asyncio.gather(*(fetch_page(p) for p in range(2, pages + 1))):
+        results.extend(page_results)
+    return results
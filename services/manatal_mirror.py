@@ -0,0 +1,265 @@
+"""
+Manatal mirror — local SQLite copy of matches, candidates and stages.
+Each sync only asks for records with updated_at newer than the last watermark,
+and the read helpers answer from the mirror while it is within the freshness budget.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from services import manatal_service, stage_events
+from services.local_db import connect
+from services.manatal_async import fetch_all_pages, with_query
+
+log = logging.getLogger("manatal_mirror")
+
+DB_NAME = "manatal_mirror"
+
+# ── Freshness budget ──────────────────────────────────────────────────
+MAX_AGE_SECONDS = float(os.getenv("MANATAL_MIRROR_MAX_AGE_SECONDS", str(15 * 60)))
+# ──────────────────────────────────────────────────────────────────
+
+# One sync per key at a time: concurrent readers wait for it instead of repeating it
+_sync_locks: Dict[str, threading.Lock] = {}
+_sync_locks_guard = threading.Lock()
+
+
+def _connect():
+    conn = connect(DB_NAME)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS matches (
+            id           INTEGER PRIMARY KEY,
+            job_id       TEXT,
+            candidate_id INTEGER,
+            stage_id     INTEGER,
+            is_active    INTEGER,
+            updated_at   TEXT,
+            data         TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_matches_job ON matches (job_id);
+        CREATE INDEX IF NOT EXISTS idx_matches_candidate ON matches (candidate_id);
+
+        CREATE TABLE IF NOT EXISTS candidates (
+            id         INTEGER PRIMARY KEY,
+            email      TEXT,
+            updated_at TEXT,
+            data       TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_candidates_email ON candidates (email);
+
+        CREATE TABLE IF NOT EXISTS stages (
+            id   INTEGER PRIMARY KEY,
+            name TEXT,
+            data TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key       TEXT PRIMARY KEY,
+            watermark TEXT,
+            synced_at REAL NOT NULL
+        );
+        """
+    )
+    return conn
+
+
+def _ref_id(ref) -> Optional[str]:
+    """Manatal references are either a bare id or a nested {"id": ...} object."""
+    if isinstance(ref, dict):
+        ref = ref.get("id")
+    return str(ref) if ref not in (None, "") else None
+
+
+def _get_state(conn, key: str) -> Optional[Dict]:
+    row = conn.execute("SELECT watermark, synced_at FROM sync_state WHERE key = ?", (key,)).fetchone()
+    return dict(row) if row else None
+
+
+def _set_state(conn, key: str, watermark: Optional[str]) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO sync_state (key, watermark, synced_at) VALUES (?, ?, ?)",
+        (key, watermark, time.time()),
+    )
+
+
+def _fetch_updated_since(headers: Dict[str, str], url: str, watermark: Optional[str]) -> List[Dict]:
+    """Fetch the records updated at/after the watermark (filtered locally too, in case the API ignores it)."""
+    if watermark:
+        url = with_query(url, updated_at__gte=watermark)
+    records = asyncio.run(fetch_all_pages(headers, url))
+    if not watermark:
+        return records
+    fresh = [r for r in records if (r.get("updated_at") or "") >= watermark]
+    if len(fresh) < len(records):
+        # The filter was not applied server-side: every sync is a full download
+        log.warning(
+            "updated_at__gte ignored by %s: %d of %d records older than %s, filtered locally",
+            url.split("?", 1)[0], len(records) - len(fresh), len(records), watermark,
+        )
+    return fresh
+
+
+def _new_watermark(records: List[Dict], previous: Optional[str]) -> Optional[str]:
+    stamps = [r["updated_at"] for r in records if r.get("updated_at")]
+    if previous:
+        stamps.append(previous)
+    return max(stamps) if stamps else None
+
+
+# ── Sync ─────────────────────────────────────────────────────────────
+
+def _stored_states(conn, match_ids: List[int]) -> Dict[int, Dict]:
+    rows = conn.execute(
+        "SELECT id, job_id, candidate_id, stage_id, is_active FROM matches "
+        "WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(match_ids),),
+    ).fetchall()
+    return {r["id"]: dict(r) for r in rows}
+
+
+def upsert_matches(conn, matches: List[Dict], job_id: Optional[str] = None) -> None:
+    """Store the matches, logging in stage_events the transitions since the stored copy."""
+    previous = _stored_states(conn, [int(m["id"]) for m in matches])
+    stage_events.record_snapshot(matches, previous, job_id=job_id)
+    conn.executemany(
+        "INSERT OR REPLACE INTO matches (id, job_id, candidate_id, stage_id, is_active, updated_at, data) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                int(m["id"]),
+                job_id or _ref_id(m.get("job") or m.get("job_position")),
+                int(m["candidate"]) if m.get("candidate") is not None else None,
+                int((m.get("stage") or {}).get("id", -1)),
+                int(bool(m.get("is_active"))),
+                m.get("updated_at"),
+                json.dumps(m, ensure_ascii=False),
+            )
+            for m in matches
+        ],
+    )
+
+
+def sync_matches(headers: Dict[str, str], job_id: str = "", full: bool = False) -> int:
+    """Bring the mirror up to date for one job (or all matches when job_id is empty)."""
+    key = f"matches:job:{job_id}" if job_id else "matches:all"
+    url = (
+        f"{manatal_service.API_BASE}/jobs/{job_id}/matches/?page_size=200"
+        if job_id else f"{manatal_service.API_BASE}/matches/?page_size=200"
+    )
+    conn = _connect()
+    state = None if full else _get_state(conn, key)
+    watermark = state["watermark"] if state else None
+    matches = _fetch_updated_since(headers, url, watermark)
+    upsert_matches(conn, matches, job_id=job_id or None)
+    if full and job_id:
+        # Removed after the upsert, so the stored copies are still there to diff against
+        conn.execute(
+            "DELETE FROM matches WHERE job_id = ? AND id NOT IN (SELECT value FROM json_each(?))",
+            (job_id, json.dumps([int(m["id"]) for m in matches])),
+        )
+    _set_state(conn, key, _new_watermark(matches, watermark))
+    conn.commit()
+    conn.close()
+    log.info("Mirror %s: %d matches updated", key, len(matches))
+    return len(matches)
+
+
+def sync_candidates(headers: Dict[str, str], full: bool = False) -> int:
+    key = "candidates"
+    conn = _connect()
+    state = None if full else _get_state(conn, key)
+    watermark = state["watermark"] if state else None
+    candidates = _fetch_updated_since(headers, f"{manatal_service.API_BASE}/candidates/?page_size=200", watermark)
+    conn.executemany(
+        "INSERT OR REPLACE INTO candidates (id, email, updated_at, data) VALUES (?, ?, ?, ?)",
+        [
+            (int(c["id"]), str(c.get("email") or "").strip().lower(), c.get("updated_at"),
+             json.dumps(c, ensure_ascii=False))
+            for c in candidates
+        ],
+    )
+    _set_state(conn, key, _new_watermark(candidates, watermark))
+    conn.commit()
+    conn.close()
+    log.info("Mirror candidates: %d updated", len(candidates))
+    return len(candidates)
+
+
+def sync_stages(headers: Dict[str, str]) -> int:
+    """Stages are few and carry no updated_at: always a full refresh."""
+    stages = asyncio.run(fetch_all_pages(headers, f"{manatal_service.API_BASE}/match-stages/?page_size=200"))
+    conn = _connect()
+    conn.execute("DELETE FROM stages")
+    conn.executemany(
+        "INSERT INTO stages (id, name, data) VALUES (?, ?, ?)",
+        [(int(s["id"]), str(s.get("name") or ""), json.dumps(s, ensure_ascii=False)) for s in stages],
+    )
+    _set_state(conn, "stages", None)
+    conn.commit()
+    conn.close()
+    return len(stages)
+
+
+def _is_fresh(key: str, max_age: float) -> bool:
+    conn = _connect()
+    state = _get_state(conn, key)
+    conn.close()
+    return state is not None and time.time() - state["synced_at"] <= max_age
+
+
+def _ensure_fresh(key: str, max_age: float, sync: Callable[[], int]) -> None:
+    if _is_fresh(key, max_age):
+        return
+    with _sync_locks_guard:
+        lock = _sync_locks.setdefault(key, threading.Lock())
+    with lock:
+        if not _is_fresh(key, max_age):
+            sync()
+
+
+def mark_stale(prefix: str = "matches:") -> None:
+    """
+    Force the next read of these keys to sync (incrementally): called after
+    our own changes on Manatal, which move updated_at past the watermark.
+    """
+    conn = _connect()
+    conn.execute("UPDATE sync_state SET synced_at = 0 WHERE key LIKE ? || '%'", (prefix,))
+    conn.commit()
+    conn.close()
+
+
+# ── Reads ────────────────────────────────────────────────────────────
+
+def _load(query: str, params: tuple) -> List[Dict]:
+    conn = _connect()
+    rows = conn.execute(query, params).fetchall()
+    conn.close()
+    return [json.loads(r["data"]) for r in rows]
+
+
+def job_matches(headers: Dict[str, str], job_id: str, max_age: float = MAX_AGE_SECONDS) -> List[Dict]:
+    """All matches of a job (same shape as manatal_service.get_all_matches)."""
+    _ensure_fresh(f"matches:job:{job_id}", max_age, lambda: sync_matches(headers, job_id))
+    return _load("SELECT data FROM matches WHERE job_id = ? ORDER BY id", (str(job_id),))
+
+
+def candidate_matches(headers: Dict[str, str], candidate_id: int, max_age: float = MAX_AGE_SECONDS) -> List[Dict]:
+    """All matches of a candidate, across every job."""
+    _ensure_fresh("matches:all", max_age, lambda: sync_matches(headers))
+    return _load("SELECT data FROM matches WHERE candidate_id = ? ORDER BY id", (int(candidate_id),))
+
+
+def candidates_by_email(headers: Dict[str, str], email: str, max_age: float = MAX_AGE_SECONDS) -> List[Dict]:
+    _ensure_fresh("candidates", max_age, lambda: sync_candidates(headers))
+    return _load("SELECT data FROM candidates WHERE email = ? ORDER BY id", (email.strip().lower(),))
+
+
+def stages(headers: Dict[str, str], max_age: float = MAX_AGE_SECONDS) -> List[Dict]:
+    _ensure_fresh("stages", max_age, lambda: sync_stages(headers))
+    return _load("SELECT data FROM stages ORDER BY id", ())
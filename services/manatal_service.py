@@ -2,13 +2,23 @@
 Manatal API service — shared helpers used by all pipeline scripts.
 """
 
+import json
+import logging
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import Dict, Iterable, List, Optional, Tuple
 
 import requests
 
-API_BASE = "https://api.manatal.com/open/v3"
+from services.http_client import ApiClient
+from services import local_db, note_ledger, stage_events
+
+API_BASE = os.getenv("MANATAL_API_BASE", "https://api.manatal.com/open/v3")
+
+log = logging.getLogger("manatal_service")
 
 _ITALIAN_MONTHS = [
     "gen", "feb", "mar", "apr", "mag", "giu",
@@ -27,6 +37,39 @@ def _format_date_italian(iso_date: str) -> str:
         return iso_date
 
 NOTE_TAG = "[GMAIL_SYNC]"
+TESTDOME_NOTE_TAG = "testdome"
+
+# ── Rate limit (Manatal Open API quota) ───────────────────────────────
+MANATAL_REQUESTS_PER_MINUTE = int(os.getenv("MANATAL_REQUESTS_PER_MINUTE", "100"))
+MANATAL_BURST = 10
+# ──────────────────────────────────────────────────────────────────
+
+# ── Local mirror ──────────────────────────────────────────────────────
+# Letture di match e candidati dal mirror locale (services.manatal_mirror),
+# risincronizzato quando è più vecchio di MANATAL_MIRROR_MAX_AGE_SECONDS
+READ_FROM_MIRROR = os.getenv("MANATAL_READ_FROM_MIRROR", "true").lower() == "true"
+# ──────────────────────────────────────────────────────────────────
+
+MAX_CONCURRENT_CANDIDATES = 8
+STAGE_CACHE_FILE = "match_stages.json"
+STAGE_CACHE_TTL_SECONDS = 24 * 3600
+
+_client: Optional[ApiClient] = None
+_client_lock = threading.Lock()
+
+# Stage registry: all match stages, loaded once per process
+_stage_registry: Optional[List[Dict[str, object]]] = None
+_stage_registry_lock = threading.Lock()
+
+# Run-scoped cache of resolved candidates (id -> candidate)
+_candidate_cache: Dict[int, Dict[str, object]] = {}
+_candidate_cache_lock = threading.Lock()
+
+
+def _mirror():
+    # Import ritardato: manatal_mirror (e manatal_async) importano questo modulo
+    from services import manatal_mirror
+    return manatal_mirror
 
 
 def is_dropped(match: dict) -> bool:
@@ -55,18 +98,27 @@ def absolute_url(url: Optional[str]) -> Optional[str]:
     return f"{API_BASE.rstrip('/')}/{url.lstrip('/')}"
 
 
+def get_client() -> ApiClient:
+    """Process-wide Manatal client: pooled session + rate limit tuned to the API quota."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ApiClient(
+                "manatal",
+                requests_per_minute=MANATAL_REQUESTS_PER_MINUTE,
+                burst=MANATAL_BURST,
+            )
+    return _client
+
+
+def request_stats() -> Dict[str, float]:
+    """Counters of the Manatal requests made so far in this process."""
+    return get_client().stats()
+
+
 def _manatal_request(method: str, headers: Dict[str, str], url: str, **kwargs) -> requests.Response:
-    """HTTP request with retry on 429 rate limit."""
-    for attempt in range(5):
-        resp = requests.request(method, url, headers=headers, timeout=30, **kwargs)
-        if resp.status_code == 429:
-            wait = 2 ** attempt
-            time.sleep(wait)
-            continue
-        resp.raise_for_status()
-        return resp
-    resp.raise_for_status()
-    return resp
+    """HTTP request through the shared client (rate limit + retry honouring Retry-After)."""
+    return get_client().request(method, url, headers=headers, **kwargs)
 
 
 def _manatal_get(headers: Dict[str, str], url: str, **kwargs) -> requests.Response:
@@ -83,26 +135,82 @@ def _manatal_patch(headers: Dict[str, str], url: str, **kwargs) -> requests.Resp
 
 # ── Stages ───────────────────────────────────────────────────────────
 
-def fetch_stage_ids(headers: Dict[str, str], stage_names: Iterable[str]) -> Dict[str, int]:
-    wanted = {name.lower(): name for name in stage_names}
-    found: Dict[str, int] = {}
+def _pick_stage_ids(stages: Iterable[Dict[str, object]], wanted: Dict[str, str], found: Dict[str, int]) -> None:
+    """Record in `found` the ids of the stages whose lowercased name is in `wanted`."""
+    for stage in stages:
+        name = str(stage.get("name") or "")
+        key = name.lower()
+        if key in wanted and wanted[key] not in found:
+            found[wanted[key]] = int(stage["id"])
 
+
+def _download_stages(headers: Dict[str, str]) -> List[Dict[str, object]]:
+    stages: List[Dict[str, object]] = []
     url: Optional[str] = f"{API_BASE}/match-stages/?page_size=200"
     while url:
-        resp = _manatal_get(headers, url)
-        data = resp.json()
-        for stage in data.get("results", []):
-            name = str(stage.get("name") or "")
-            key = name.lower()
-            if key in wanted and wanted[key] not in found:
-                found[wanted[key]] = int(stage["id"])
+        data = _manatal_get(headers, url).json()
+        stages.extend(data.get("results", []))
         url = absolute_url(data.get("next"))
+    return stages
 
+
+def _load_stage_registry(headers: Dict[str, str], refresh: bool = False) -> List[Dict[str, object]]:
+    """
+    All match stages, loaded once per process. The list is also kept on disk
+    for STAGE_CACHE_TTL_SECONDS so the next runs skip the download too.
+    """
+    global _stage_registry
+    with _stage_registry_lock:
+        if _stage_registry is not None and not refresh:
+            return _stage_registry
+
+        cache_path = local_db.CACHE_DIR / STAGE_CACHE_FILE
+        if not refresh and cache_path.exists():
+            cached = json.loads(cache_path.read_text(encoding="utf-8"))
+            if time.time() - cached.get("fetched_at", 0) < STAGE_CACHE_TTL_SECONDS:
+                _stage_registry = cached["stages"]
+                return _stage_registry
+
+        _stage_registry = [{"id": s["id"], "name": s.get("name")} for s in _download_stages(headers)]
+        local_db.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps({"fetched_at": time.time(), "stages": _stage_registry}), encoding="utf-8")
+        return _stage_registry
+
+
+def fetch_stage_ids(headers: Dict[str, str], stage_names: Iterable[str]) -> Dict[str, int]:
+    """Map stage names (case-insensitive) to ids using the in-memory stage registry."""
+    wanted = {name.lower(): name for name in stage_names}
+    found: Dict[str, int] = {}
+    _pick_stage_ids(_load_stage_registry(headers), wanted, found)
+    if len(found) < len(wanted):
+        # A stage missing from the cached list may have been created since: reload once
+        _pick_stage_ids(_load_stage_registry(headers, refresh=True), wanted, found)
     return found
 
 
+def fetch_board_stage_ids(headers: Dict[str, str], boards: Dict[str, Dict]) -> Dict[str, Dict[str, int]]:
+    """Resolve the stages of every board in one pass: {board: {stage_key: stage_id}}."""
+    names = [name for cfg in boards.values() for name in cfg["stages"].values()]
+    ids = fetch_stage_ids(headers, names)
+    return {
+        board: {key: ids[name] for key, name in cfg["stages"].items() if name in ids}
+        for board, cfg in boards.items()
+    }
+
+
 # ── Matches ──────────────────────────────────────────────────────────
 
+def _match_in_stage(match: Dict[str, object], stage_id: int, stage_name: Optional[str], only_active: bool) -> bool:
+    stage = match.get("stage") or {}
+    if int(stage.get("id", -1)) != stage_id:
+        return False
+    if stage_name and str(stage.get("name") or "").strip().lower() != stage_name.strip().lower():
+        return False
+    if only_active and is_dropped(match):
+        return False
+    return True
+
+
 def fetch_job_matches(
     headers: Dict[str, str],
     job_id: str,
@@ -111,23 +219,90 @@ def fetch_job_matches(
     page_size: int = 100,
     only_active: bool = True,
 ) -> List[Dict[str, object]]:
+    if READ_FROM_MIRROR:
+        return [m for m in _mirror().job_matches(headers, job_id) if _match_in_stage(m, stage_id, stage_name, only_active)]
     matches: List[Dict[str, object]] = []
     url: Optional[str] = f"{API_BASE}/jobs/{job_id}/matches/?page_size={page_size}"
     while url:
         data = _manatal_get(headers, url).json()
-        for match in data.get("results", []):
-            stage = match.get("stage") or {}
-            if int(stage.get("id", -1)) != stage_id:
-                continue
-            if stage_name and str(stage.get("name") or "").strip().lower() != stage_name.strip().lower():
-                continue
-            if only_active and is_dropped(match):
-                continue
-            matches.append(match)
+        matches.extend(
+            m for m in data.get("results", []) if _match_in_stage(m, stage_id, stage_name, only_active)
+        )
         url = absolute_url(data.get("next"))
     return matches
 
 
+def _parse_created_at(match: Dict[str, object]) -> Optional[datetime]:
+    value = match.get("created_at")
+    if not value:
+        return None
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def _partition_by_stage(
+    matches: List[Dict[str, object]],
+    stage_ids: Dict[str, int],
+    only_active: bool,
+    created_after: Optional[datetime],
+    partitions: Dict[str, List[Dict[str, object]]],
+) -> List[Optional[datetime]]:
+    """Append each match to the partition of its stage; returns the parsed created_at of every match."""
+    stage_names_by_id = {stage_id: name for name, stage_id in stage_ids.items()}
+    created = [_parse_created_at(m) for m in matches]
+    for match, created_at in zip(matches, created):
+        stage_name = stage_names_by_id.get(int((match.get("stage") or {}).get("id", -1)))
+        if stage_name is None or not _match_in_stage(match, stage_ids[stage_name], stage_name, only_active):
+            continue
+        if created_after and (created_at is None or created_at < created_after):
+            continue
+        partitions[stage_name].append(match)
+    return created
+
+
+def fetch_job_matches_by_stage(
+    headers: Dict[str, str],
+    job_id: str,
+    stage_ids: Dict[str, int],
+    page_size: int = 200,
+    only_active: bool = True,
+    created_after: Optional[datetime] = None,
+) -> Dict[str, List[Dict[str, object]]]:
+    """
+    Single pass over the job's matches, partitioned in memory by stage name
+    ({stage_name: [match, ...]} for every entry of stage_ids). Matches created
+    before `created_after` are dropped while streaming; pages are requested
+    newest first and, as long as the API actually returns them in that order,
+    pagination stops at the first page entirely older than the cutoff.
+    With READ_FROM_MIRROR the matches come from the local mirror instead.
+    """
+    partitions: Dict[str, List[Dict[str, object]]] = {name: [] for name in stage_ids}
+    if READ_FROM_MIRROR:
+        _partition_by_stage(_mirror().job_matches(headers, job_id), stage_ids, only_active, created_after, partitions)
+        return partitions
+
+    url: Optional[str] = f"{API_BASE}/jobs/{job_id}/matches/?page_size={page_size}&ordering=-created_at"
+    newest_first = True
+    previous: Optional[datetime] = None
+    while url:
+        data = _manatal_get(headers, url).json()
+        page = data.get("results", [])
+        created = _partition_by_stage(page, stage_ids, only_active, created_after, partitions)
+
+        if created_after and page:
+            # Verify the ordering was honoured before relying on it
+            stamps = [c for c in created if c is not None]
+            if len(stamps) < len(created) or any(a < b for a, b in zip(stamps, stamps[1:])) \
+                    or (previous and stamps and stamps[0] > previous):
+                newest_first = False
+            if newest_first and stamps:
+                previous = stamps[-1]
+                if stamps[0] < created_after:
+                    break
+
+        url = absolute_url(data.get("next"))
+    return partitions
+
+
 def fetch_all_job_matches(headers: Dict[str, str]) -> List[Dict[str, object]]:
     """Fetch first page of all matches (no job filter)."""
     all_matches = []
@@ -147,6 +322,8 @@ def get_all_matches(
     job_id: str = "",
     page_size: int = 200,
 ) -> List[Dict[str, str]]:
+    if READ_FROM_MIRROR and job_id:
+        return _mirror().job_matches(headers, job_id)
     matches_raw: List[Dict[str, str]] = []
     url_job_matches: Optional[str] = f"{API_BASE}/jobs/{job_id}/matches/?page_size={page_size}"
     while url_job_matches:
@@ -174,11 +351,8 @@ def fetch_matches_with_candidates(
 ) -> List[Tuple[Dict[str, object], Dict[str, object]]]:
     """Fetch matches in a stage and resolve each to its candidate."""
     matches = fetch_job_matches(headers, job_id, stage_id, stage_name=stage_name, page_size=200)
-    selected: List[Tuple[Dict[str, object], Dict[str, object]]] = []
-    for match in matches:
-        candidate = fetch_candidate(headers, int(match["candidate"]))
-        selected.append((match, candidate))
-    return selected
+    candidates = fetch_candidates_by_id(headers, (int(m["candidate"]) for m in matches))
+    return [(match, candidates[int(match["candidate"])]) for match in matches]
 
 
 # ── Candidates ───────────────────────────────────────────────────────
@@ -198,11 +372,41 @@ def fetch_candidate(headers: Dict[str, str], candidate_id: int) -> Dict[str, obj
     return _manatal_get(headers, f"{API_BASE}/candidates/{candidate_id}/").json()
 
 
-def get_candidate_info(headers: Dict[str, str], email: str):
-    url_candidates: Optional[str] = f"{API_BASE}/candidates/?email={email}"
-    data = _manatal_get(headers, url_candidates).json()
+def fetch_candidates_by_id(headers: Dict[str, str], candidate_ids: Iterable[int]) -> Dict[int, Dict[str, object]]:
+    """
+    Resolve many candidates at once. Ids are deduplicated, candidates already
+    resolved in this run are served from memory (also across boards), the rest
+    are fetched concurrently under the shared rate limit. Manatal has no
+    list filter by id, so this is the cheapest way to bulk-resolve them.
+    """
+    ids = list(dict.fromkeys(int(cid) for cid in candidate_ids))
+    with _candidate_cache_lock:
+        missing = [cid for cid in ids if cid not in _candidate_cache]
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CANDIDATES) as executor:
+            fetched = list(executor.map(lambda cid: fetch_candidate(headers, cid), missing))
+        with _candidate_cache_lock:
+            _candidate_cache.update(zip(missing, fetched))
 
-    candidates = data.get("results", [])
+    with _candidate_cache_lock:
+        return {cid: _candidate_cache[cid] for cid in ids}
+
+
+def _candidates_by_email(headers: Dict[str, str], email: str) -> List[Dict[str, object]]:
+    if READ_FROM_MIRROR:
+        return _mirror().candidates_by_email(headers, email)
+    return _manatal_get(headers, f"{API_BASE}/candidates/?email={email}").json().get("results", [])
+
+
+def _candidate_matches(headers: Dict[str, str], cand_id: int) -> List[Dict[str, object]]:
+    if READ_FROM_MIRROR:
+        return _mirror().candidate_matches(headers, cand_id)
+    return _manatal_get(headers, f"{API_BASE}/candidates/{cand_id}/matches/").json().get("results", [])
+
+
+def get_candidate_info(headers: Dict[str, str], email: str):
+    candidates = _candidates_by_email(headers, email)
 
     base_link = "app.manatal.com/candidates/"
 
@@ -212,9 +416,7 @@ def get_candidate_info(headers: Dict[str, str], email: str):
         return "SISTEMARE", [], None
 
     cand_id = candidates[0].get("id")
-    url_matches: Optional[str] = f"{API_BASE}/candidates/{cand_id}/matches/"
-    data = _manatal_get(headers, url_matches).json()
-    matches = data.get("results", [])
+    matches = _candidate_matches(headers, cand_id)
 
     match_details = []
     job_cache = {}
@@ -250,48 +452,87 @@ def get_candidate_info(headers: Dict[str, str], email: str):
 
 # ── Match mutations ──────────────────────────────────────────────────
 
+def _updated_match(response: requests.Response) -> Dict[str, object]:
+    """The match returned by a PATCH, when the API sends it back."""
+    try:
+        data = response.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _mirror_changed() -> None:
+    """Our change moved updated_at past the mirror watermark: the next read resyncs. Best effort."""
+    try:
+        _mirror().mark_stale()
+    except Exception:
+        log.exception("Mirror Manatal non marcato come da aggiornare")
+
+
 def move_match(headers: Dict[str, str], match_id: int, stage_id: int) -> None:
-    _manatal_patch(headers, f"{API_BASE}/matches/{match_id}/", json={"stage": {"id": stage_id}})
+    response = _manatal_patch(headers, f"{API_BASE}/matches/{match_id}/", json={"stage": {"id": stage_id}})
+    stage_events.record_transition(match_id, stage_id=stage_id, match=_updated_match(response))
+    _mirror_changed()
 
 
 def create_match(headers: Dict[str, str], job_id: str, candidate_id: int) -> Dict[str, object]:
     url = f"{API_BASE}/matches/"
-    return _manatal_post(headers, url, json={"candidate": candidate_id, "job": job_id}).json()
+    match = _manatal_post(headers, url, json={"candidate": candidate_id, "job": job_id}).json()
+    _mirror_changed()
+    return match
 
 
 def drop_candidate(headers: Dict[str, str], match_id: int) -> None:
-    _manatal_patch(headers, f"{API_BASE}/matches/{match_id}/", json={"is_active": "false"})
+    response = _manatal_patch(headers, f"{API_BASE}/matches/{match_id}/", json={"is_active": "false"})
+    stage_events.record_transition(match_id, is_active=False, match=_updated_match(response))
+    _mirror_changed()
 
 
 # ── Notes ────────────────────────────────────────────────────────────
 
-def has_testdome_note(cand_id: int, headers: Dict[str, str]) -> bool:
-    url = f"{API_BASE}/candidates/{cand_id}/notes/"
-    notes = _manatal_get(headers, url).json()
+def _note_text(note: Dict[str, object]) -> str:
+    text = note.get("note") or note.get("text") or note.get("info") or ""
+    return text if isinstance(text, str) else ""
 
-    return any(
-        isinstance(note.get("info"), str) and "testdome" in note["info"].lower()
-        for note in notes
-    )
+
+def _note_tags(text: str) -> List[str]:
+    """Ledger tags carried by a note text."""
+    tags = []
+    if TESTDOME_NOTE_TAG in text.lower():
+        tags.append(TESTDOME_NOTE_TAG)
+    if NOTE_TAG in text:
+        tags.append(NOTE_TAG)
+    return tags
+
+
+def _has_tagged_note(headers: Dict[str, str], candidate_id: int, tag: str) -> bool:
+    """Answered by the note ledger when possible; a notes listing otherwise (and recorded)."""
+    if note_ledger.has_note(candidate_id, tag):
+        return True
+    url = f"{API_BASE}/candidates/{candidate_id}/notes/"
+    data = _manatal_get(headers, url).json()
+
+    notes = data if isinstance(data, list) else data.get("results", [])
+    found = {t for note in notes for t in _note_tags(_note_text(note))}
+    note_ledger.record_notes(candidate_id, found)
+    return tag in found
+
+
+def has_testdome_note(cand_id: int, headers: Dict[str, str]) -> bool:
+    return _has_tagged_note(headers, cand_id, TESTDOME_NOTE_TAG)
 
 
 def create_note(headers: Dict[str, str], candidate_id: int, info: str) -> dict:
     """POST a plain note on a Manatal candidate."""
     url = f"{API_BASE}/candidates/{candidate_id}/notes/"
-    return _manatal_post(headers, url, json={"info": info}).json()
+    note = _manatal_post(headers, url, json={"info": info}).json()
+    note_ledger.record_notes(candidate_id, _note_tags(info))
+    return note
 
 
 def has_gmail_sync_note(headers: Dict[str, str], candidate_pk: int) -> bool:
     """Check if a candidate already has a note tagged with NOTE_TAG."""
-    url = f"{API_BASE}/candidates/{candidate_pk}/notes/"
-    data = _manatal_get(headers, url).json()
-
-    notes = data if isinstance(data, list) else data.get("results", [])
-    for note in notes:
-        note_text = note.get("note") or note.get("text") or note.get("info") or ""
-        if NOTE_TAG in note_text:
-            return True
-    return False
+    return _has_tagged_note(headers, candidate_pk, NOTE_TAG)
 
 
 def create_candidate_note(
@@ -301,8 +542,8 @@ def create_candidate_note(
     subject: str = "",
 ) -> dict:
     """POST a note on a Manatal candidate."""
-    url = f"{API_BASE}/candidates/{candidate_pk}/notes/"
-    payload = {
-        "info": f"{NOTE_TAG} **{subject}**\n\n{note_content}" if subject else f"{NOTE_TAG}\n\n{note_content}",
-    }
-    return _manatal_post(headers, url, json=payload).json()
+    return create_note(
+        headers,
+        candidate_pk,
+        f"{NOTE_TAG} **{subject}**\n\n{note_content}" if subject else f"{NOTE_TAG}\n\n{note_content}",
+    )
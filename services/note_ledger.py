@@ -0,0 +1,46 @@
+"""
+Note ledger — (candidate_id, tag) pairs known to have a tagged note on Manatal.
+Tagged notes are never removed, so once a pair is confirmed (or written by us)
+the notes listing for that candidate does not need to be requested again.
+"""
+
+from datetime import datetime, timezone
+from typing import Iterable
+
+from services.local_db import connect
+
+DB_NAME = "note_ledger"
+
+
+def _connect():
+    conn = connect(DB_NAME)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS notes (
+            candidate_id INTEGER NOT NULL,
+            tag          TEXT NOT NULL,
+            recorded_at  TEXT NOT NULL,
+            PRIMARY KEY (candidate_id, tag)
+        )
+        """
+    )
+    return conn
+
+
+def has_note(candidate_id: int, tag: str) -> bool:
+    conn = _connect()
+    row = conn.execute(
+        "SELECT 1 FROM notes WHERE candidate_id = ? AND tag = ?", (int(candidate_id), tag)
+    ).fetchone()
+    conn.close()
+    return row is not None
+
+
+def record_notes(candidate_id: int, tags: Iterable[str]) -> None:
+    rows = [(int(candidate_id), tag, datetime.now(timezone.utc).isoformat()) for tag in tags]
+    if not rows:
+        return
+    conn = _connect()
+    conn.executemany("INSERT OR IGNORE INTO notes (candidate_id, tag, recorded_at) VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
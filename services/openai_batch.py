@@ -0,0 +1,91 @@
+"""
+OpenAI Batch API — submit a JSONL of chat completions, poll, and read the results back.
+The job state is persisted to a JSON file so an interrupted wait can be resumed.
+"""
+
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from openai import OpenAI
+
+log = logging.getLogger("openai_batch")
+
+ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+# ── Job state ────────────────────────────────────────────────────────
+
+def load_batch_state(state_path: Path) -> Optional[Dict]:
+    if not state_path.exists():
+        return None
+    return json.loads(state_path.read_text(encoding="utf-8"))
+
+
+def save_batch_state(state_path: Path, state: Dict) -> None:
+    tmp_path = state_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    tmp_path.replace(state_path)
+
+
+# ── Submit / poll / collect ──────────────────────────────────────────
+
+def submit_batch(client: OpenAI, bodies: Dict[str, Dict], jsonl_path: Path, description: str = "") -> str:
+    """Write one request per custom_id to a JSONL file, upload it and create the batch."""
+    with jsonl_path.open("w", encoding="utf-8") as f:
+        for custom_id, body in bodies.items():
+            line = {"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": body}
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+    with jsonl_path.open("rb") as f:
+        input_file = client.files.create(file=f, purpose="batch")
+    jsonl_path.unlink()
+
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=ENDPOINT,
+        completion_window="24h",
+        metadata={"description": description} if description else None,
+    )
+    log.info("Batch %s created (%d requests)", batch.id, len(bodies))
+    return batch.id
+
+
+def wait_for_batch(client: OpenAI, batch_id: str, poll_seconds: float):
+    """Poll the batch until it reaches a terminal status and return it."""
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        done = f"{counts.completed + counts.failed}/{counts.total}" if counts else "?"
+        log.info("Batch %s: %s (%s)", batch_id, batch.status, done)
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+        time.sleep(poll_seconds)
+
+
+def _read_jsonl(client: OpenAI, file_id: Optional[str]) -> List[Dict]:
+    if not file_id:
+        return []
+    text = client.files.content(file_id).text
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def collect_batch_results(client: OpenAI, batch) -> Dict[str, Dict[str, str]]:
+    """
+    Return custom_id -> {"content": ...} for successful requests
+    and custom_id -> {"error": ...} for failed ones.
+    """
+    results: Dict[str, Dict[str, str]] = {}
+    for line in _read_jsonl(client, batch.output_file_id) + _read_jsonl(client, batch.error_file_id):
+        custom_id = line["custom_id"]
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+        if response.get("status_code") == 200 and body.get("choices"):
+            results[custom_id] = {"content": body["choices"][0]["message"]["content"]}
+        else:
+            error = line.get("error") or body.get("error") or f"status {response.get('status_code')}"
+            results[custom_id] = {"error": str(error)}
+    return results
@@ -0,0 +1,92 @@
+"""
+PDF text layer — local extraction used to avoid uploading text-based CVs to the model.
+"""
+
+import logging
+import re
+from pathlib import Path
+from typing import Dict, Tuple
+
+from pypdf import PdfReader
+
+log = logging.getLogger("pdf_text")
+
+# ── Quality thresholds ────────────────────────────────────────────────
+MIN_CHARS_PER_PAGE = 300     # sotto questa soglia il PDF è probabilmente una scansione
+MIN_LETTER_RATIO = 0.6       # quota di lettere sui caratteri non-spazio
+MAX_TEXT_CHARS = 30_000      # oltre, meglio mandare il file intero
+# ──────────────────────────────────────────────────────────────────
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-zA-Z]{2,}")
+# Prefisso internazionale (+39, 0039) oppure cellulare italiano (3xx), poi gruppi di cifre
+PHONE_RE = re.compile(r"(?<![\w+])(?:(?:\+|00)\d{1,3}(?:[ .-]?\d{1,4}){2,5}|3\d{2}(?:[ .-]?\d{2,4}){2,3})(?!\w)")
+YEAR_GROUP_RE = re.compile(r"(?:19|20)\d{2}")
+LINKEDIN_RE = re.compile(r"(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/in/[\w%-]+/?", re.IGNORECASE)
+GITHUB_RE = re.compile(r"(?:https?://)?(?:www\.)?github\.com/[\w-]+/?", re.IGNORECASE)
+
+
+def read_text_layer(pdf_path: Path) -> Tuple[str, int]:
+    """Return (compact text, page count); ("", 0) when the PDF can't be parsed."""
+    try:
+        reader = PdfReader(str(pdf_path))
+        pages = [page.extract_text() or "" for page in reader.pages]
+    except Exception as exc:  # noqa: BLE001
+        log.debug("Text layer not readable for %s: %s", pdf_path.name, exc)
+        return "", 0
+    text = "\n".join(pages)
+    # Compatta spazi e righe vuote multiple
+    text = re.sub(r"[ \t\u00a0]+", " ", text)
+    text = re.sub(r"\s*\n\s*", "\n", text).strip()
+    return text, len(pages)
+
+
+def is_usable_text(text: str, page_count: int) -> bool:
+    """True when the text layer looks complete enough to replace the PDF upload."""
+    if not text or page_count == 0 or len(text) > MAX_TEXT_CHARS:
+        return False
+    if "(cid:" in text or "�" in text:
+        return False
+    visible = [c for c in text if not c.isspace()]
+    if len(visible) < MIN_CHARS_PER_PAGE * page_count:
+        return False
+    letters = sum(1 for c in visible if c.isalpha())
+    return letters / len(visible) >= MIN_LETTER_RATIO
+
+
+def usable_text_layer(pdf_path: Path) -> str:
+    """Return the PDF text layer if it passes the quality checks, else ""."""
+    text, page_count = read_text_layer(pdf_path)
+    return text if is_usable_text(text, page_count) else ""
+
+
+def _is_phone(candidate: str) -> bool:
+    """9-15 digits and no year-like group: periods such as "2018 - 2019 - 2020" are not phones."""
+    groups = re.split(r"[ .-]+", candidate.lstrip("+"))
+    if len(groups) > 1 and any(YEAR_GROUP_RE.fullmatch(g) for g in groups):
+        return False
+    return 9 <= sum(c.isdigit() for c in candidate) <= 15
+
+
+def extract_contacts(text: str) -> Dict[str, str]:
+    """Parse the deterministic contact fields (email, phone, linkedin, github) with regexes."""
+    def first(pattern: re.Pattern) -> str:
+        match = pattern.search(text)
+        return match.group(0).strip() if match else ""
+
+    phones = (m.group(0).strip() for m in PHONE_RE.finditer(text))
+    phone = next((p for p in phones if _is_phone(p)), "")
+
+    return {
+        "email": first(EMAIL_RE).lower(),
+        "phone": phone,
+        "linkedin": first(LINKEDIN_RE),
+        "github": first(GITHUB_RE),
+    }
+
+
+def fill_contacts(raw: Dict, text: str) -> Dict:
+    """Fill the contact fields the model left empty with the values found in the text."""
+    for field, value in extract_contacts(text).items():
+        if value and not str(raw.get(field) or "").strip():
+            raw[field] = value
+    return raw
@@ -0,0 +1,73 @@
+"""
+Rate limiting — thread-safe token bucket shared by API clients.
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """
+    Token bucket: allows `rate` acquisitions every `per` seconds, with bursts
+    up to `burst` tokens. A rate of 0/None disables the limit.
+
+    The bucket is adaptive: `throttle()` (called on a 429) pauses every caller
+    and halves the rate, each successful call then recovers it gradually
+    back to the configured rate.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float],
+        per: float = 60.0,
+        burst: Optional[int] = None,
+        min_rate: Optional[float] = None,
+    ):
+        self.max_rate = rate or 0
+        self.rate = self.max_rate
+        self.min_rate = min_rate if min_rate is not None else self.max_rate / 10
+        self.per = per
+        self.capacity = float(burst if burst is not None else max(1, int(self.max_rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate / self.per)
+
+    def acquire(self) -> None:
+        """Block until a token is available, then consume it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif not self.rate:
+                    return
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) * self.per / self.rate
+            time.sleep(wait)
+
+    def throttle(self, pause_seconds: float) -> None:
+        """Server said slow down: pause all callers and halve the rate."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + pause_seconds)
+            if self.rate:
+                self._refill(time.monotonic())
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._tokens = min(self._tokens, 0.0)
+
+    def recover(self) -> None:
+        """A call succeeded: step the rate back towards the configured one."""
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 50)
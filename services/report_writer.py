@@ -0,0 +1,101 @@
+"""
+Report writer — streaming .xlsx output for the screening and funnel reports.
+Rows are written as they arrive through openpyxl's write-only mode (memory
+stays flat however long the sheet gets), with the fills created once and
+shared by every cell. If the run fails halfway the rows written so far are
+still saved, followed by a row that marks the sheet as incomplete.
+"""
+
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, PatternFill
+
+FILLS = {
+    "green": PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid"),
+    "red": PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"),
+}
+
+RowFill = Callable[[Dict[str, object]], Optional[str]]
+
+
+class ReportSheet:
+    """A write-only sheet: header first, then one row per append."""
+
+    def __init__(self, workbook: Workbook, title: str, headers: List[str]):
+        self.headers = headers
+        self.rows = 0
+        self._ws = workbook.create_sheet(title)
+        self._ws.append(headers)
+        # Each fill is registered once per workbook as a named style; the cells refer to it by name
+        for name, fill in FILLS.items():
+            if name not in workbook.named_styles:
+                workbook.add_named_style(NamedStyle(name=name, fill=fill))
+
+    def append(self, row: Dict[str, object], fill: Optional[str] = None) -> None:
+        values = [row.get(field, "") for field in self.headers]
+        if fill:
+            cells = []
+            for value in values:
+                cell = WriteOnlyCell(self._ws, value)
+                cell.style = fill
+                cells.append(cell)
+            values = cells
+        self._ws.append(values)
+        self.rows += 1
+
+    def extend(self, rows: Iterable[Dict[str, object]], fill_for: Optional[RowFill] = None) -> int:
+        """Write every row of an iterable (e.g. a generator still producing them); returns how many."""
+        written = self.rows
+        for row in rows:
+            self.append(row, fill_for(row) if fill_for else None)
+        return self.rows - written
+
+    def _mark_incomplete(self, exc: BaseException) -> None:
+        self._ws.append([f"INCOMPLETO dopo {self.rows} righe: {type(exc).__name__}: {exc}"])
+
+
+class ReportWriter:
+    """
+    Workbook saved when the `with` block ends, also on errors:
+        with ReportWriter(path) as report:
+            report.sheet("CV", headers).extend(rows)
+    """
+
+    def __init__(self, output_path: Union[str, Path]):
+        self.output_path = Path(output_path)
+        self._wb = Workbook(write_only=True)
+        self._sheets: List[ReportSheet] = []
+
+    def sheet(self, title: str, headers: List[str]) -> ReportSheet:
+        sheet = ReportSheet(self._wb, title, headers)
+        self._sheets.append(sheet)
+        return sheet
+
+    def save(self, error: Optional[BaseException] = None) -> None:
+        if error is not None:
+            for sheet in self._sheets:
+                sheet._mark_incomplete(error)
+        if not self._sheets:
+            self._wb.create_sheet("Sheet1")
+        self._wb.save(self.output_path)
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.save(exc)
+
+
+def write_rows(
+    output_path: Union[str, Path],
+    headers: List[str],
+    rows: Iterable[Dict[str, object]],
+    title: str = "Sheet1",
+    fill_for: Optional[RowFill] = None,
+) -> int:
+    """Single-sheet report; `rows` may be a generator. Returns the number of rows written."""
+    with ReportWriter(output_path) as report:
+        return report.sheet(title, headers).extend(rows, fill_for)
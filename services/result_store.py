@@ -0,0 +1,111 @@
+"""
+Result store — every screening result, across runs, in one partitioned CSV dataset.
+Each run appends to its own file under results/screening/year=YYYY/month=MM/,
+a row at a time, so a crashed run keeps what it screened. Queries only open
+the partitions of the requested period.
+(CSV because no Parquet engine is available here; the layout is the same.)
+"""
+
+import csv
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from services.local_db import PROJECT_ROOT
+
+RESULTS_DIR = Path(os.getenv("SCREENING_RESULTS_DIR", str(PROJECT_ROOT / "results")))
+DATASET = "screening"
+
+# Columns added to the report fields for every stored row
+RUN_FIELDS = ["run_id", "screened_at", "folder", "role", "model", "prompt_fp", "file_hash", "elapsed_seconds"]
+
+
+def _partition(day: date) -> Path:
+    return RESULTS_DIR / DATASET / f"year={day.year}" / f"month={day.month:02d}"
+
+
+class ResultRun:
+    """One screening run being recorded: rows are flushed to disk as they are written."""
+
+    def __init__(self, run_id: str, fields: List[str], **run_info: str):
+        self.run_id = run_id
+        self.started_at = datetime.now(timezone.utc)
+        self.fields = RUN_FIELDS + [f for f in fields if f not in RUN_FIELDS]
+        self.run_info = {"run_id": run_id, **run_info}
+        self.path = _partition(self.started_at.date()) / f"{run_id}.csv"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fields, extrasaction="ignore")
+        self._writer.writeheader()
+        self.rows = 0
+
+    def write(self, row: Dict[str, object]) -> None:
+        record = {**row, **self.run_info, "screened_at": datetime.now(timezone.utc).isoformat()}
+        self._writer.writerow(record)
+        self._file.flush()
+        self.rows += 1
+
+    def record(self, rows: Iterable[Dict[str, object]]) -> Iterator[Dict[str, object]]:
+        """Store every row and pass it on (e.g. to the Excel writer)."""
+        for row in rows:
+            self.write(row)
+            yield row
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "ResultRun":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def _files(since: Optional[date], until: Optional[date]) -> List[Path]:
+    """Partition pruning: only the month folders overlapping [since, until]."""
+    first = (since.year, since.month) if since else None
+    last = (until.year, until.month) if until else None
+    files = []
+    for folder in sorted((RESULTS_DIR / DATASET).glob("year=*/month=*")):
+        month = (int(folder.parent.name[len("year="):]), int(folder.name[len("month="):]))
+        if (first and month < first) or (last and month > last):
+            continue
+        files.extend(sorted(folder.glob("*.csv")))
+    return files
+
+
+def query(
+    since: Optional[Union[date, str]] = None,
+    until: Optional[Union[date, str]] = None,
+    columns: Optional[List[str]] = None,
+    **equals: str,
+) -> pd.DataFrame:
+    """
+    Stored results screened between since and until (dates included), as
+    strings, optionally filtered on exact column values:
+        query(since=date(2026, 7, 1), decision="RIFIUTATO", accenture_value="FALSE")
+    """
+    since = date.fromisoformat(since) if isinstance(since, str) else since
+    until = date.fromisoformat(until) if isinstance(until, str) else until
+    wanted = None if columns is None else set(columns) | set(equals) | {"screened_at"}
+    frames = [
+        pd.read_csv(path, dtype=str, keep_default_na=False, usecols=lambda c: wanted is None or c in wanted)
+        for path in _files(since, until)
+    ]
+    if not frames:
+        return pd.DataFrame(columns=columns or RUN_FIELDS)
+    df = pd.concat(frames, ignore_index=True)
+
+    day = df["screened_at"].str.slice(0, 10)
+    mask = pd.Series(True, index=df.index)
+    if since is not None:
+        mask &= day >= since.isoformat()
+    if until is not None:
+        mask &= day <= until.isoformat()
+    for column, value in equals.items():
+        mask &= df[column] == str(value)
+    df = df[mask].reset_index(drop=True)
+    return df[columns] if columns else df
@@ -0,0 +1,255 @@
+"""
+Stage events — append-only log of the stage transitions of Manatal matches.
+Transitions are recorded when our scripts move or drop a match and when a
+mirror sync sees a match whose stage/active flag differs from the last known
+state. Per-day, per-stage counters are kept up to date on every append, so
+funnel numbers over any date range are a sum of a few rows.
+"""
+
+import logging
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from services.local_db import connect
+
+log = logging.getLogger("stage_events")
+
+DB_NAME = "stage_events"
+
+SOURCE_SCRIPT = "script"      # move_match / drop_candidate chiamati dai nostri script
+SOURCE_MIRROR = "mirror"      # differenza tra due snapshot del mirror
+SOURCE_BASELINE = "baseline"  # primo stato noto di un match: data reale sconosciuta (updated_at)
+
+
+def _connect():
+    conn = connect(DB_NAME)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id            INTEGER PRIMARY KEY AUTOINCREMENT,
+            match_id      INTEGER NOT NULL,
+            job_id        TEXT,
+            candidate_id  INTEGER,
+            prev_stage_id INTEGER,
+            prev_active   INTEGER,
+            stage_id      INTEGER,
+            is_active     INTEGER,
+            occurred_at   TEXT NOT NULL,
+            source        TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_match ON events (match_id, id);
+        CREATE INDEX IF NOT EXISTS idx_events_job ON events (job_id, occurred_at);
+
+        CREATE TABLE IF NOT EXISTS daily (
+            job_id   TEXT NOT NULL,
+            day      TEXT NOT NULL,
+            stage_id INTEGER NOT NULL,
+            entered  INTEGER NOT NULL DEFAULT 0,
+            dropped  INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (job_id, day, stage_id)
+        );
+        """
+    )
+    return conn
+
+
+def _utc_iso(stamp: Optional[str]) -> str:
+    """Any ISO timestamp (or None = now) as a UTC ISO string, so events sort and bucket by day."""
+    if not stamp:
+        return datetime.now(timezone.utc).isoformat()
+    parsed = datetime.fromisoformat(str(stamp).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def _ref_id(ref) -> Optional[str]:
+    if isinstance(ref, dict):
+        ref = ref.get("id")
+    return str(ref) if ref not in (None, "") else None
+
+
+def match_state(match: Dict[str, object]) -> Dict[str, object]:
+    """The fields of a Manatal match the log tracks."""
+    stage = match.get("stage")
+    stage_id = stage.get("id") if isinstance(stage, dict) else stage
+    candidate = _ref_id(match.get("candidate"))
+    return {
+        "job_id": _ref_id(match.get("job") or match.get("job_position")),
+        "candidate_id": int(candidate) if candidate else None,
+        "stage_id": int(stage_id) if stage_id not in (None, "") else None,
+        "is_active": int(bool(match.get("is_active"))) if match.get("is_active") is not None else None,
+    }
+
+
+def _last_states(conn, match_ids: Iterable[int]) -> Dict[int, Dict[str, object]]:
+    rows = conn.execute(
+        """
+        SELECT e.match_id, e.job_id, e.candidate_id, e.stage_id, e.is_active
+        FROM events e
+        JOIN (SELECT match_id, MAX(id) AS id FROM events
+              WHERE match_id IN (SELECT value FROM json_each(?)) GROUP BY match_id) last
+          ON last.id = e.id
+        """,
+        ("[" + ",".join(str(int(m)) for m in match_ids) + "]",),
+    ).fetchall()
+    return {r["match_id"]: dict(r) for r in rows}
+
+
+def _append(conn, match_id: int, prev: Optional[Dict[str, object]], new: Dict[str, object],
+            occurred_at: str, source: str) -> None:
+    prev_stage = prev["stage_id"] if prev else None
+    prev_active = prev["is_active"] if prev else None
+    conn.execute(
+        "INSERT INTO events (match_id, job_id, candidate_id, prev_stage_id, prev_active, stage_id, is_active, "
+        "occurred_at, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (match_id, new["job_id"], new["candidate_id"], prev_stage, prev_active,
+         new["stage_id"], new["is_active"], occurred_at, source),
+    )
+    if new["job_id"] is None or new["stage_id"] is None:
+        return
+    entered = int(new["stage_id"] != prev_stage)
+    dropped = int(new["is_active"] == 0 and prev_active != 0)
+    if entered or dropped:
+        conn.execute(
+            "INSERT INTO daily (job_id, day, stage_id, entered, dropped) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (job_id, day, stage_id) DO UPDATE SET "
+            "entered = entered + excluded.entered, dropped = dropped + excluded.dropped",
+            (new["job_id"], occurred_at[:10], new["stage_id"], entered, dropped),
+        )
+
+
+def _changed(prev: Dict[str, object], new: Dict[str, object]) -> bool:
+    return (new["stage_id"], new["is_active"]) != (prev["stage_id"], prev["is_active"])
+
+
+# ── Capture ──────────────────────────────────────────────────────────
+
+def record_transition(
+    match_id: int,
+    stage_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    match: Optional[Dict[str, object]] = None,
+    occurred_at: Optional[str] = None,
+    source: str = SOURCE_SCRIPT,
+) -> bool:
+    """
+    Log a change made to one match. Fields not given (None) keep their last
+    known value; `match` is the API's copy of the match, when available.
+    Returns False when the state did not actually change.
+    Best effort: the change has already been made on Manatal, so a failure
+    here is logged and never reaches the caller.
+    """
+    try:
+        return _record_transition(match_id, stage_id, is_active, match, occurred_at, source)
+    except Exception:
+        log.exception("Transizione del match %s non registrata", match_id)
+        return False
+
+
+def _record_transition(
+    match_id: int,
+    stage_id: Optional[int],
+    is_active: Optional[bool],
+    match: Optional[Dict[str, object]],
+    occurred_at: Optional[str],
+    source: str,
+) -> bool:
+    conn = _connect()
+    prev = _last_states(conn, [match_id]).get(int(match_id))
+    known = match_state(match or {})
+    new = {
+        key: known[key] if known[key] is not None else (prev or {}).get(key)
+        for key in ("job_id", "candidate_id", "stage_id", "is_active")
+    }
+    if stage_id is not None:
+        new["stage_id"] = int(stage_id)
+    if is_active is not None:
+        new["is_active"] = int(is_active)
+
+    if prev is not None and not _changed(prev, new):
+        conn.close()
+        return False
+    _append(conn, int(match_id), prev, new, _utc_iso(occurred_at), source)
+    conn.commit()
+    conn.close()
+    return True
+
+
+def record_snapshot(
+    matches: Sequence[Dict[str, object]],
+    previous: Dict[int, Dict[str, object]],
+    job_id: Optional[str] = None,
+) -> int:
+    """
+    Diff a batch of matches from a mirror sync against the last known state
+    (the log first, `previous` mirror rows otherwise) and log what changed.
+    Matches seen for the first time get a baseline event at their updated_at.
+    Returns the number of events appended.
+    """
+    if not matches:
+        return 0
+    conn = _connect()
+    last = _last_states(conn, [int(m["id"]) for m in matches])
+    appended = 0
+    for m in matches:
+        match_id = int(m["id"])
+        new = match_state(m)
+        new["job_id"] = job_id or new["job_id"]
+        prev = last.get(match_id) or previous.get(match_id)
+        if prev is not None and not _changed(prev, new):
+            continue
+        source = SOURCE_MIRROR if prev is not None else SOURCE_BASELINE
+        _append(conn, match_id, prev, new, _utc_iso(m.get("updated_at")), source)
+        last[match_id] = new
+        appended += 1
+    conn.commit()
+    conn.close()
+    return appended
+
+
+# ── Reads ────────────────────────────────────────────────────────────
+
+def match_history(match_id: int) -> List[Dict[str, object]]:
+    conn = _connect()
+    rows = conn.execute("SELECT * FROM events WHERE match_id = ? ORDER BY id", (int(match_id),)).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def stage_counts(job_id: str, since: date, until: date) -> Dict[int, Tuple[int, int]]:
+    """stage_id -> (entered, dropped) for the days since <= day < until."""
+    conn = _connect()
+    rows = conn.execute(
+        "SELECT stage_id, SUM(entered) AS entered, SUM(dropped) AS dropped FROM daily "
+        "WHERE job_id = ? AND day >= ? AND day < ? GROUP BY stage_id",
+        (str(job_id), since.isoformat()[:10], until.isoformat()[:10]),
+    ).fetchall()
+    conn.close()
+    return {r["stage_id"]: (r["entered"], r["dropped"]) for r in rows}
+
+
+def transition_rows(
+    job_id: str,
+    stages: Sequence[Tuple[str, int]],
+    since: date,
+    until: date,
+) -> List[Dict[str, object]]:
+    """
+    Funnel of the transitions that happened in the range, in the given stage
+    order ((name, stage_id) pairs): how many matches entered and were dropped
+    in each stage, and how many of those entering moved on to the next one.
+    """
+    counts = stage_counts(job_id, since, until)
+    rows: List[Dict[str, object]] = []
+    for i, (name, stage_id) in enumerate(stages):
+        entered, dropped = counts.get(stage_id, (0, 0))
+        next_entered = counts.get(stages[i + 1][1], (0, 0))[0] if i + 1 < len(stages) else None
+        rows.append({
+            "stage_name": name,
+            "entered": entered,
+            "dropped": dropped,
+            "perc_drop": round(dropped / entered, 2) if entered else "",
+            "perc_next": round(next_entered / entered, 2) if entered and next_entered is not None else "",
+        })
+    return rows
@@ -2,13 +2,21 @@
 TestDome API service — authentication and candidate fetching.
 """
 
+import json
 import os
+import tempfile
+import threading
 import time
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
 
 import requests
 
-TESTDOME_API_BASE = "https://api.testdome.com"
+from services import local_db
+from services.http_client import ApiClient
+
+TESTDOME_API_BASE = os.getenv("TESTDOME_API_BASE", "https://api.testdome.com")
 
 TEST_STATUS_MAP = {
     "invited": "Invited",
@@ -19,45 +27,172 @@ TEST_STATUS_MAP = {
     "sendingInvitation": "Sending invitation",
     "paused": "Paused",
 }
+TERMINAL_STATUSES = {"completed", "didNotTake", "canceled"}
+EXPAND = ["test", "activities"]
 
+# ── Configuration ─────────────────────────────────────────────────────
+TOKEN_CACHE_FILE = "testdome_token.json"
+TOKEN_REFRESH_MARGIN_SECONDS = 120   # rinnova il token un po' prima della scadenza
+MAX_CONCURRENT_PAGES = 4
+# ──────────────────────────────────────────────────────────────────
 
-def build_testdome_headers() -> Dict[str, str]:
-    client_id = os.getenv("TEST_DOME_CLIENT_ID")
-    client_secret = os.getenv("TEST_DOME_CLIENT_SECRET")
+_client: Optional[ApiClient] = None
+_client_lock = threading.Lock()
 
-    token_response = requests.post(
-        url=f"{TESTDOME_API_BASE}/token",
-        data={
-            "grant_type": "client_credentials",
-            "client_id": client_id,
-            "client_secret": client_secret,
-        },
-        timeout=30,
+# Access token shared by the whole process: {"client_id", "access_token", "expires_at"}
+_token: Optional[Dict[str, object]] = None
+_token_lock = threading.Lock()
+
+
+def get_client() -> ApiClient:
+    """Process-wide TestDome client: pooled session, retries 429/5xx with backoff."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ApiClient("testdome")
+    return _client
+
+
+def _token_valid(token: Optional[Dict[str, object]], client_id: str) -> bool:
+    return bool(
+        token
+        and token.get("client_id") == client_id
+        and token.get("access_token")
+        and float(token.get("expires_at") or 0) - TOKEN_REFRESH_MARGIN_SECONDS > time.time()
     )
-    token_response.raise_for_status()
-    access_token = token_response.json().get("access_token")
-    if not access_token:
-        raise SystemExit("Access token TestDome mancante.")
-
-    return {"Authorization": f"Bearer {access_token}"}
-
-
-def fetch_all_test_results(headers: Dict[str, str], page_size: int = 100) -> List[Dict[str, object]]:
-    results: List[Dict[str, object]] = []
-    skip = 0
-    while True:
-        params = {"$top": page_size, "$skip": skip, "$expand": ["test", "activities"]}
-        response = requests.get(
-            f"{TESTDOME_API_BASE}/v3/candidates",
-            headers=headers,
-            params=params,
-            timeout=30,
+
+
+def get_access_token(refresh: bool = False) -> str:
+    """
+    Client-credentials token, reused until just before it expires: kept in
+    memory and in cache/testdome_token.json so the next runs skip the exchange.
+    """
+    global _token
+    client_id = os.getenv("TEST_DOME_CLIENT_ID") or ""
+    client_secret = os.getenv("TEST_DOME_CLIENT_SECRET")
+    cache_path = local_db.CACHE_DIR / TOKEN_CACHE_FILE
+
+    with _token_lock:
+        if not refresh and _token_valid(_token, client_id):
+            return str(_token["access_token"])
+
+        if not refresh and cache_path.exists():
+            cached = json.loads(cache_path.read_text(encoding="utf-8"))
+            if _token_valid(cached, client_id):
+                _token = cached
+                return str(_token["access_token"])
+
+        token_response = get_client().request(
+            "POST",
+            f"{TESTDOME_API_BASE}/token",
+            data={
+                "grant_type": "client_credentials",
+                "client_id": client_id,
+                "client_secret": client_secret,
+            },
         )
-        response.raise_for_status()
-        payload = response.json()
-        results.extend(payload.get("value", []))
-        if not payload.get("hasMoreItems"):
-            break
-        skip += page_size
-        time.sleep(0.5)
+        payload = token_response.json()
+        access_token = payload.get("access_token")
+        if not access_token:
+            raise SystemExit("Access token TestDome mancante.")
+
+        _token = {
+            "client_id": client_id,
+            "access_token": access_token,
+            "expires_at": time.time() + float(payload.get("expires_in") or 3600),
+        }
+        _save_token(cache_path, _token)
+        return access_token
+
+
+def _save_token(cache_path: Path, token: Dict) -> None:
+    """Write the token through a temp file that mkstemp creates 0600, then swap it in."""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, prefix=f".{cache_path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(token, f)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def build_testdome_headers() -> Dict[str, str]:
+    return {"Authorization": f"Bearer {get_access_token()}"}
+
+
+def _testdome_get(headers: Dict[str, str], url: str, **kwargs) -> requests.Response:
+    """GET through the shared client; a 401 (token revoked/expired early) gets one fresh token."""
+    try:
+        return get_client().request("GET", url, headers=headers, **kwargs)
+    except requests.HTTPError as exc:
+        if exc.response is None or exc.response.status_code != 401:
+            raise
+    token = get_access_token()
+    if headers.get("Authorization") == f"Bearer {token}":
+        # Still the token that was refused: exchange it (another thread may already have)
+        token = get_access_token(refresh=True)
+    headers = dict(headers, Authorization=f"Bearer {token}")
+    return get_client().request("GET", url, headers=headers, **kwargs)
+
+
+def _total_count(payload: Dict[str, object]) -> Optional[int]:
+    for key in ("totalCount", "@odata.count", "count"):
+        if payload.get(key) is not None:
+            return int(payload[key])
+    return None
+
+
+def fetch_test_results_page(
+    headers: Dict[str, str],
+    skip: int,
+    page_size: int = 100,
+    expand: bool = True,
+) -> Dict[str, object]:
+    query: Dict[str, object] = {"$top": page_size, "$skip": skip}
+    if expand:
+        query["$expand"] = EXPAND
+    return _testdome_get(headers, f"{TESTDOME_API_BASE}/v3/candidates", params=query).json()
+
+
+def fetch_test_result(headers: Dict[str, str], candidate_id: int) -> Dict[str, object]:
+    """A single candidate, with test and activities expanded."""
+    url = f"{TESTDOME_API_BASE}/v3/candidates/{candidate_id}"
+    return _testdome_get(headers, url, params={"$expand": EXPAND}).json()
+
+
+def fetch_all_test_results(
+    headers: Dict[str, str],
+    page_size: int = 100,
+    expand: bool = True,
+    concurrency: int = MAX_CONCURRENT_PAGES,
+) -> List[Dict[str, object]]:
+    """
+    All candidates, in API order (expand=False skips test/activities: a much
+    lighter listing). When the first page reports the total the other pages
+    are fetched concurrently, otherwise hasMoreItems is followed.
+    """
+    first = fetch_test_results_page(headers, 0, page_size, expand)
+    results: List[Dict[str, object]] = list(first.get("value", []))
+    if not first.get("hasMoreItems"):
+        return results
+
+    total = _total_count(first)
+    if total is None or not results:
+        skip = len(results) or page_size
+        while True:
+            payload = fetch_test_results_page(headers, skip, page_size, expand)
+            results.extend(payload.get("value", []))
+            if not payload.get("hasMoreItems"):
+                return results
+            skip += len(payload.get("value", [])) or page_size
+
+    # The server may cap $top: the effective page size is the length of the first page
+    effective = len(results)
+    skips = range(effective, total, effective)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pages = pool.map(lambda s: fetch_test_results_page(headers, s, effective, expand), skips)
+        for payload in pages:
+            results.extend(payload.get("value", []))
     return results
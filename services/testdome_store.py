@@ -0,0 +1,130 @@
+"""
+TestDome store — local SQLite copy of the TestDome candidates (test results).
+Each sync lists the candidates without expansions (id + status only) and
+downloads the full record, with test and activities, only for those that are
+new, changed status, are still in a non-terminal state or had recent activity.
+"""
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from services.local_db import connect
+from services.testdome_service import (
+    MAX_CONCURRENT_PAGES,
+    TERMINAL_STATUSES,
+    fetch_all_test_results,
+    fetch_test_result,
+)
+
+log = logging.getLogger("testdome_store")
+
+DB_NAME = "testdome_store"
+
+# ── Refresh policy ────────────────────────────────────────────────────
+RECENT_ACTIVITY_DAYS = 14      # risultati con attività recente: riscaricati comunque
+FULL_REFRESH_RATIO = 0.5       # oltre questa quota da aggiornare, conviene il listing completo
+MAX_CONCURRENT_DETAILS = MAX_CONCURRENT_PAGES
+# ──────────────────────────────────────────────────────────────────
+
+
+def _connect():
+    conn = connect(DB_NAME)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS results (
+            id            INTEGER PRIMARY KEY,
+            status        TEXT,
+            last_activity TEXT,
+            fetched_at    TEXT NOT NULL,
+            data          TEXT NOT NULL
+        )
+        """
+    )
+    return conn
+
+
+def _last_activity(result: Dict[str, object]) -> Optional[str]:
+    """Most recent activity date (ISO string) of an expanded result."""
+    dates = []
+    for activity in result.get("activities") or []:
+        date_str = activity.get("date") if isinstance(activity, dict) else None
+        if not date_str:
+            continue
+        try:
+            dates.append(datetime.fromisoformat(str(date_str).replace("Z", "+00:00")))
+        except ValueError:
+            continue
+    if not dates:
+        return None
+    latest = max(d if d.tzinfo else d.replace(tzinfo=timezone.utc) for d in dates)
+    return latest.isoformat()
+
+
+def _needs_refresh(stored: Optional[Dict[str, object]], listed_status: str, recent_cutoff: str) -> bool:
+    if stored is None or stored["status"] != listed_status:
+        return True
+    if listed_status not in TERMINAL_STATUSES:
+        return True
+    return bool(stored["last_activity"] and stored["last_activity"] >= recent_cutoff)
+
+
+def _save(conn, results: List[Dict[str, object]]) -> None:
+    now = datetime.now(timezone.utc).isoformat()
+    conn.executemany(
+        "INSERT OR REPLACE INTO results (id, status, last_activity, fetched_at, data) VALUES (?, ?, ?, ?, ?)",
+        [
+            (int(r["id"]), str(r.get("status") or ""), _last_activity(r), now, json.dumps(r, ensure_ascii=False))
+            for r in results
+        ],
+    )
+
+
+def sync_test_results(headers: Dict[str, str], full: bool = False) -> List[Dict[str, object]]:
+    """
+    Bring the store up to date and return every current result (expanded, in
+    API order), like testdome_service.fetch_all_test_results.
+    """
+    conn = _connect()
+    stored = {
+        int(r["id"]): {"status": r["status"], "last_activity": r["last_activity"]}
+        for r in conn.execute("SELECT id, status, last_activity FROM results")
+    }
+
+    if full or not stored:
+        results = fetch_all_test_results(headers)
+        _save(conn, results)
+        conn.execute("DELETE FROM results WHERE id NOT IN (SELECT value FROM json_each(?))",
+                     (json.dumps([int(r["id"]) for r in results]),))
+        conn.commit()
+        conn.close()
+        log.info("TestDome store: full download, %d results", len(results))
+        return results
+
+    listing = fetch_all_test_results(headers, expand=False)
+    recent_cutoff = (datetime.now(timezone.utc) - timedelta(days=RECENT_ACTIVITY_DAYS)).isoformat()
+    stale = [
+        int(r["id"]) for r in listing
+        if _needs_refresh(stored.get(int(r["id"])), str(r.get("status") or ""), recent_cutoff)
+    ]
+
+    if len(stale) > FULL_REFRESH_RATIO * len(listing):
+        conn.close()
+        return sync_test_results(headers, full=True)
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DETAILS) as pool:
+        refreshed = list(pool.map(lambda cid: fetch_test_result(headers, cid), stale))
+    _save(conn, refreshed)
+
+    listed_ids = [int(r["id"]) for r in listing]
+    conn.execute("DELETE FROM results WHERE id NOT IN (SELECT value FROM json_each(?))", (json.dumps(listed_ids),))
+    conn.commit()
+    data = {
+        int(r["id"]): json.loads(r["data"])
+        for r in conn.execute("SELECT id, data FROM results")
+    }
+    conn.close()
+    log.info("TestDome store: %d listed, %d refreshed", len(listing), len(refreshed))
+    return [data[cid] for cid in listed_ids if cid in data]
@@ -0,0 +1,104 @@
+"""
+Zip packager — fills several zip archives at once while the files are decided.
+Each archive has its own writer thread fed by a queue, so adding a file never
+waits for compression and the archives are built in parallel. Files that
+barely compress (PDFs usually) are stored as they are instead of deflated.
+"""
+
+import logging
+import queue
+import threading
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+log = logging.getLogger("zip_packager")
+
+# ── Configuration ─────────────────────────────────────────────────────
+COMPRESSION_SAMPLE_BYTES = 256 * 1024
+MIN_DEFLATE_SAVING = 0.10   # sotto il 10% di risparmio sul campione: ZIP_STORED
+# ──────────────────────────────────────────────────────────────────
+
+_DONE = object()
+
+
+def choose_compression(path: Path) -> int:
+    """ZIP_DEFLATED only when a fast deflate of the first bytes saves something worthwhile."""
+    with path.open("rb") as f:
+        sample = f.read(COMPRESSION_SAMPLE_BYTES)
+    if not sample:
+        return zipfile.ZIP_STORED
+    saving = 1 - len(zlib.compress(sample, 1)) / len(sample)
+    return zipfile.ZIP_DEFLATED if saving >= MIN_DEFLATE_SAVING else zipfile.ZIP_STORED
+
+
+class _Archive:
+    def __init__(self, path: Path):
+        self.path = path
+        self.count = 0
+        self.error: Optional[BaseException] = None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"zip-{path.stem}", daemon=True)
+        self._thread.start()
+
+    def add(self, file_path: Path) -> None:
+        self._queue.put(file_path)
+
+    def _run(self) -> None:
+        try:
+            with zipfile.ZipFile(self.path, mode="w") as zf:
+                while (file_path := self._queue.get()) is not _DONE:
+                    if not file_path.exists():
+                        continue
+                    zf.write(file_path, arcname=file_path.name, compress_type=choose_compression(file_path))
+                    self.count += 1
+        except BaseException as exc:  # noqa: BLE001 - re-raised by close()
+            self.error = exc
+            log.error("Zip %s: %s", self.path, exc)
+            # Keep draining so producers never block on a dead archive
+            while self._queue.get() is not _DONE:
+                pass
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(_DONE)
+            self._thread.join()
+
+
+class ZipPackager:
+    """
+    Named archives filled concurrently:
+        with ZipPackager({"accepted": a_path, "rejected": r_path}) as zips:
+            zips.add("accepted", pdf_path)
+    The archives are complete when the block ends (also on errors, with what was added).
+    close() can be called inside the block to read the counts; later calls return them again.
+    """
+
+    def __init__(self, archives: Dict[str, Union[str, Path]]):
+        self._archives = {name: _Archive(Path(path)) for name, path in archives.items()}
+        self._counts: Optional[Dict[str, int]] = None
+
+    def add(self, name: str, file_path: Union[str, Path]) -> None:
+        self._archives[name].add(Path(file_path))
+
+    def close(self) -> Dict[str, int]:
+        """Wait for every archive to be written; returns the number of files in each."""
+        if self._counts is None:
+            for archive in self._archives.values():
+                archive.close()
+            for archive in self._archives.values():
+                if archive.error is not None:
+                    raise archive.error
+            self._counts = {name: archive.count for name, archive in self._archives.items()}
+        return dict(self._counts)
+
+    def __enter__(self) -> "ZipPackager":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            for archive in self._archives.values():
+                archive.close()
@@ -1,20 +1,21 @@
 import os
-import time
 from datetime import datetime, timedelta, timezone
 
 from dotenv import load_dotenv
 import requests
 
 from config.boards import BOARDS
-from services.gmail_service import get_gmail_service, fetch_recruitment_email_for
+from services.gmail_service import get_gmail_service, lookup_recruitment_email
+from services.gmail_store import recruitment_index, sync_recruitment_emails
 from services.logging_config import setup_logger
 from services.manatal_service import (
     build_headers,
-    fetch_job_matches as _service_fetch_job_matches,
+    fetch_job_matches_by_stage,
     fetch_stage_ids,
-    fetch_candidate,
+    fetch_candidates_by_id,
     has_gmail_sync_note,
     create_candidate_note,
+    request_stats,
     NOTE_TAG,
 )
 
@@ -41,32 +42,10 @@ MATCH_MAX_AGE_DAYS = 7
 
 log = setup_logger("gmail_manatal")
 
-# ──────────────────────────────────────────────
-# MANATAL — look up candidate & create note
-# ──────────────────────────────────────────────
-
-def _fetch_job_matches_for_stage(headers: dict, job_id: str, stage_name: str) -> list[dict]:
-    """Fetch all active matches for a job in a given stage."""
-    stage_map = fetch_stage_ids(headers, [stage_name])
-    stage_id = stage_map.get(stage_name)
-
-    if not stage_id:
-        log.error("Stage '%s' not found in Manatal.", stage_name)
-        return []
-
-    log.info("Stage '%s' → id %d", stage_name, stage_id)
-
-    matches = _service_fetch_job_matches(
-        headers, job_id, stage_id, stage_name=stage_name, page_size=200, only_active=True,
-    )
-    log.info("Found %d matches in '%s' for job %s", len(matches), stage_name, job_id)
-    return matches
-
-
 # ──────────────────────────────────────────────
 # 3. MAIN — glue it all together
 # ──────────────────────────────────────────────
-def _process_board(board_name, headers, gmail_service):
+def _process_board(board_name, headers, gmail_index):
     """Run the sync pipeline for a single board."""
     log.info("══ Processing board: %s ══", board_name)
 
@@ -75,31 +54,29 @@ def _process_board(board_name, headers, gmail_service):
     stage_names = list(cfg["stages"].values())
     subject_prefixes = SUBJECT_PREFIXES[board_name]
 
-    # Step 1 — Get matches from all stages
+    # Step 1 — Get recent matches from all stages in a single pass over the job
+    stage_ids = fetch_stage_ids(headers, stage_names)
+    for stage_name in stage_names:
+        if stage_name not in stage_ids:
+            log.error("Stage '%s' not found in Manatal.", stage_name)
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=MATCH_MAX_AGE_DAYS)
+    log.info("Fetching matches for job %s created in the last %d days...", job_id, MATCH_MAX_AGE_DAYS)
+    matches_by_stage = fetch_job_matches_by_stage(
+        headers, job_id, stage_ids, page_size=200, only_active=True, created_after=cutoff,
+    )
+
     matches = []
     seen_candidates = set()
     for stage_name in stage_names:
-        log.info("Fetching matches for job %s, stage '%s'...", job_id, stage_name)
-        stage_matches = _fetch_job_matches_for_stage(headers, job_id, stage_name)
+        stage_matches = matches_by_stage.get(stage_name, [])
+        log.info("Found %d recent matches in '%s' for job %s", len(stage_matches), stage_name, job_id)
         for m in stage_matches:
             cid = int(m["candidate"])
             if cid not in seen_candidates:
                 seen_candidates.add(cid)
                 matches.append(m)
-    log.info("Total unique candidates across all stages: %d", len(matches))
-    if not matches:
-        log.warning("No matches found for %s.", board_name)
-        return
-
-    # Filter matches created within the last MATCH_MAX_AGE_DAYS days
-    cutoff = datetime.now(timezone.utc) - timedelta(days=MATCH_MAX_AGE_DAYS)
-    before = len(matches)
-    matches = [
-        m for m in matches
-        if datetime.fromisoformat(m["created_at"].replace("Z", "+00:00")) >= cutoff
-    ]
-    log.info("Filtered to %d matches created in the last %d days (excluded %d)",
-             len(matches), MATCH_MAX_AGE_DAYS, before - len(matches))
+    log.info("Total unique recent candidates across all stages: %d", len(matches))
     if not matches:
         log.warning("No recent matches for %s.", board_name)
         return
@@ -108,10 +85,12 @@ def _process_board(board_name, headers, gmail_service):
     matched = []
     no_email_body = []
 
+    candidates = fetch_candidates_by_id(headers, (int(m["candidate"]) for m in matches))
+    log.info("Resolved %d candidates", len(candidates))
+
     for match in matches:
         cand_id = int(match["candidate"])
-        time.sleep(0.5)
-        candidate = fetch_candidate(headers, cand_id)
+        candidate = candidates[cand_id]
         cand_email = (candidate.get("email") or "").lower().strip()
         cand_name = f"{candidate.get('first_name', '')} {candidate.get('last_name', '')}".strip()
 
@@ -127,10 +106,10 @@ def _process_board(board_name, headers, gmail_service):
             log.info("  SKIP — already has a %s note", NOTE_TAG)
             continue
 
-        # Search Gmail for this candidate's recruitment email (try all subject prefixes)
+        # Look up this candidate's recruitment email in the Gmail index (try all subject prefixes)
         email_data = None
         for prefix in subject_prefixes:
-            email_data = fetch_recruitment_email_for(gmail_service, cand_email, prefix)
+            email_data = lookup_recruitment_email(gmail_index, cand_email, prefix)
             if email_data:
                 break
         if not email_data:
@@ -151,7 +130,6 @@ def _process_board(board_name, headers, gmail_service):
     # Step 3 — Create notes on Manatal
     created = 0
     for cand_email, cand_id, cand_name, data in matched:
-        time.sleep(0.5)
         try:
             result = create_candidate_note(
                 headers=headers,
@@ -171,9 +149,15 @@ def main():
     headers = build_headers()
 
     gmail_service = get_gmail_service()
+    sync_recruitment_emails(gmail_service)
+    gmail_index = recruitment_index()
 
     for board_name in BOARD_ORDER:
-        _process_board(board_name, headers, gmail_service)
+        _process_board(board_name, headers, gmail_index)
+
+    stats = request_stats()
+    log.info("Manatal requests: %d (retries %d, throttled %d), avg latency %.2fs",
+             stats["requests"], stats["retries"], stats["throttled"], stats["latency_avg"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,49 @@
+"""Test the email template registry: validation up front, in-memory reuse, reload on change."""
+
+import os
+
+import pytest
+
+from services import email_templates
+from services.email_templates import TemplateError, list_templates, load_template, render_template
+
+
+def test_templates_are_read_once_and_reloaded_on_change(tmp_path, monkeypatch):
+    path = tmp_path / "body.txt"
+    path.write_text("Ciao {name},\nbenvenuto.", encoding="utf-8")
+
+    reads = []
+    original = email_templates.Path.read_text
+
+    def counting_read(self, *args, **kwargs):
+        reads.append(self)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(email_templates.Path, "read_text", counting_read)
+
+    assert [render_template(path, n) for n in ("Anna", "Luca")] == ["Ciao Anna,\nbenvenuto.", "Ciao Luca,\nbenvenuto."]
+    assert len(reads) == 1
+
+    path.write_text("Gentile {name}.", encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert render_template(path, "Anna") == "Gentile Anna."
+    assert len(reads) == 2
+
+
+def test_invalid_placeholders_fail_before_rendering(tmp_path):
+    bad = tmp_path / "bad.txt"
+    bad.write_text("Ciao {nome}, il tuo test è {test}", encoding="utf-8")
+    with pytest.raises(TemplateError, match="nome"):
+        load_template(bad)
+
+    (tmp_path / "unbalanced.txt").write_text("Ciao {name", encoding="utf-8")
+    with pytest.raises(TemplateError):
+        load_template(tmp_path / "unbalanced.txt")
+
+    listed = {t["filename"]: t["error"] for t in list_templates(tmp_path)}
+    assert listed["bad.txt"] and listed["unbalanced.txt"]
+
+
+def test_shipped_templates_are_valid():
+    assert all(t["error"] == "" for t in list_templates())
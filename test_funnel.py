@@ -0,0 +1,47 @@
+"""Test the funnel engine against the per-range computation and the generated date ranges."""
+
+from datetime import date, datetime
+
+from benchmarks.bench_funnel import legacy_rows, synthetic_matches
+from services.funnel import FunnelIndex, iso_week_ranges, month_ranges, rolling_ranges, year_ranges
+
+
+def test_rows_match_the_per_range_computation():
+    matches = synthetic_matches(2_000)
+    matches += [
+        {"updated_at": None, "is_active": True, "job_pipeline_stage": {"rank": 0, "name": "Nuovi"}},
+        {"updated_at": "2024-03-01T10:00:00Z", "rank": "5", "is_active": True,
+         "job_pipeline_stage": {"rank": 0, "name": "Nuovi"}},
+        {"updated_at": "2024-03-01T10:00:00Z", "is_active": None,
+         "job_pipeline_stage": {"rank": 3, "name": "Test preliminare"}},
+    ]
+    funnel = FunnelIndex(matches)
+    ranges = month_ranges(date(2023, 11, 15), date(2024, 4, 1)) + [("vuoto", datetime(2030, 1, 1), datetime(2031, 1, 1))]
+
+    for _, since, until in ranges:
+        assert funnel.stage_rows(since, until) == legacy_rows(matches, since, until)
+    assert funnel.stage_rows(datetime(2030, 1, 1), datetime(2031, 1, 1)) == []
+
+
+def test_range_bounds_are_half_open():
+    funnel = FunnelIndex([
+        {"updated_at": "2025-01-31T23:59:59Z", "is_active": True, "job_pipeline_stage": {"rank": 1, "name": "A"}},
+        {"updated_at": "2025-02-01T00:00:00Z", "is_active": False, "job_pipeline_stage": {"rank": 1, "name": "A"}},
+    ])
+    _, since, until = month_ranges(date(2025, 1, 1), date(2025, 2, 1))[0]
+    assert funnel.counts(since, until).tolist() == [[0, 1, 0]]
+
+
+def test_generated_ranges():
+    assert [label for label, _, _ in year_ranges(date(2024, 6, 1), date(2026, 1, 1))] == ["2024", "2025"]
+    months = month_ranges(date(2025, 11, 10), date(2026, 1, 5))
+    assert months == [
+        ("2025-11", datetime(2025, 11, 10), datetime(2025, 12, 1)),
+        ("2025-12", datetime(2025, 12, 1), datetime(2026, 1, 1)),
+        ("2026-01", datetime(2026, 1, 1), datetime(2026, 1, 5)),
+    ]
+    weeks = iso_week_ranges(date(2025, 12, 29), date(2026, 1, 12))
+    assert [(label, since.date()) for label, since, _ in weeks] == [
+        ("2026-W01", date(2025, 12, 29)), ("2026-W02", date(2026, 1, 5)),
+    ]
+    assert rolling_ranges(date(2026, 1, 31), [30]) == [("ultimi 30 giorni", datetime(2026, 1, 1), datetime(2026, 1, 31))]
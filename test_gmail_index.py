@@ -0,0 +1,204 @@
+"""Test the local Gmail recruitment store against a fake Gmail service object."""
+
+import base64
+
+import pytest
+
+import services.local_db as local_db
+from services import gmail_service, gmail_store
+from services.gmail_service import (
+    RECRUITMENT_AFTER,
+    RECRUITMENT_SUBJECT,
+    decode_body,
+    lookup_recruitment_email,
+)
+
+
+def _message(msg_id, sender, subject, body, internal_date):
+    data = base64.urlsafe_b64encode(body.encode()).decode()
+    return {
+        "id": msg_id,
+        "internalDate": str(internal_date),
+        "payload": {
+            "mimeType": "text/plain",
+            "headers": [{"name": "From", "value": sender}, {"name": "Subject", "value": subject}],
+            "body": {"data": data},
+        },
+    }
+
+
+MESSAGES = {
+    "m1": _message("m1", "Mario Rossi <Mario@Example.com>", "RECRUITMENT Candidatura Spontanea DEV",
+                   "Ciao\nInformazioni aggiuntive: vecchia", 1000),
+    "m2": _message("m2", "Mario Rossi <mario@example.com>", "RECRUITMENT Candidatura Spontanea DEV",
+                   "Ciao\nInformazioni aggiuntive: nuova", 2000),
+    "m3": _message("m3", "anna@example.com", "RECRUITMENT Candidatura Spontanea TL",
+                   "Nessuna sezione", 1500),
+    "m4": _message("m4", "Luca <luca@example.com>", "RECRUITMENT Candidatura Spontanea TL",
+                   "Informazioni aggiuntive:  team lead  ", 1200),
+}
+
+
+class _Call:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def execute(self):
+        return self.fn()
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.calls = []
+
+    def add(self, request, request_id):
+        self.calls.append((request_id, request))
+
+    def execute(self):
+        self.service.batches.append(len(self.calls))
+        for request_id, request in self.calls:
+            if request_id in self.service.fail_once:
+                self.service.fail_once.discard(request_id)
+                self.callback(request_id, None, RuntimeError("429"))
+            else:
+                self.callback(request_id, request.execute(), None)
+
+
+class FakeGmail:
+    def __init__(self, page_size=3):
+        self.page_size = page_size
+        self.list_calls = []
+        self.get_calls = 0
+        self.batches = []
+        self.fail_once = set()
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, userId, q, maxResults, pageToken=None):
+        self.list_calls.append(q)
+        ordered = sorted(MESSAGES.values(), key=lambda m: -int(m["internalDate"]))
+        if q.startswith("from:"):
+            sender = q.split()[0][len("from:"):]
+            ordered = [m for m in ordered if sender in m["payload"]["headers"][0]["value"].lower()]
+        after = q.rsplit("after:", 1)[-1]
+        if after.isdigit():
+            ordered = [m for m in ordered if int(m["internalDate"]) // 1000 >= int(after)]
+        start = int(pageToken or 0)
+        size = min(maxResults, self.page_size)
+        page = ordered[start:start + size]
+        result = {"messages": [{"id": m["id"]} for m in page]}
+        if start + size < len(ordered):
+            result["nextPageToken"] = str(start + size)
+        return _Call(lambda: result)
+
+    def get(self, userId, id, format):
+        def run():
+            self.get_calls += 1
+            return MESSAGES[id]
+        return _Call(run)
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+def search_recruitment_email(service, email, subject_prefix):
+    """Oracle: the per-candidate Gmail search the local index replaces."""
+    query = f'from:{email} subject:"{RECRUITMENT_SUBJECT}" after:{RECRUITMENT_AFTER}'
+    results = service.users().messages().list(userId="me", q=query, maxResults=5).execute()
+    for msg_meta in results.get("messages", []):
+        msg = service.users().messages().get(userId="me", id=msg_meta["id"], format="full").execute()
+        headers = {h["name"]: h["value"] for h in msg["payload"].get("headers", [])}
+        subject = headers.get("Subject", "")
+        if not subject.startswith(subject_prefix):
+            continue
+        body = gmail_service._recruitment_body(decode_body(msg["payload"]))
+        if body is None:
+            return None
+        return {"subject": subject, "body": body}
+    return None
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(local_db, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(gmail_service.time, "sleep", lambda s: None)
+
+
+def build_index(service):
+    gmail_store.sync_recruitment_emails(service)
+    return gmail_store.recruitment_index()
+
+
+def test_index_uses_one_query_and_batches(store):
+    fake = FakeGmail()
+    fake.fail_once = {"m3"}
+
+    index = build_index(fake)
+
+    assert len({q for q in fake.list_calls}) == 1
+    assert len(fake.list_calls) == 2  # two pages of the same query
+    assert fake.get_calls == 4
+    assert fake.batches == [4, 1]  # the failed part is retried on its own
+    assert [e["id"] for e in index["mario@example.com"]] == ["m2", "m1"]
+
+
+def test_lookup_matches_per_candidate_search(store):
+    fake = FakeGmail(page_size=10)
+    index = build_index(fake)
+
+    cases = [
+        ("mario@example.com", "RECRUITMENT Candidatura Spontanea DEV"),
+        ("mario@example.com", "RECRUITMENT Candidatura Spontanea TL"),
+        ("anna@example.com", "RECRUITMENT Candidatura Spontanea TL"),
+        ("luca@example.com", "RECRUITMENT Candidatura Spontanea TL"),
+        ("nobody@example.com", "RECRUITMENT Candidatura Spontanea DEV"),
+    ]
+    for email, prefix in cases:
+        assert lookup_recruitment_email(index, email, prefix) == search_recruitment_email(fake, email, prefix)
+
+    assert lookup_recruitment_email(index, "MARIO@example.com ", "RECRUITMENT Candidatura Spontanea DEV") == {
+        "subject": "RECRUITMENT Candidatura Spontanea DEV",
+        "body": "nuova",
+    }
+
+
+def test_store_only_downloads_new_messages(monkeypatch, store):
+    fake = FakeGmail(page_size=10)
+
+    assert gmail_store.sync_recruitment_emails(fake) == 4
+    assert fake.list_calls[-1].endswith("after:2026/01/01")
+
+    monkeypatch.setitem(MESSAGES, "m5", _message("m5", "eva@example.com", "RECRUITMENT Candidatura Spontanea DEV",
+                                                 "Informazioni aggiuntive: ciao", 3_000_000_000))
+    assert gmail_store.sync_recruitment_emails(fake) == 1
+    assert fake.get_calls == 5
+    assert fake.list_calls[-1].endswith("after:0")
+
+    index = gmail_store.recruitment_index()
+    assert index["eva@example.com"][0]["id"] == "m5"
+    for entries in index.values():
+        assert [e["internal_date"] for e in entries] == sorted((e["internal_date"] for e in entries), reverse=True)
+    assert lookup_recruitment_email(index, "eva@example.com", "RECRUITMENT Candidatura Spontanea DEV")["body"] == "ciao"
+
+
+def test_failed_downloads_are_retried_below_the_watermark(monkeypatch, store):
+    monkeypatch.setattr(gmail_service, "GMAIL_BATCH_RETRIES", 0)
+    monkeypatch.setitem(MESSAGES, "m5", _message("m5", "eva@example.com", "RECRUITMENT Candidatura Spontanea DEV",
+                                                 "Informazioni aggiuntive: ciao", 3_000_000_000))
+    fake = FakeGmail(page_size=10)
+    fake.fail_once = {"m1"}
+
+    assert gmail_store.sync_recruitment_emails(fake) == 4
+    assert "m1" not in [e["id"] for e in gmail_store.recruitment_index()["mario@example.com"]]
+
+    # m1 is older than the new watermark, so only the pending list brings it back
+    assert gmail_store.sync_recruitment_emails(fake) == 1
+    assert fake.list_calls[-1].endswith("after:2913600")
+    assert [e["id"] for e in gmail_store.recruitment_index()["mario@example.com"]] == ["m2", "m1"]
+    assert gmail_store.sync_recruitment_emails(fake) == 0
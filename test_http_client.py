@@ -0,0 +1,64 @@
+"""Test the pooled API client: connection reuse, Retry-After handling and counters."""
+
+import time
+
+import pytest
+import requests
+
+from services.http_client import ApiClient
+
+
+class Stub:
+    def __init__(self):
+        self.client_ports = set()
+        self.hits = {}
+
+    def reply(self, request):
+        self.client_ports.add(request.client_port)
+        self.hits[request.path] = self.hits.get(request.path, 0) + 1
+        if request.path == "/limited" and self.hits[request.path] == 1:
+            return 429, {}, {"Retry-After": "0.2"}
+        if request.path == "/unavailable":
+            return 503, {}
+        return {}
+
+
+@pytest.fixture
+def server(stub_api):
+    stub = Stub()
+    base = stub_api({"GET": stub.reply, "POST": stub.reply}, services=())
+    return stub, base
+
+
+def test_connection_is_reused(server):
+    stub, base = server
+    client = ApiClient("test")
+    for _ in range(5):
+        client.request("GET", f"{base}/ok")
+    assert len(stub.client_ports) == 1
+    assert client.stats()["requests"] == 5
+
+
+def test_429_waits_for_retry_after(server):
+    stub, base = server
+    client = ApiClient("test", requests_per_minute=6000)
+
+    started = time.monotonic()
+    resp = client.request("GET", f"{base}/limited")
+    elapsed = time.monotonic() - started
+
+    assert resp.status_code == 200
+    assert stub.hits["/limited"] == 2
+    assert elapsed >= 0.2
+    stats = client.stats()
+    assert stats["throttled"] == 1 and stats["retries"] == 1
+    assert client.limiter.rate < client.limiter.max_rate
+
+
+def test_5xx_is_not_retried_for_post(server):
+    stub, base = server
+    client = ApiClient("test", max_retries=3)
+    with pytest.raises(requests.HTTPError):
+        client.request("POST", f"{base}/unavailable", json={})
+    assert stub.hits["/unavailable"] == 1
+    assert client.stats()["errors"] == 1
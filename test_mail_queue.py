@@ -0,0 +1,161 @@
+"""Test the persistent mail queue against a local fake SMTP server."""
+
+import socketserver
+import threading
+
+import pytest
+
+import services.local_db as local_db
+from services import mail_queue
+from services.mail_queue import MailWorker, SmtpSender
+
+
+class FakeSmtp:
+    def __init__(self):
+        self.connections = 0
+        self.logins = 0
+        self.messages = []
+        self.reject_next = 0
+        self.refused = set()
+        self.wrong_password = False
+
+
+def make_handler(state):
+    class Handler(socketserver.StreamRequestHandler):
+        def reply(self, line):
+            self.wfile.write(line.encode() + b"\r\n")
+
+        def handle(self):
+            state.connections += 1
+            self.reply("220 fake ESMTP")
+            while True:
+                line = self.rfile.readline().decode().strip()
+                if not line:
+                    return
+                verb = line.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    self.reply("250-fake")
+                    self.reply("250 AUTH PLAIN")
+                elif verb == "AUTH":
+                    state.logins += 1
+                    self.reply("535 bad credentials" if state.wrong_password else "235 ok")
+                elif verb == "MAIL":
+                    if state.reject_next:
+                        state.reject_next -= 1
+                        self.reply("451 try later")
+                    else:
+                        self.reply("250 ok")
+                elif verb == "RCPT":
+                    self.reply("550 no such user" if any(r in line for r in state.refused) else "250 ok")
+                elif verb == "DATA":
+                    self.reply("354 go")
+                    data = []
+                    while (chunk := self.rfile.readline().decode()) != ".\r\n":
+                        data.append(chunk)
+                    state.messages.append("".join(data))
+                    self.reply("250 queued")
+                elif verb == "RSET":
+                    self.reply("250 ok")
+                elif verb == "QUIT":
+                    self.reply("221 bye")
+                    return
+                else:
+                    self.reply("502 no")
+
+    return Handler
+
+
+@pytest.fixture
+def smtp(monkeypatch, tmp_path):
+    monkeypatch.setattr(local_db, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(mail_queue, "SMTP_THROTTLE_SECONDS", 0)
+    state = FakeSmtp()
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state.sender = SmtpSender("me@example.com", "secret", "127.0.0.1", server.server_address[1], use_ssl=False)
+    yield state
+    server.shutdown()
+
+
+def test_queue_drains_over_one_connection(smtp, tmp_path):
+    template = tmp_path / "body.txt"
+    template.write_text("Ciao {name},\na presto.", encoding="utf-8")
+    for i in range(3):
+        mail_queue.enqueue_templated(f"c{i}@example.com", "Candidatura Zupit", str(template), f"Nome{i}")
+    assert mail_queue.enqueue_templated("", "Candidatura Zupit", str(template), "x") is None
+
+    with MailWorker(smtp.sender, min_interval=0, poll_seconds=0.05) as worker:
+        pass
+
+    assert worker.sent == 3
+    assert mail_queue.pending_count() == 0
+    assert smtp.connections == 1 and smtp.logins == 1
+    assert "Ciao Nome0," in smtp.messages[0]
+    assert "To: c2@example.com" in smtp.messages[2]
+
+
+def test_unsent_mail_survives_and_temporary_refusals_are_retried(smtp):
+    mail_queue.enqueue("a@example.com", "s", "body")
+    mail_queue.enqueue("b@example.com", "s", "body")
+
+    # A worker that never started (e.g. the process crashed) leaves everything queued
+    assert mail_queue.pending_count() == 2
+
+    smtp.reject_next = 1
+    worker = MailWorker(smtp.sender, min_interval=0, poll_seconds=0.05)
+    while worker.send_one():
+        pass
+
+    assert worker.sent == 2 and worker.failed == 0
+    assert len(smtp.messages) == 2
+    assert mail_queue.pending_count() == 0
+
+
+def _attempts(mail_id):
+    conn = mail_queue._connect()
+    row = conn.execute("SELECT status, attempts FROM outbox WHERE id = ?", (mail_id,)).fetchone()
+    conn.close()
+    return tuple(row)
+
+
+def test_only_refused_recipients_use_up_attempts(smtp):
+    smtp.refused = {"gone@example.com"}
+    gone = mail_queue.enqueue("gone@example.com", "s", "body")
+    mail_queue.enqueue("ok@example.com", "s", "body")
+
+    worker = MailWorker(smtp.sender, min_interval=0)
+    while worker.send_one():
+        pass
+
+    assert worker.sent == 1 and worker.failed == 1
+    assert _attempts(gone) == ("failed", mail_queue.MAIL_MAX_ATTEMPTS)
+
+    assert mail_queue.requeue_failed() == 1
+    assert _attempts(gone) == ("pending", 0)
+
+
+def test_authentication_error_stops_the_worker_and_keeps_the_mail(smtp):
+    smtp.wrong_password = True
+    first = mail_queue.enqueue("a@example.com", "s", "body")
+    mail_queue.enqueue("b@example.com", "s", "body")
+
+    with MailWorker(smtp.sender, min_interval=0, poll_seconds=0.05) as worker:
+        pass
+
+    assert smtp.logins == 1 and worker.sent == 0
+    assert _attempts(first) == ("pending", 0)
+    assert mail_queue.pending_count() == 2
+
+
+def test_worker_only_sends_its_own_source(smtp):
+    mail_queue.enqueue("drop@example.com", "s", "body", source="drop")
+    mail_queue.enqueue("test@example.com", "s", "body", source="test")
+
+    with MailWorker(smtp.sender, min_interval=0, poll_seconds=0.05, source="drop") as worker:
+        pass
+
+    assert worker.sent == 1
+    assert "To: drop@example.com" in smtp.messages[0]
+    assert mail_queue.pending_count("drop") == 0
+    assert mail_queue.pending_count("test") == 1
@@ -0,0 +1,59 @@
+"""Test the parallel page fetching of services.manatal_async against a paginated stub."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import services.manatal_service as manatal_service
+from services.manatal_async import fetch_all_pages, with_query
+
+TOTAL_MATCHES = 230
+SERVER_MAX_PAGE_SIZE = 50
+
+
+class Stub:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def matches(self, request):
+        page = int(request.query.get("page", ["1"])[0])
+        page_size = min(int(request.query.get("page_size", ["100"])[0]), SERVER_MAX_PAGE_SIZE)
+
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+
+        start = (page - 1) * page_size
+        has_next = start + page_size < TOTAL_MATCHES
+        return {
+            "count": TOTAL_MATCHES,
+            "next": f"{request.path}?page={page + 1}&page_size={page_size}" if has_next else None,
+            "results": [{"id": i, "candidate": 1000 + i} for i in range(start, min(start + page_size, TOTAL_MATCHES))],
+        }
+
+
+@pytest.fixture
+def stub(stub_api):
+    state = Stub()
+    stub_api({"GET /matches/": state.matches})
+    return state
+
+
+def test_pages_are_fetched_concurrently_and_in_order(stub):
+    url = f"{manatal_service.API_BASE}/jobs/42/matches/?page_size=200"
+    matches = asyncio.run(fetch_all_pages({}, url))
+
+    assert [m["id"] for m in matches] == list(range(TOTAL_MATCHES))
+    assert stub.max_in_flight > 1
+
+
+def test_with_query_keeps_the_other_parameters():
+    url = with_query("https://x/open/v3/matches/?page_size=200&page=1", page=3, updated_at__gte="2026-01-01")
+    assert url == "https://x/open/v3/matches/?page_size=200&page=3&updated_at__gte=2026-01-01"
@@ -0,0 +1,29 @@
+"""Test the bulk candidate resolver used by fetch_matches_with_candidates."""
+
+import pytest
+
+import services.manatal_service as manatal_service
+
+
+@pytest.fixture
+def candidate_server(stub_api, monkeypatch):
+    requested = []
+
+    def candidate(request):
+        cand_id = int(request.path.rstrip("/").rsplit("/", 1)[1])
+        requested.append(cand_id)
+        return {"id": cand_id, "full_name": f"candidate {cand_id}"}
+
+    stub_api({"GET /candidates/": candidate})
+    monkeypatch.setattr(manatal_service, "_candidate_cache", {})
+    return requested
+
+
+def test_ids_are_deduplicated_and_shared_across_calls(candidate_server):
+    first = manatal_service.fetch_candidates_by_id({}, [3, 1, 3, 2, 1])
+    assert list(first) == [3, 1, 2]
+    assert first[2]["full_name"] == "candidate 2"
+
+    second = manatal_service.fetch_candidates_by_id({}, [2, 4])
+    assert second[4]["id"] == 4
+    assert sorted(candidate_server) == [1, 2, 3, 4]
@@ -0,0 +1,92 @@
+"""Test the single-pass, stage-partitioned job match fetch used by sync_gmail_to_manatal."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import services.manatal_service as manatal_service
+
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+PAGE_SIZE = 10
+
+
+def _matches():
+    """40 matches, one per day going back from NOW, alternating between two stages."""
+    return [
+        {
+            "id": i,
+            "candidate": 100 + i,
+            "is_active": i % 5 != 0,
+            "stage": {"id": 7 if i % 2 else 8, "name": "Colloquio tecnico" if i % 2 else "Live coding"},
+            "created_at": (NOW - timedelta(days=i)).isoformat().replace("+00:00", "Z"),
+        }
+        for i in range(40)
+    ]
+
+
+@pytest.fixture
+def stub(stub_api, monkeypatch):
+    monkeypatch.setattr(manatal_service, "READ_FROM_MIRROR", False)
+    state = {"honour_ordering": True, "pages": []}
+
+    def matches_page(request):
+        page = int(request.query.get("page", ["1"])[0])
+        state["pages"].append(page)
+        matches = _matches()
+        if not (state["honour_ordering"] and request.query.get("ordering") == ["-created_at"]):
+            matches = sorted(matches, key=lambda m: m["id"] % 7)
+        start = (page - 1) * PAGE_SIZE
+        has_next = start + PAGE_SIZE < len(matches)
+        return {
+            "count": len(matches),
+            "next": f"{request.path}?page={page + 1}&ordering=-created_at" if has_next else None,
+            "results": matches[start:start + PAGE_SIZE],
+        }
+
+    stub_api({"GET /matches/": matches_page})
+    return state
+
+
+STAGES = {"Colloquio tecnico": 7, "Live coding": 8}
+
+
+def _expected(cutoff):
+    recent = [m for m in _matches() if m["is_active"] and m["id"] <= (NOW - cutoff).days]
+    return {
+        "Colloquio tecnico": sorted(m["id"] for m in recent if m["id"] % 2),
+        "Live coding": sorted(m["id"] for m in recent if not m["id"] % 2),
+    }
+
+
+def test_partitions_by_stage_and_stops_at_cutoff(stub):
+    cutoff = NOW - timedelta(days=7)
+    result = manatal_service.fetch_job_matches_by_stage({}, "42", STAGES, created_after=cutoff)
+
+    assert {name: sorted(m["id"] for m in ms) for name, ms in result.items()} == _expected(cutoff)
+    assert stub["pages"] == [1, 2]
+
+
+def test_unordered_api_is_read_to_the_end(stub):
+    stub["honour_ordering"] = False
+    cutoff = NOW - timedelta(days=7)
+    result = manatal_service.fetch_job_matches_by_stage({}, "42", STAGES, created_after=cutoff)
+
+    assert {name: sorted(m["id"] for m in ms) for name, ms in result.items()} == _expected(cutoff)
+    assert stub["pages"] == [1, 2, 3, 4]
+
+
+def test_mirror_reads_are_reused_until_a_change(stub, monkeypatch):
+    monkeypatch.setattr(manatal_service, "READ_FROM_MIRROR", True)
+    cutoff = NOW - timedelta(days=7)
+    result = manatal_service.fetch_job_matches_by_stage({}, "42", STAGES, created_after=cutoff)
+    assert {name: sorted(m["id"] for m in ms) for name, ms in result.items()} == _expected(cutoff)
+    downloaded = len(stub["pages"])
+
+    # Within the freshness budget: answered by the mirror
+    assert manatal_service.fetch_job_matches({}, "42", 7, stage_name="Colloquio tecnico")
+    assert len(stub["pages"]) == downloaded
+
+    # Our own change makes the next read sync again
+    manatal_service._mirror().mark_stale()
+    manatal_service.get_all_matches({}, "42")
+    assert len(stub["pages"]) > downloaded
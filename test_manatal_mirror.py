@@ -0,0 +1,56 @@
+"""Test the incremental Manatal mirror against a stub that honours (or ignores) updated_at__gte."""
+
+import pytest
+
+import services.manatal_mirror as mirror
+
+
+class Stub:
+    def __init__(self):
+        self.matches = {
+            1: {"id": 1, "candidate": 10, "is_active": True, "stage": {"id": 5}, "updated_at": "2026-01-01T10:00:00Z"},
+            2: {"id": 2, "candidate": 11, "is_active": True, "stage": {"id": 5}, "updated_at": "2026-01-02T10:00:00Z"},
+        }
+        self.queries = []
+        self.honour_filter = True
+
+    def list_matches(self, request):
+        self.queries.append(request.query)
+        since = request.query.get("updated_at__gte", [""])[0] if self.honour_filter else ""
+        results = [m for m in self.matches.values() if m["updated_at"] >= since]
+        return {"count": len(results), "next": None, "results": results}
+
+
+@pytest.fixture
+def stub(stub_api):
+    state = Stub()
+    stub_api({"GET /matches/": state.list_matches})
+    return state
+
+
+def test_sync_is_incremental_and_reads_respect_freshness(stub):
+    assert [m["id"] for m in mirror.job_matches({}, "42")] == [1, 2]
+    assert "updated_at__gte" not in stub.queries[0]
+
+    # Within the freshness budget: no request at all
+    mirror.job_matches({}, "42")
+    assert len(stub.queries) == 1
+
+    stub.matches[1] = dict(stub.matches[1], is_active=False, updated_at="2026-01-03T09:00:00Z")
+    updated = mirror.sync_matches({}, "42")
+    assert stub.queries[-1]["updated_at__gte"] == ["2026-01-02T10:00:00Z"]
+    assert updated == 2  # the changed match plus the one sitting on the watermark
+
+    matches = mirror.job_matches({}, "42", max_age=0)
+    assert [m["is_active"] for m in matches] == [False, True]
+    assert stub.queries[-1]["updated_at__gte"] == ["2026-01-03T09:00:00Z"]
+
+
+def test_ignored_watermark_filter_is_reported(stub, caplog):
+    mirror.sync_matches({}, "42")
+    stub.honour_filter = False
+
+    with caplog.at_level("WARNING", logger="manatal_mirror"):
+        assert mirror.sync_matches({}, "42") == 1
+    assert "updated_at__gte ignored" in caplog.text
+    assert "1 of 2 records older than 2026-01-02T10:00:00Z" in caplog.text
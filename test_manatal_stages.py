@@ -0,0 +1,59 @@
+"""Test the process-wide stage registry behind fetch_stage_ids."""
+
+import pytest
+
+import services.manatal_service as manatal_service
+
+STAGES = [
+    {"id": 1, "name": "Nuova candidatura"},
+    {"id": 2, "name": "Test preliminare"},
+    {"id": 3, "name": "Nuova candidatura (TL)"},
+]
+
+
+@pytest.fixture
+def stage_server(stub_api, monkeypatch):
+    stages = list(STAGES)
+    requests_seen = []
+
+    def list_stages(request):
+        requests_seen.append(request.path)
+        return {"count": len(stages), "next": None, "results": stages}
+
+    stub_api({"GET /match-stages/": list_stages})
+    monkeypatch.setattr(manatal_service, "_stage_registry", None)
+    return stages, requests_seen
+
+
+def test_stages_are_downloaded_once(stage_server):
+    _, requests_seen = stage_server
+    for _ in range(5):
+        assert manatal_service.fetch_stage_ids({}, ["test PRELIMINARE"]) == {"test PRELIMINARE": 2}
+    assert len(requests_seen) == 1
+
+    # A new process reads the list from the disk cache
+    manatal_service._stage_registry = None
+    assert manatal_service.fetch_stage_ids({}, ["Nuova candidatura"]) == {"Nuova candidatura": 1}
+    assert len(requests_seen) == 1
+
+
+def test_unknown_stage_triggers_a_single_refresh(stage_server):
+    stages, requests_seen = stage_server
+    manatal_service.fetch_stage_ids({}, ["Nuova candidatura"])
+    stages.append({"id": 9, "name": "Live coding"})
+
+    assert manatal_service.fetch_stage_ids({}, ["Live coding"]) == {"Live coding": 9}
+    assert len(requests_seen) == 2
+
+
+def test_board_stages_resolved_in_one_pass(stage_server):
+    _, requests_seen = stage_server
+    boards = {
+        "TL": {"stages": {"nuova_candidatura": "Nuova candidatura (TL)"}},
+        "DEV": {"stages": {"nuova_candidatura": "Nuova candidatura", "test_preliminare": "Test preliminare"}},
+    }
+    assert manatal_service.fetch_board_stage_ids({}, boards) == {
+        "TL": {"nuova_candidatura": 3},
+        "DEV": {"nuova_candidatura": 1, "test_preliminare": 2},
+    }
+    assert len(requests_seen) == 1
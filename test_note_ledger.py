@@ -0,0 +1,41 @@
+"""Test that tagged-note checks are answered by the local note ledger after the first lookup."""
+
+import pytest
+
+import services.manatal_service as manatal_service
+
+
+@pytest.fixture
+def notes_server(stub_api):
+    state = {"notes": {1: [{"id": 1, "info": "Testdome: 80%  |  Python"}], 2: []}, "requests": []}
+
+    def list_notes(request):
+        cand_id = int(request.path.rstrip("/").split("/")[-2])
+        state["requests"].append(("GET", cand_id))
+        return state["notes"][cand_id]
+
+    def add_note(request):
+        cand_id = int(request.path.rstrip("/").split("/")[-2])
+        state["requests"].append(("POST", cand_id))
+        note = request.json()
+        state["notes"][cand_id].append(note)
+        return dict(note, id=99)
+
+    stub_api({"GET /notes/": list_notes, "POST /notes/": add_note})
+    return state
+
+
+def test_confirmed_notes_are_not_listed_again(notes_server):
+    assert manatal_service.has_testdome_note(1, headers={})
+    assert manatal_service.has_testdome_note(1, headers={})
+    assert notes_server["requests"] == [("GET", 1)]
+
+
+def test_missing_notes_are_checked_until_written(notes_server):
+    assert not manatal_service.has_gmail_sync_note({}, 2)
+    assert not manatal_service.has_gmail_sync_note({}, 2)
+    assert notes_server["requests"] == [("GET", 2), ("GET", 2)]
+
+    manatal_service.create_candidate_note({}, 2, "Informazioni aggiuntive", subject="RECRUITMENT")
+    assert manatal_service.has_gmail_sync_note({}, 2)
+    assert notes_server["requests"][-1] == ("POST", 2)
@@ -0,0 +1,99 @@
+"""Test the local text-layer fast path used before uploading a CV to the model."""
+
+from services.pdf_text import extract_contacts, fill_contacts, is_usable_text, read_text_layer, usable_text_layer
+from screening_cvs import build_cv_messages
+
+
+def make_text_pdf(path, lines):
+    """Write a minimal single-page PDF whose text layer contains `lines`."""
+    stream = "BT /F1 10 Tf 40 800 Td 12 TL\n"
+    stream += "".join(f"({line}) Tj T*\n" for line in lines)
+    stream += "ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        "/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+    ]
+    out = "%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    out += "".join(f"{off:010d} 00000 n \n" for off in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    path.write_bytes(out.encode("latin-1"))
+
+
+CV_LINES = [
+    "Mario Rossi - Full Stack Developer",
+    "Email: mario.rossi@example.com  Tel: +39 333 123 4567",
+    "linkedin.com/in/mario-rossi  github.com/mrossi",
+] + [f"Esperienza {i}: sviluppo applicazioni web con Python, Django e React presso Azienda {i}" for i in range(6)]
+
+
+def test_text_pdf_is_sent_as_text(tmp_path):
+    pdf = tmp_path / "cv.pdf"
+    make_text_pdf(pdf, CV_LINES)
+
+    text = usable_text_layer(pdf)
+    assert "Mario Rossi" in text
+
+    messages = build_cv_messages(pdf, text)
+    content = messages[1]["content"]
+    assert content[0]["type"] == "text"
+    assert "mario.rossi@example.com" in content[0]["text"]
+    assert all(part["type"] != "file" for part in content)
+
+
+def test_scanned_or_broken_pdf_falls_back_to_upload(tmp_path):
+    short = tmp_path / "short.pdf"
+    make_text_pdf(short, ["Mario Rossi"])
+    assert usable_text_layer(short) == ""
+
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"%PDF-1.4 not really a pdf")
+    assert read_text_layer(broken) == ("", 0)
+
+    messages = build_cv_messages(broken, usable_text_layer(broken))
+    assert messages[1]["content"][0]["type"] == "file"
+
+
+def test_quality_checks():
+    assert not is_usable_text("", 0)
+    assert not is_usable_text("(cid:12)(cid:34) " * 200, 1)
+    assert not is_usable_text("12 34 56 78 " * 200, 1)
+    assert is_usable_text("Sviluppatore web con esperienza " * 20, 1)
+
+
+def test_extract_and_fill_contacts():
+    text = "\n".join(CV_LINES) + "\nDal 2019 - 2021 presso Reply"
+    contacts = extract_contacts(text)
+    assert contacts == {
+        "email": "mario.rossi@example.com",
+        "phone": "+39 333 123 4567",
+        "linkedin": "linkedin.com/in/mario-rossi",
+        "github": "github.com/mrossi",
+    }
+
+    raw = fill_contacts({"email": "altro@example.com", "phone": ""}, text)
+    assert raw["email"] == "altro@example.com"
+    assert raw["phone"] == "+39 333 123 4567"
+    assert raw["github"] == "github.com/mrossi"
+
+
+def test_cv_dates_are_not_taken_for_phones():
+    for text in (
+        "Esperienze 2018 - 2019 - 2020 presso Reply",
+        "Dal 01.02.2019 - 03.2020 sviluppatore",
+        "Progetti 2015-2016-2017, 2018 2019 2020",
+        "Master 320 2019 2020 ore",
+    ):
+        assert extract_contacts(text)["phone"] == "", text
+
+    assert extract_contacts("Cell. 333.123.4567 - dal 2019")["phone"] == "333.123.4567"
+    assert extract_contacts("Tel: 0044 20 7946 0958")["phone"] == "0044 20 7946 0958"
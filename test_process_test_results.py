@@ -0,0 +1,149 @@
+"""Test the normalization, classification and plan/execute phases of process_test_results."""
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import process_test_results
+from process_test_results import (
+    classify_tests,
+    describe_action,
+    execute_plan,
+    lookup_classification,
+    normalize_test_results,
+    plan_candidate,
+)
+
+
+def _record(cid, email, status, score=None, max_score=None, time_taken=None, activities=None):
+    return {
+        "id": cid, "name": f"Candidate {cid}", "email": email, "status": status,
+        "score": score, "maxScore": max_score, "timeTaken": time_taken,
+        "test": {"name": "Python"}, "activities": activities or [],
+    }
+
+
+def test_records_are_normalized_to_typed_columns():
+    df = normalize_test_results([
+        _record(1, " Anna@Example.com ", "completed", score=42, max_score=50, time_taken="2745.9", activities=[
+            {"date": "2026-01-10T10:00:00Z", "description": "Invited"},
+            {"date": "2026-01-12T09:30:00Z", "description": " Completed "},
+            {"date": "not a date", "description": "??"},
+        ]),
+        _record(2, "luca@example.com", "completed", score=0.675),
+        _record(3, "eva@example.com", "didNotTake"),
+        _record(4, None, "weirdState", time_taken=None, activities=None),
+    ])
+
+    assert df["score"].tolist()[:3] == [84.0, 68.0, 0.0] and pd.isna(df["score"][3])
+    assert df["seconds_used"].tolist() == [2745, 0, 0, 0]
+    assert df["time_used"].tolist() == ["0h45m", "0h00m", "0h00m", "0h00m"]
+    assert df["last_activity_date"][0] == pd.Timestamp("2026-01-12T09:30:00Z")
+    assert df["last_activity_description"].tolist() == ["Completed", "", "", ""]
+    assert pd.isna(df["last_activity_date"][1])
+    assert df["email_key"].tolist() == ["anna@example.com", "luca@example.com", "eva@example.com", ""]
+    assert df["status_label"].tolist() == ["Completed", "Completed", "Didn't take", "Weirdstate"]
+    assert df["link"][0] == "https://app.testdome.com/my-candidates/report/1"
+    assert df["name"][0] == "Python"
+
+
+def test_candidates_are_classified_by_normalized_email():
+    df = normalize_test_results([
+        _record(1, "Pass@Example.com ", "completed", score=85),
+        _record(2, "fail@example.com", "completed", score=40),
+        _record(3, "mid@example.com", "completed", score=70),
+        _record(4, "zero@example.com", "completed", score=0),
+        _record(5, "invited@example.com", "invited"),
+        _record(6, "gone@example.com", "didNotTake"),
+        _record(7, "twice@example.com", "completed", score=90),
+        _record(8, "TWICE@example.com", "completed", score=20),
+        _record(9, "", "completed", score=90),
+    ])
+    classified = classify_tests(df)
+
+    expected = {
+        "pass@example.com": "passati",
+        " PASS@example.com": "passati",
+        "fail@example.com": "falliti",
+        "mid@example.com": "da_valutare",
+        "zero@example.com": "score_0",
+        "invited@example.com": "invited",
+        "gone@example.com": "stati_strani",
+        "twice@example.com": "test_count_2",
+        "missing@example.com": "test_count_0",
+        "": "test_count_0",
+    }
+    assert {email: lookup_classification(classified, email)[0] for email in expected} == expected
+
+    category, test = lookup_classification(classified, "pass@example.com")
+    assert test["score"] == 85 and test["link"].endswith("/1")
+    assert lookup_classification(classified, "twice@example.com")[1] is None
+
+
+@pytest.fixture
+def manatal_server(stub_api, monkeypatch, tmp_path):
+    state = {"requests": [], "refuse": {11}}
+
+    def mutate(request):
+        state["requests"].append((request.method, request.path.split("/v3")[-1], request.json()))
+        match_id = request.path.rstrip("/").split("/")[-1]
+        status = 400 if match_id.isdigit() and int(match_id) in state["refuse"] else 200
+        return status, {"id": 1}
+
+    stub_api({"POST": mutate, "PATCH": mutate})
+    template = tmp_path / "chiacchierata.txt"
+    template.write_text("Ciao {name}!", encoding="utf-8")
+    monkeypatch.setattr(process_test_results, "EMAIL_CHIACCHIERATA_BODY_FILE", str(template))
+    monkeypatch.setattr(process_test_results, "EMAIL_DROP_BODY_FILE", None)
+    return state
+
+
+def _planned(match_id, email, score, has_note=False):
+    classified = classify_tests(normalize_test_results([_record(match_id, email, "completed", score=score)]))
+    category, test = lookup_classification(classified, email)
+    match = {"id": match_id, "candidate": match_id + 100}
+    candidate = {"full_name": "Anna Rossi", "email": email}
+    return plan_candidate(match, candidate, category, test, ("Chiacchierata", 7), has_note)
+
+
+def test_plan_lists_the_actions_of_a_real_run(manatal_server):
+    passed = _planned(10, "pass@example.com", 90)
+    assert [describe_action(a) for a in passed] == [
+        "nota TestDome", "sposta in 'Chiacchierata'", "email chiacchierata.txt a pass@example.com",
+    ]
+    assert [a["kind"] for a in _planned(12, "fail@example.com", 30, has_note=True)] == ["drop"]
+    assert [a["kind"] for a in _planned(13, "zero@example.com", 0)] == ["drop"]
+    assert _planned(14, "mid@example.com", 70, has_note=True) == []
+    # Planning alone touches nothing
+    assert manatal_server["requests"] == []
+
+
+def test_execute_plan_skips_the_email_when_the_move_fails(manatal_server):
+    from services import mail_queue
+
+    plan = [
+        {"board": "DEV", "candidate": "Ok", "email": "ok@example.com", "actions": _planned(10, "ok@example.com", 90)},
+        {"board": "DEV", "candidate": "Ko", "email": "ko@example.com", "actions": _planned(11, "ko@example.com", 90)},
+    ]
+    failures = execute_plan({}, plan)
+
+    assert [entry["candidate"] for entry, _ in failures] == ["Ko"]
+    assert failures[0][1].startswith("sposta in 'Chiacchierata'")
+    patches = sorted((path, body) for method, path, body in manatal_server["requests"] if method == "PATCH")
+    assert patches == [("/matches/10/", {"stage": {"id": 7}}), ("/matches/11/", {"stage": {"id": 7}})]
+    assert mail_queue.pending_count() == 1
+
+
+def test_event_log_failure_does_not_abort_the_run(manatal_server, monkeypatch):
+    from services import mail_queue, stage_events
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(stage_events, "_connect", locked)
+    plan = [{"board": "DEV", "candidate": "Ok", "email": "ok@example.com", "actions": _planned(10, "ok@example.com", 90)}]
+
+    assert execute_plan({}, plan) == []
+    assert ("PATCH", "/matches/10/", {"stage": {"id": 7}}) in manatal_server["requests"]
+    assert mail_queue.pending_count() == 1
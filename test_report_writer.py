@@ -0,0 +1,37 @@
+"""Test the streaming report writer: fills, generators and partial workbooks on errors."""
+
+import pytest
+from openpyxl import load_workbook
+
+from screening_cvs import write_rows_to_excel
+from services.report_writer import ReportWriter
+
+
+def test_rows_are_streamed_with_decision_fills(tmp_path):
+    path = tmp_path / "cv.xlsx"
+    rows = ({"file_name": f"cv{i}.pdf", "decision": d} for i, d in enumerate(["Accettato", "RIFIUTATO", ""]))
+
+    assert write_rows_to_excel(rows, path, ["file_name", "decision"]) == 3
+
+    ws = load_workbook(path)["CV"]
+    assert [[c.value for c in r] for r in ws.iter_rows()] == [
+        ["file_name", "decision"], ["cv0.pdf", "Accettato"], ["cv1.pdf", "RIFIUTATO"], ["cv2.pdf", None],
+    ]
+    assert [ws.cell(row=r, column=2).fill.start_color.rgb for r in (2, 3)] == ["00C6EFCE", "00FFC7CE"]
+    assert ws.cell(row=4, column=1).fill.fill_type is None
+
+
+def test_a_failure_midway_leaves_a_partial_workbook(tmp_path):
+    path = tmp_path / "funnel.xlsx"
+
+    def rows():
+        yield {"stage_name": "Nuovi", "total": 10}
+        raise RuntimeError("API non raggiungibile")
+
+    with pytest.raises(RuntimeError):
+        with ReportWriter(path) as report:
+            report.sheet("Sheet1", ["stage_name", "total"]).extend(rows())
+
+    values = [[c.value for c in r] for r in load_workbook(path)["Sheet1"].iter_rows()]
+    assert values[:2] == [["stage_name", "total"], ["Nuovi", 10]]
+    assert values[2][0].startswith("INCOMPLETO dopo 1 righe: RuntimeError")
@@ -0,0 +1,64 @@
+"""Test the partitioned result store: per-run files, pruning by month and filtered queries."""
+
+import csv
+from datetime import date, datetime, timezone
+
+import pytest
+
+import export_screening_results
+import services.result_store as result_store
+from screening_cvs import OUTPUT_FIELDS, export_results_view
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(result_store, "RESULTS_DIR", tmp_path / "results")
+    # A run from January 2025, already on disk
+    old = tmp_path / "results" / "screening" / "year=2025" / "month=01" / "old.csv"
+    old.parent.mkdir(parents=True)
+    with old.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["run_id", "screened_at", "file_name", "decision", "accenture_value"])
+        writer.writeheader()
+        writer.writerow({"run_id": "old", "screened_at": "2025-01-15T10:00:00+00:00", "file_name": "old.pdf",
+                         "decision": "RIFIUTATO", "accenture_value": "FALSE"})
+    return tmp_path
+
+
+def test_rows_are_recorded_while_passing_through(store):
+    rows = [
+        {"file_name": "a.pdf", "decision": "ACCETTATO", "accenture_value": "TRUE", "is_duplicate": False},
+        {"file_name": "b.pdf", "decision": "RIFIUTATO", "accenture_value": "FALSE", "is_duplicate": False},
+    ]
+    with result_store.ResultRun("run1", OUTPUT_FIELDS, folder="batch", model="gpt-4o") as run:
+        assert list(run.record(iter(rows))) == rows
+    today = datetime.now(timezone.utc).date()
+    assert run.path.parent.name == f"month={today.month:02d}"
+
+    rejected = result_store.query(since=today, decision="RIFIUTATO", accenture_value="FALSE")
+    assert rejected["file_name"].tolist() == ["b.pdf"]
+    assert rejected["model"].tolist() == ["gpt-4o"] and rejected["is_duplicate"].tolist() == ["False"]
+
+    everything = result_store.query(columns=["run_id", "file_name"])
+    assert everything.values.tolist() == [["old", "old.pdf"], ["run1", "a.pdf"], ["run1", "b.pdf"]]
+
+
+def test_queries_only_open_the_partitions_of_the_period(store):
+    assert [p.stem for p in result_store._files(date(2025, 1, 1), date(2025, 3, 31))] == ["old"]
+    assert result_store._files(date(2025, 2, 1), None) == []
+    assert result_store.query(since="2025-01-16", until="2025-01-31").empty
+
+
+def test_excel_view_over_the_store(store):
+    path = store / "view.xlsx"
+    assert export_results_view(path, accenture_value="FALSE") == 1
+    assert path.exists()
+
+
+def test_export_script_applies_the_filters(store, monkeypatch, capsys):
+    monkeypatch.chdir(store)
+    monkeypatch.setattr(export_screening_results, "SINCE", "2025-01-01")
+    monkeypatch.setattr(export_screening_results, "DECISION", " rifiutato ")
+    export_screening_results.main()
+
+    assert "1 risultati esportati in: screening_results_" in capsys.readouterr().out
+    assert len(list(store.glob("screening_results_*.xlsx"))) == 1
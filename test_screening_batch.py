@@ -0,0 +1,171 @@
+"""Test the Batch API mode of screening_cvs against a local stand-in for the batch endpoints."""
+
+import json
+import threading
+
+import pytest
+
+import screening_cvs
+
+
+class BatchStub:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.uploaded_lines = []
+        self.batches_created = 0
+        self.polls = 0
+        self.sync_calls = []
+
+    def _batch(self, status):
+        return {
+            "id": "batch_1",
+            "object": "batch",
+            "endpoint": "/v1/chat/completions",
+            "input_file_id": "file-in",
+            "completion_window": "24h",
+            "status": status,
+            "created_at": 0,
+            "output_file_id": "file-out" if status == "completed" else None,
+            "error_file_id": None,
+            "request_counts": {"total": len(self.uploaded_lines), "completed": 0, "failed": 0},
+        }
+
+    def upload(self, request):
+        with self.lock:
+            self.uploaded_lines = [
+                json.loads(line) for line in request.body.splitlines() if line.startswith(b'{"custom_id"')
+            ]
+        return {
+            "id": "file-in", "object": "file", "bytes": len(request.body), "created_at": 0,
+            "filename": "requests.jsonl", "purpose": "batch", "status": "processed",
+        }
+
+    def create(self, request):
+        with self.lock:
+            self.batches_created += 1
+        return self._batch("validating")
+
+    def poll(self, request):
+        with self.lock:
+            self.polls += 1
+            status = "completed" if self.polls > 1 else "in_progress"
+        return self._batch(status)
+
+    def completion(self, request):
+        filename = request.json()["messages"][1]["content"][0]["file"]["filename"]
+        self.sync_calls.append(filename)
+        content = json.dumps({"full_name": filename.rsplit(".", 1)[0], "cv_language": "italiano"})
+        return {
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": "gpt-4o",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        }
+
+    def output(self, request):
+        lines = []
+        for uploaded in self.uploaded_lines:
+            custom_id = uploaded["custom_id"]
+            stem = custom_id.rsplit(".", 1)[0]
+            if "broken" in stem:
+                response = {"status_code": 500, "body": {"error": {"message": "server error"}}}
+            else:
+                content = json.dumps({"full_name": stem, "cv_language": "italiano"})
+                response = {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}}
+            lines.append(json.dumps({"custom_id": custom_id, "response": response}))
+        return "\n".join(lines).encode()
+
+
+@pytest.fixture
+def batch_stub(stub_api):
+    stub = BatchStub()
+    stub_api(
+        {
+            "POST /files$": stub.upload,
+            "POST /batches$": stub.create,
+            "POST /chat/completions$": stub.completion,
+            "GET /batches/batch_1$": stub.poll,
+            "GET /files/file-out/content$": stub.output,
+            "GET /candidates/": lambda request: {"results": []},
+        },
+        services=("manatal", "openai"),
+    )
+    return stub
+
+
+def make_pdfs(folder, names):
+    for name in names:
+        (folder / name).write_bytes(f"%PDF-1.4 {name}".encode())
+
+
+def test_batch_results_feed_the_normal_pipeline(batch_stub, tmp_path):
+    make_pdfs(tmp_path, ["cv_a.pdf", "cv_b.pdf", "cv_broken.pdf"])
+
+    extractions = screening_cvs.run_batch_extraction(tmp_path, "gpt-4o", None, poll_seconds=0)
+    assert batch_stub.batches_created == 1
+    assert sorted(line["custom_id"] for line in batch_stub.uploaded_lines) == ["cv_a.pdf", "cv_b.pdf", "cv_broken.pdf"]
+    assert not (tmp_path / screening_cvs.BATCH_STATE_FILE).exists()
+
+    rows = screening_cvs.process_directory(
+        headers={"Authorization": "Token test"},
+        input_dir=tmp_path,
+        model="gpt-4o",
+        max_workers=2,
+        requests_per_minute=0,
+        limit=None,
+        extractions=extractions,
+    )
+    assert [r["full_name"] for r in rows] == ["cv_a", "cv_b", ""]
+    assert rows[0]["italiano_value"] == "TRUE"
+    assert rows[2]["note"].startswith("errore:")
+
+    # Successful extractions are cached: only the failed CV goes into a new batch
+    batch_stub.polls = 0
+    screening_cvs.run_batch_extraction(tmp_path, "gpt-4o", None, poll_seconds=0)
+    assert batch_stub.batches_created == 2
+    assert [line["custom_id"] for line in batch_stub.uploaded_lines] == ["cv_broken.pdf"]
+
+
+def test_interrupted_wait_resumes_the_same_batch(batch_stub, tmp_path, monkeypatch):
+    make_pdfs(tmp_path, ["cv_a.pdf", "cv_b.pdf"])
+
+    def crash(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as m:
+        m.setattr(screening_cvs, "wait_for_batch", crash)
+        with pytest.raises(KeyboardInterrupt):
+            screening_cvs.run_batch_extraction(tmp_path, "gpt-4o", None, poll_seconds=0)
+    assert (tmp_path / screening_cvs.BATCH_STATE_FILE).exists()
+
+    extractions = screening_cvs.run_batch_extraction(tmp_path, "gpt-4o", None, poll_seconds=0)
+    assert batch_stub.batches_created == 1
+    assert extractions["cv_b.pdf"]["raw"]["full_name"] == "cv_b"
+    assert not (tmp_path / screening_cvs.BATCH_STATE_FILE).exists()
+
+
+def test_cv_added_after_submission_is_extracted_synchronously(batch_stub, tmp_path, monkeypatch):
+    make_pdfs(tmp_path, ["cv_a.pdf", "cv_b.pdf"])
+
+    def crash(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as m:
+        m.setattr(screening_cvs, "wait_for_batch", crash)
+        with pytest.raises(KeyboardInterrupt):
+            screening_cvs.run_batch_extraction(tmp_path, "gpt-4o", None, poll_seconds=0)
+    make_pdfs(tmp_path, ["cv_c.pdf"])
+
+    extractions = screening_cvs.run_batch_extraction(tmp_path, "gpt-4o", None, poll_seconds=0)
+    assert batch_stub.batches_created == 1
+    assert sorted(extractions) == ["cv_a.pdf", "cv_b.pdf"]
+
+    rows = screening_cvs.process_directory(
+        headers={"Authorization": "Token test"},
+        input_dir=tmp_path,
+        model="gpt-4o",
+        max_workers=2,
+        requests_per_minute=0,
+        limit=None,
+        extractions=extractions,
+    )
+    assert [r["full_name"] for r in rows] == ["cv_a", "cv_b", "cv_c"]
+    assert batch_stub.sync_calls == ["cv_c.pdf"]
@@ -0,0 +1,157 @@
+"""Test the concurrent extraction in screening_cvs.process_directory against a local stub server."""
+
+import json
+import threading
+import time
+
+import pytest
+
+import screening_cvs
+
+
+class StubState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.model_calls = 0
+
+    def completion(self, request):
+        filename = request.json()["messages"][1]["content"][0]["file"]["filename"]
+
+        with self.lock:
+            self.model_calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+
+        stem = filename.rsplit(".", 1)[0]
+        content = "not json" if "broken" in stem else json.dumps({
+            "full_name": stem,
+            "email": f"{stem}@example.com",
+            "cv_language": "italiano",
+        })
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-4o",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+        }
+
+
+def _candidates(request):
+    # Listed in full by the Manatal mirror; the email filter answers direct lookups
+    candidate = {"id": 3, "email": "cv_03@example.com", "created_at": "2020-01-01T00:00:00Z"}
+    email = request.query.get("email", [None])[0]
+    return {"next": None, "results": [candidate] if email in (None, candidate["email"]) else []}
+
+
+@pytest.fixture
+def stub_server(stub_api):
+    state = StubState()
+    stub_api(
+        {
+            "POST": state.completion,
+            "GET /candidates/$": _candidates,
+            "GET /candidates/3/matches/$": lambda request: {"results": []},
+            "GET /matches/$": lambda request: {"next": None, "results": []},
+        },
+        services=("manatal", "openai"),
+    )
+    return state
+
+
+def test_rows_keep_input_order_and_error_notes(stub_server, tmp_path):
+    names = [f"cv_{i:02d}.pdf" for i in range(12)] + ["cv_broken.pdf"]
+    for name in names:
+        (tmp_path / name).write_bytes(f"%PDF-1.4 {name}".encode())
+
+    rows = screening_cvs.process_directory(
+        headers={"Authorization": "Token test"},
+        input_dir=tmp_path,
+        model="gpt-4o",
+        max_workers=4,
+        requests_per_minute=0,
+        limit=None,
+    )
+
+    assert [r["file_name"] for r in rows] == sorted(names)
+    assert stub_server.max_in_flight > 1
+    assert stub_server.max_in_flight <= 4
+
+    broken = rows[-1]
+    assert broken["note"].startswith("errore:")
+    assert broken["full_name"] == ""
+
+    assert rows[3]["manatal_link"] == '=HYPERLINK("app.manatal.com/candidates/3")'
+    assert rows[0]["manatal_link"] == ""
+    assert all(r["note"] == "" for r in rows[:-1])
+
+
+def test_limit_restricts_processed_files(stub_server, tmp_path):
+    for i in range(5):
+        (tmp_path / f"cv_{i:02d}.pdf").write_bytes(f"%PDF-1.4 {i}".encode())
+
+    rows = screening_cvs.process_directory(
+        headers={"Authorization": "Token test"},
+        input_dir=tmp_path,
+        model="gpt-4o",
+        max_workers=2,
+        requests_per_minute=0,
+        limit=2,
+    )
+
+    assert [r["file_name"] for r in rows] == ["cv_00.pdf", "cv_01.pdf"]
+    assert stub_server.model_calls == 2
+
+
+def test_rerun_is_served_from_extraction_cache(stub_server, tmp_path):
+    for i in range(3):
+        (tmp_path / f"cv_{i:02d}.pdf").write_bytes(f"%PDF-1.4 {i}".encode())
+    (tmp_path / "cv_broken.pdf").write_bytes(b"%PDF-1.4 broken")
+
+    kwargs = dict(
+        headers={"Authorization": "Token test"},
+        input_dir=tmp_path,
+        model="gpt-4o",
+        max_workers=2,
+        requests_per_minute=0,
+        limit=None,
+    )
+    first = screening_cvs.process_directory(**kwargs)
+    assert stub_server.model_calls == 4
+
+    second = screening_cvs.process_directory(**kwargs)
+    # Only the failed extraction is retried
+    assert stub_server.model_calls == 5
+    assert [r["full_name"] for r in second] == [r["full_name"] for r in first]
+
+
+def test_first_error_stops_the_remaining_model_calls(stub_server, tmp_path, monkeypatch):
+    for i in range(20):
+        (tmp_path / f"cv_{i:02d}.pdf").write_bytes(f"%PDF-1.4 {i}".encode())
+    lookup = screening_cvs.get_candidate_info
+
+    def failing_lookup(headers, email):
+        if email.startswith("cv_00"):
+            raise RuntimeError("Manatal non raggiungibile")
+        return lookup(headers, email)
+
+    monkeypatch.setattr(screening_cvs, "get_candidate_info", failing_lookup)
+    with pytest.raises(RuntimeError, match="Manatal"):
+        screening_cvs.process_directory(
+            headers={"Authorization": "Token test"},
+            input_dir=tmp_path,
+            model="gpt-4o",
+            max_workers=2,
+            requests_per_minute=0,
+            limit=None,
+        )
+    assert stub_server.model_calls <= screening_cvs.SUBMIT_WINDOW * 2
@@ -0,0 +1,74 @@
+"""Test the stage-transition log fed by our own mutations and by mirror syncs."""
+
+from datetime import date
+
+import pytest
+
+import services.manatal_mirror as mirror
+import services.manatal_service as manatal_service
+from services import stage_events
+
+
+@pytest.fixture
+def manatal(stub_api):
+    matches = {
+        1: {"id": 1, "job": 42, "candidate": 10, "is_active": True, "stage": {"id": 5},
+            "updated_at": "2026-01-01T10:00:00Z"},
+        2: {"id": 2, "job": 42, "candidate": 11, "is_active": True, "stage": {"id": 5},
+            "updated_at": "2026-01-02T10:00:00Z"},
+    }
+
+    def list_matches(request):
+        results = list(matches.values())
+        return {"count": len(results), "next": None, "results": results}
+
+    def update_match(request):
+        match = matches[int(request.path.rstrip("/").split("/")[-1])]
+        change = request.json()
+        if "stage" in change:
+            match["stage"] = change["stage"]
+        if "is_active" in change:
+            match["is_active"] = change["is_active"] != "false"
+        match["updated_at"] = "2026-01-05T08:00:00Z"
+        return match
+
+    stub_api({"GET": list_matches, "PATCH": update_match})
+    return matches
+
+
+def _kinds(match_id):
+    return [(e["source"], e["prev_stage_id"], e["stage_id"], e["is_active"]) for e in stage_events.match_history(match_id)]
+
+
+def test_mirror_syncs_and_mutations_are_logged_once(manatal):
+    mirror.sync_matches({}, "42")
+    assert _kinds(1) == [("baseline", None, 5, 1)]
+
+    manatal_service.move_match({}, 1, 6)
+    manatal_service.drop_candidate({}, 2)
+    # The next sync sees the same changes: nothing new for them
+    manatal[1]["updated_at"] = "2026-01-06T08:00:00Z"
+    mirror.sync_matches({}, "42")
+    assert _kinds(1) == [("baseline", None, 5, 1), ("script", 5, 6, 1)]
+    assert _kinds(2) == [("baseline", None, 5, 1), ("script", 5, 5, 0)]
+
+    # A change made on Manatal directly is picked up from the mirror diff
+    manatal[2].update(stage={"id": 7}, is_active=True, updated_at="2026-01-07T08:00:00Z")
+    mirror.sync_matches({}, "42")
+    assert _kinds(2)[-1] == ("mirror", 5, 7, 1)
+    assert stage_events.match_history(2)[-1]["occurred_at"].startswith("2026-01-07")
+
+
+def test_daily_counters_feed_the_transition_funnel(manatal):
+    mirror.sync_matches({}, "42")
+    manatal_service.move_match({}, 1, 6)
+    manatal_service.move_match({}, 1, 6)  # no-op: already there
+    manatal_service.drop_candidate({}, 2)
+
+    rows = stage_events.transition_rows("42", [("Test", 5), ("Chiacchierata", 6)], date(2026, 1, 1), date(2100, 1, 1))
+    assert rows == [
+        {"stage_name": "Test", "entered": 2, "dropped": 1, "perc_drop": 0.5, "perc_next": 0.5},
+        {"stage_name": "Chiacchierata", "entered": 1, "dropped": 0, "perc_drop": 0.0, "perc_next": ""},
+    ]
+    # Baseline events are dated by updated_at: outside the range they do not count
+    assert stage_events.stage_counts("42", date(2026, 1, 3), date(2100, 1, 1))[5] == (0, 1)
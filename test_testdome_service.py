@@ -0,0 +1,94 @@
+"""Test the TestDome client: cached token, concurrent pages, retry on 429/401."""
+
+import stat
+import threading
+import time
+
+import pytest
+
+from services import local_db, testdome_service
+
+TOTAL = 230
+SERVER_MAX_TOP = 50
+
+
+class Stub:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tokens_issued = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_with = []  # status codes returned by the next candidate requests
+
+    def token(self, request):
+        with self.lock:
+            self.tokens_issued += 1
+            token = f"token-{self.tokens_issued}"
+        return {"access_token": token, "expires_in": 3600}
+
+    def candidates(self, request):
+        with self.lock:
+            status = self.fail_with.pop(0) if self.fail_with else None
+        if status == 429:
+            return 429, {}, {"Retry-After": "0"}
+        issued = {f"Bearer token-{i}" for i in range(1, self.tokens_issued + 1)}
+        if status == 401 or request.headers["Authorization"] not in issued:
+            return 401, {}
+
+        assert request.query["$expand"] == ["test", "activities"]
+        top = min(int(request.query["$top"][0]), SERVER_MAX_TOP)
+        skip = int(request.query["$skip"][0])
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        return {
+            "totalCount": TOTAL,
+            "hasMoreItems": skip + top < TOTAL,
+            "value": [{"id": i, "status": "completed"} for i in range(skip, min(skip + top, TOTAL))],
+        }
+
+
+@pytest.fixture
+def stub(stub_api, monkeypatch):
+    state = Stub()
+    stub_api({"POST": state.token, "GET": state.candidates}, services=("testdome",))
+    monkeypatch.setenv("TEST_DOME_CLIENT_ID", "client")
+    monkeypatch.setenv("TEST_DOME_CLIENT_SECRET", "secret")
+    return state
+
+
+def test_token_is_reused_in_memory_and_across_runs(stub, monkeypatch):
+    assert testdome_service.build_testdome_headers() == {"Authorization": "Bearer token-1"}
+    testdome_service.build_testdome_headers()
+    token_file = local_db.CACHE_DIR / testdome_service.TOKEN_CACHE_FILE
+    assert stat.S_IMODE(token_file.stat().st_mode) == 0o600
+    assert [p.name for p in local_db.CACHE_DIR.iterdir()] == [token_file.name]
+
+    # New process: memory is empty, the token is read back from disk
+    monkeypatch.setattr(testdome_service, "_token", None)
+    assert testdome_service.build_testdome_headers() == {"Authorization": "Bearer token-1"}
+    assert stub.tokens_issued == 1
+
+    # Within the refresh margin of the expiry: exchanged again
+    monkeypatch.setattr(testdome_service, "TOKEN_REFRESH_MARGIN_SECONDS", 3600)
+    assert testdome_service.build_testdome_headers() == {"Authorization": "Bearer token-2"}
+
+
+def test_pages_are_fetched_concurrently_in_order(stub):
+    results = testdome_service.fetch_all_test_results(testdome_service.build_testdome_headers())
+
+    assert [r["id"] for r in results] == list(range(TOTAL))
+    assert stub.max_in_flight > 1
+
+
+def test_throttling_and_revoked_token_are_retried(stub):
+    headers = testdome_service.build_testdome_headers()
+    stub.fail_with = [429, 401]
+
+    results = testdome_service.fetch_all_test_results(headers, page_size=500)
+
+    assert len(results) == TOTAL
+    assert stub.tokens_issued == 2
@@ -0,0 +1,68 @@
+"""Test that the TestDome store only re-downloads new, open or recently active results."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services import testdome_store
+
+OLD = "2025-01-10T10:00:00Z"
+RECENT = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat().replace("+00:00", "Z")
+
+
+def _record(cid, status, activity_date=OLD):
+    return {"id": cid, "status": status, "test": {"name": "Python"}, "activities": [{"date": activity_date}]}
+
+
+@pytest.fixture
+def stub(stub_api):
+    state = {
+        "records": {i: _record(i, "completed") for i in range(1, 9)},
+        "expanded_pages": 0,
+        "details": [],
+    }
+    state["records"][9] = _record(9, "invited")
+    state["records"][10] = _record(10, "completed", RECENT)
+
+    def listing(request):
+        ordered = [state["records"][k] for k in sorted(state["records"])]
+        if "$expand" in request.query:
+            state["expanded_pages"] += 1
+            return {"hasMoreItems": False, "value": ordered}
+        return {"hasMoreItems": False, "value": [{"id": r["id"], "status": r["status"]} for r in ordered]}
+
+    def detail(request):
+        cid = int(request.path.rstrip("/").rsplit("/", 1)[1])
+        state["details"].append(cid)
+        return state["records"][cid]
+
+    stub_api({"GET /candidates/?$": listing, "GET /candidates/": detail}, services=("testdome",))
+    return state
+
+
+def test_only_open_new_and_recent_results_are_refetched(stub):
+    first = testdome_store.sync_test_results({})
+    assert [r["id"] for r in first] == list(range(1, 11))
+    assert stub["expanded_pages"] == 1 and stub["details"] == []
+
+    stub["records"][9] = _record(9, "completed", RECENT)
+    stub["records"][11] = _record(11, "invited")
+    del stub["records"][2]
+
+    second = testdome_store.sync_test_results({})
+
+    assert stub["expanded_pages"] == 1
+    assert sorted(stub["details"]) == [9, 10, 11]
+    assert [r["id"] for r in second] == [1] + list(range(3, 12))
+    assert second[7]["status"] == "completed"  # id 9, refreshed
+
+
+def test_large_refresh_falls_back_to_the_full_listing(stub):
+    testdome_store.sync_test_results({})
+    for cid in range(1, 8):
+        stub["records"][cid] = _record(cid, "canceled")
+
+    testdome_store.sync_test_results({})
+
+    assert stub["expanded_pages"] == 2
+    assert stub["details"] == []
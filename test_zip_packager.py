@@ -0,0 +1,28 @@
+"""Test the concurrent zip packager and its per-file compression choice."""
+
+import os
+import zipfile
+
+from services.zip_packager import ZipPackager
+
+
+def test_files_are_packed_as_they_are_added(tmp_path):
+    text = tmp_path / "cv_text.pdf"
+    text.write_bytes(b"%PDF-1.4 " + b"Esperienza Python Django " * 4000)
+    binary = tmp_path / "cv_scan.pdf"
+    binary.write_bytes(b"%PDF-1.4 " + os.urandom(300_000))
+
+    paths = {"accepted": tmp_path / "ok.zip", "rejected": tmp_path / "ko.zip"}
+    with ZipPackager(paths) as zips:
+        zips.add("accepted", text)
+        zips.add("accepted", binary)
+        zips.add("rejected", tmp_path / "missing.pdf")
+        counts = zips.close()
+
+    assert counts == {"accepted": 2, "rejected": 0}
+    assert zips.close() == counts
+    with zipfile.ZipFile(paths["accepted"]) as zf:
+        types = {info.filename: info.compress_type for info in zf.infolist()}
+        assert zf.read("cv_scan.pdf") == binary.read_bytes()
+    assert types == {"cv_text.pdf": zipfile.ZIP_DEFLATED, "cv_scan.pdf": zipfile.ZIP_STORED}
+    assert zipfile.ZipFile(paths["rejected"]).namelist() == []
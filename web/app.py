@@ -7,6 +7,7 @@ from fastapi.templating import Jinja2Templates
 from pathlib import Path
 from pydantic import BaseModel
 
+from services.email_templates import TemplateError, list_templates, reload_template, validate_template
 from web.commands import COMMANDS, COMMANDS_BY_ID
 from web.db import init_db, create_run, list_runs, get_run
 from web.runner import run_script, stop_run, register_ws, unregister_ws
@@ -47,8 +48,7 @@ async def api_run_detail(run_id: int):
 
 @app.get("/api/emails")
 async def api_emails():
-    files = sorted(EMAILS_DIR.glob("*.txt"))
-    return [{"filename": f.name, "content": f.read_text(encoding="utf-8")} for f in files]
+    return list_templates(EMAILS_DIR)
 
 
 class EmailUpdate(BaseModel):
@@ -60,7 +60,12 @@ async def api_update_email(filename: str, body: EmailUpdate):
     path = EMAILS_DIR / filename
     if not path.exists() or not path.suffix == ".txt":
         return JSONResponse({"error": "not found"}, status_code=404)
+    try:
+        validate_template(body.content, filename)
+    except TemplateError as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
     path.write_text(body.content, encoding="utf-8")
+    reload_template(path)
     return {"ok": True}
 
 
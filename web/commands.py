@@ -50,7 +50,14 @@ COMMANDS = [
         "description": "Analizza i CV dei candidati e li valuta per lo screening iniziale.",
         "group": 2,
         "script": "screening_cvs.py",
-        "inputs": [],
+        "inputs": [
+            {
+                "name": "BATCH_MODE",
+                "label": "Batch API (lento, economico)",
+                "type": "bool",
+                "default": False,
+            },
+        ],
     },
     {
         "id": "drop_candidates",
@@ -101,7 +108,48 @@ COMMANDS = [
         "description": "Esporta le statistiche del funnel di selezione in un file Excel.",
         "group": 3,
         "script": "export_funnel_stats.py",
-        "inputs": list(BOARD_INPUTS),
+        "inputs": [
+            {
+                "name": "FUNNEL_WEEKS",
+                "label": "Settimane ISO",
+                "type": "bool",
+                "default": False,
+            },
+        ] + list(BOARD_INPUTS),
+    },
+    {
+        "id": "export_screening_results",
+        "name": "Export Screening Results",
+        "icon": "fa-table",
+        "description": "Esporta in Excel i risultati dello screening registrati da tutti i run, filtrati per periodo, decisione e ruolo.",
+        "group": 3,
+        "script": "export_screening_results.py",
+        "inputs": [
+            {
+                "name": "SINCE",
+                "label": "Dal (YYYY-MM-DD)",
+                "type": "text",
+                "default": "",
+            },
+            {
+                "name": "UNTIL",
+                "label": "Al (YYYY-MM-DD)",
+                "type": "text",
+                "default": "",
+            },
+            {
+                "name": "DECISION",
+                "label": "Decisione (ACCETTATO/RIFIUTATO)",
+                "type": "text",
+                "default": "",
+            },
+            {
+                "name": "ROLE",
+                "label": "Ruolo",
+                "type": "text",
+                "default": "",
+            },
+        ],
     },
 ]
 